@@ -1,23 +1,97 @@
+import cProfile
 import os
+import time
+import uuid
 from typing import List
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, g, jsonify, request, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 
 from services import (
+    DOWNSAMPLE_MODES,
+    SEARCH_STRATEGIES,
+    JobQueue,
+    ReportCache,
+    SessionStore,
+    StreamRegistry,
+    available_report_formats,
     create_report,
     detect_peaks,
     derive_segments,
+    downsample,
+    patch_segments,
     process_uploaded_data,
+    query_range,
     run_find_peaks,
     suggest_params,
-    to_jsonable,
 )
+from services.columnar import (
+    COLUMNAR_BINARY,
+    COLUMNAR_JSON,
+    decode_frame,
+    encode_frame,
+    negotiate,
+    recording_columns,
+    recording_from_columns,
+    to_columnar_json,
+)
+from services.intervals import select as select_intervals
+from services.json_sanitize import dumps as dumps_json, json_default, orjson
+from services.timing import RequestMetrics, server_timing, stage, timed
+from services.timing import finish as finish_timing, start as start_timing
+from services.validation import (
+    ValidationError,
+    pressure_error,
+    pressure_recording,
+    series_arrays,
+    series_recording,
+    validate_peaks,
+    validate_points,
+    validate_segment_patch,
+)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Serialises numpy/pandas values directly, via orjson when installed."""
+
+    @staticmethod
+    def default(obj):
+        try:
+            return json_default(obj)
+        except TypeError:
+            return DefaultJSONProvider.default(obj)
+
+    @timed("serialize")
+    def dumps(self, obj, **kwargs):
+        if set(kwargs) - {"indent", "separators"}:
+            return super().dumps(obj, **kwargs)
+        return dumps_json(
+            obj, default=self.default, sort_keys=self.sort_keys, indent=bool(kwargs.get("indent"))
+        )
+
+    @timed("decode")
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # orjson rejects NaN/Infinity literals that the stdlib accepts.
+            return super().loads(s)
+
 
 app = Flask(__name__)
+app.json = JSONProvider(app)
 
 DOWNLOAD_DIR = os.path.join(os.path.dirname(__file__), "downloads")
 os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+REPORT_EXTENSIONS = (".xlsx", ".csv.zip", ".parquet.zip", ".h5")
+REPORT_CACHE = ReportCache(
+    DOWNLOAD_DIR,
+    max_bytes=int(os.getenv("REPORT_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+    max_age_seconds=float(os.getenv("REPORT_CACHE_MAX_AGE_SEC", str(7 * 24 * 3600))),
+)
 
 
 def _get_allowed_origins() -> List[str]:
@@ -28,25 +102,221 @@ def _get_allowed_origins() -> List[str]:
 CORS(app, resources={r"/*": {"origins": _get_allowed_origins()}})
 
 
+def _create_session_store() -> SessionStore:
+    return SessionStore(
+        max_entries=int(os.getenv("SESSION_MAX_ENTRIES", "32")),
+        ttl_seconds=float(os.getenv("SESSION_TTL_SEC", "3600")),
+        max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(512 * 1024 * 1024))),
+        spill_dir=os.getenv("SESSION_SPILL_DIR") or None,
+    )
+
+
+SESSION_STORE = _create_session_store()
+PEAK_SWEEP_WORKERS = max(1, int(os.getenv("PEAK_SWEEP_WORKERS", "1")))
+PEAK_SWEEP_PROCESSES = os.getenv("PEAK_SWEEP_PROCESSES", "").lower() in {"1", "true", "yes"}
+# Default cap on data rows per TimeSeries report sheet; 0 keeps every sample.
+REPORT_SERIES_MAX_ROWS = max(0, int(os.getenv("REPORT_SERIES_MAX_ROWS", "0")))
+# Upper bound on the samples a chart may request per series.
+DOWNSAMPLE_MAX_POINTS = max(3, int(os.getenv("DOWNSAMPLE_MAX_POINTS", "20000")))
+REPORT_JOBS = JobQueue(
+    max_workers=int(os.getenv("REPORT_JOB_WORKERS", "2")),
+    ttl_seconds=float(os.getenv("REPORT_JOB_TTL_SEC", "3600")),
+    max_pending=int(os.getenv("REPORT_JOB_MAX_PENDING", "32")),
+)
+LIVE_STREAMS = StreamRegistry(
+    max_streams=int(os.getenv("STREAM_MAX_STREAMS", "8")),
+    idle_ttl=float(os.getenv("STREAM_IDLE_TTL_SEC", "3600")),
+    capacity=int(os.getenv("STREAM_BUFFER_SAMPLES", str(1 << 16))),
+    store=SESSION_STORE,
+)
+# Longest a GET /api/streams/<id>/events request may block waiting for events.
+STREAM_MAX_WAIT_SEC = max(0.0, float(os.getenv("STREAM_MAX_WAIT_SEC", "25")))
+# Bytes read from a streamed request body per ingest step.
+STREAM_READ_BYTES = 64 * 1024
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1").lower() in {"1", "true", "yes"}
+# Requests sending ``X-Profile: 1`` are profiled into this directory; unset disables profiling.
+PROFILE_DIR = os.getenv("PROFILE_DIR") or None
+REQUEST_METRICS = RequestMetrics()
+
+
+@app.before_request
+def _start_request_timing():
+    g.request_started = time.perf_counter()
+    g.timing_token = start_timing()
+    if PROFILE_DIR and request.headers.get("X-Profile", "").lower() in {"1", "true", "yes"}:
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+def _finish_timing(status: int):
+    """Stop the request's timers and profiler; return (stages, elapsed, profile name)."""
+
+    elapsed = time.perf_counter() - g.pop("request_started")
+    stages = finish_timing(g.pop("timing_token"))
+
+    name = None
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d_%H%M%S')}_{request.endpoint or 'request'}_{uuid.uuid4().hex[:8]}.prof"
+        profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+
+    if request.endpoint != "metrics":
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        REQUEST_METRICS.observe(route, request.method, status, elapsed, stages)
+    return stages, elapsed, name
+
+
+@app.after_request
+def _finish_request_timing(response):
+    if "timing_token" not in g:
+        return response
+    stages, elapsed, profile_name = _finish_timing(response.status_code)
+    if profile_name:
+        response.headers["X-Profile-File"] = profile_name
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = server_timing(stages, elapsed)
+    return response
+
+
+@app.teardown_request
+def _abort_request_timing(exc):
+    # after_request is skipped when an exception propagates out of the view
+    # (or out of another after_request hook); record those requests as 500s.
+    if "timing_token" in g:
+        _finish_timing(500)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(REQUEST_METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/health", methods=["GET"])
 def health():
     return jsonify({"ok": True})
 
 
-def _validate_pressure_rows(rows):
-    if not isinstance(rows, list):
-        return False
-    for row in rows:
-        if not isinstance(row, dict):
-            return False
-        if "Elapsed Time" not in row or "Bladder Pressure" not in row:
-            return False
+SERIES_ERRORS = {
+    "pressure": "Invalid or missing pressure data",
+    "scale": "Invalid scale data",
+    "volume": "Invalid volume data",
+}
+
+
+def _invalid(message: str, exc: ValidationError):
+    """400 response for a failed validation, with its row-level details."""
+
+    body = {"error": message}
+    if exc.details:
+        body["details"] = exc.details
+    return jsonify(body), 400
+
+
+def _read_payload():
+    """Return (payload, error) for a JSON body or a binary columnar frame.
+
+    A binary frame's header becomes the payload and its float blocks are
+    placed under ``columns``.
+    """
+
+    if request.mimetype == COLUMNAR_BINARY:
         try:
-            float(row["Elapsed Time"])
-            float(row["Bladder Pressure"])
-        except (TypeError, ValueError):
-            return False
-    return True
+            with stage("decode"):
+                header, columns = decode_frame(request.get_data())
+        except ValueError as exc:
+            return None, (jsonify({"error": str(exc)}), 400)
+        header["columns"] = columns
+        return header, None
+    if not request.is_json:
+        return None, (jsonify({"error": "Expected JSON body"}), 400)
+    return request.get_json(silent=True) or {}, None
+
+
+def _dataset_view(payload):
+    """Return (recording, intervals, window, error) for ``datasetId`` or ``columns``.
+
+    The recording is the whole stored or posted one; ``intervals`` and
+    ``window`` are the validated ``keptIntervals`` and ``window`` fields.
+    Everything is ``None`` when the payload carries row-oriented series.
+    """
+
+    dataset_id = payload.get("datasetId")
+    if dataset_id is None:
+        if payload.get("columns") is None:
+            return None, None, None, None
+        try:
+            recording = recording_from_columns(payload["columns"])
+        except ValidationError as exc:
+            return None, None, None, _invalid(str(exc), exc)
+        except ValueError as exc:
+            return None, None, None, (jsonify({"error": str(exc)}), 400)
+    elif not isinstance(dataset_id, str):
+        return None, None, None, (jsonify({"error": "datasetId must be a string"}), 400)
+    else:
+        recording = SESSION_STORE.get(dataset_id)
+        if recording is None:
+            return None, None, None, (jsonify({"error": "Unknown or expired datasetId"}), 404)
+
+    intervals, window, error = _validate_view(payload.get("keptIntervals"), payload.get("window"))
+    if error:
+        return None, None, None, (jsonify({"error": error}), 400)
+    return recording, intervals, window, None
+
+
+def _resolve_dataset(payload, strict=True):
+    """Return (recording, error) for the series given by ``datasetId`` or ``columns``.
+
+    ``keptIntervals`` and ``window`` in the payload restrict the recording by
+    time on the server. Both are ``None`` when the payload carries
+    row-oriented series instead. With ``strict``, a stored recording whose
+    pressure has blank or non-finite cells is refused with the same 400 as
+    the equivalent row payload; the chart and report routes pass
+    ``strict=False`` and draw the gaps instead.
+    """
+
+    recording, intervals, window, error = _dataset_view(payload)
+    if error or recording is None:
+        return None, error
+    selected = bool(intervals) or window is not None
+    if selected:
+        recording = select_intervals(recording, intervals, window)
+    dataset_id = payload.get("datasetId")
+    invalid = SESSION_STORE.invalid(dataset_id) if strict and dataset_id is not None else None
+    if invalid is not None and selected:
+        # Row numbers refer to the selection, as they would inline.
+        invalid = pressure_error(recording)
+    if invalid is not None:
+        return None, _invalid(SERIES_ERRORS["pressure"], invalid)
+    return recording, None
+
+
+def _time_range(value):
+    if not isinstance(value, dict):
+        return None
+    start, end = value.get("start"), value.get("end")
+    for bound in (start, end):
+        if isinstance(bound, bool) or not isinstance(bound, (int, float)) or bound != bound:
+            return None
+    return float(start), float(end)
+
+
+def _validate_view(kept_intervals, window):
+    """Return (intervals, window, error) for the server-side trimming fields."""
+
+    intervals = None
+    if kept_intervals is not None:
+        if not isinstance(kept_intervals, list):
+            return None, None, "keptIntervals must be a list"
+        intervals = [_time_range(interval) for interval in kept_intervals]
+        if any(interval is None for interval in intervals):
+            return None, None, "keptIntervals entries must have numeric start and end"
+    if window is not None:
+        window = _time_range(window)
+        if window is None:
+            return None, None, "window must have numeric start and end"
+    return intervals, window, None
 
 
 def _validate_peak_params(params):
@@ -70,70 +340,7 @@ def _validate_peak_params(params):
     return cleaned, None
 
 
-def _validate_series(rows, time_key: str, value_key: str, allow_none: bool = True):
-    if rows is None:
-        return allow_none
-    if not isinstance(rows, list):
-        return False
-    for row in rows:
-        if not isinstance(row, dict):
-            return False
-        if time_key not in row or value_key not in row:
-            return False
-        try:
-            float(row[time_key])
-            float(row[value_key])
-        except (TypeError, ValueError):
-            return False
-    return True
-
-
-def _validate_peaks(peaks):
-    if not isinstance(peaks, list):
-        return False
-    for peak in peaks:
-        if not isinstance(peak, dict):
-            return False
-        if "time" not in peak or "value" not in peak:
-            return False
-        try:
-            float(peak["time"])
-            float(peak["value"])
-        except (TypeError, ValueError):
-            return False
-    return True
-
-
-def _validate_point_entries(entries):
-    if not isinstance(entries, list):
-        return False
-    for entry in entries:
-        if not isinstance(entry, dict):
-            return False
-        if "time" not in entry or "value" not in entry:
-            return False
-        if entry["time"] is not None and not isinstance(entry["time"], (int, float)):
-            return False
-        if entry["value"] is not None and not isinstance(entry["value"], (int, float)):
-            return False
-        if "index" in entry and entry["index"] is not None and not isinstance(entry["index"], int):
-            return False
-    return True
-
-
-def _validate_points(points):
-    if points is None:
-        return True
-    if not isinstance(points, dict):
-        return False
-    for key in ["onset", "empty"]:
-        if key not in points:
-            return False
-        if not _validate_point_entries(points[key]):
-            return False
-    return True
-
-
+@timed("validate")
 def _validate_segments(segments):
     if segments is None:
         return True
@@ -187,17 +394,20 @@ def _validate_segment_params(params):
 
 @app.route("/api/detect-peaks", methods=["POST"])
 def detect_peaks_route():
-    if not request.is_json:
-        return jsonify({"error": "Expected JSON body"}), 400
-
-    payload = request.get_json(silent=True) or {}
-    pressure = payload.get("pressure")
+    payload, payload_error = _read_payload()
+    if payload_error:
+        return payload_error
+    dataset, dataset_error = _resolve_dataset(payload)
+    if dataset_error:
+        return dataset_error
+    if dataset is None:
+        try:
+            dataset = pressure_recording(payload.get("pressure"))
+        except ValidationError as exc:
+            return _invalid(SERIES_ERRORS["pressure"], exc)
     min_height = payload.get("min_height")
     min_distance = payload.get("min_distance")
 
-    if not _validate_pressure_rows(pressure):
-        return jsonify({"error": "Invalid or missing pressure data"}), 400
-
     if min_height is not None and not isinstance(min_height, (int, float)):
         return jsonify({"error": "min_height must be a number"}), 400
     if min_distance is not None:
@@ -205,42 +415,49 @@ def detect_peaks_route():
             return jsonify({"error": "min_distance must be a number"}), 400
         min_distance = int(min_distance)
 
-    peaks = detect_peaks(pressure, min_height=min_height, min_distance=min_distance)
+    peaks = detect_peaks(dataset, min_height=min_height, min_distance=min_distance)
     return jsonify({"peaks": peaks})
 
 
 @app.route("/api/peaks/run", methods=["POST"])
 def run_peaks_route():
-    if not request.is_json:
-        return jsonify({"error": "Expected JSON body"}), 400
-
-    payload = request.get_json(silent=True) or {}
-    pressure = payload.get("pressure")
+    payload, payload_error = _read_payload()
+    if payload_error:
+        return payload_error
+    dataset, dataset_error = _resolve_dataset(payload)
+    if dataset_error:
+        return dataset_error
+    if dataset is None:
+        try:
+            dataset = pressure_recording(payload.get("pressure"))
+        except ValidationError as exc:
+            return _invalid(SERIES_ERRORS["pressure"], exc)
     params_raw = payload.get("params")
 
-    if not _validate_pressure_rows(pressure):
-        return jsonify({"error": "Invalid or missing pressure data"}), 400
-
     params, error = _validate_peak_params(params_raw)
     if error:
         return jsonify({"error": error}), 400
 
-    result = run_find_peaks(pressure, params)
-    return jsonify(to_jsonable(result))
+    result = run_find_peaks(dataset, params)
+    return jsonify(result)
 
 
 @app.route("/api/peaks/suggest", methods=["POST"])
 def suggest_peaks_route():
-    if not request.is_json:
-        return jsonify({"error": "Expected JSON body"}), 400
-
-    payload = request.get_json(silent=True) or {}
-    pressure = payload.get("pressure")
+    payload, payload_error = _read_payload()
+    if payload_error:
+        return payload_error
+    dataset, dataset_error = _resolve_dataset(payload)
+    if dataset_error:
+        return dataset_error
+    if dataset is None:
+        try:
+            dataset = pressure_recording(payload.get("pressure"))
+        except ValidationError as exc:
+            return _invalid(SERIES_ERRORS["pressure"], exc)
     expected_count = payload.get("expectedCount")
     search_budget = payload.get("searchBudget")
-
-    if not _validate_pressure_rows(pressure):
-        return jsonify({"error": "Invalid or missing pressure data"}), 400
+    search_strategy = payload.get("searchStrategy") or "grid"
 
     if not isinstance(expected_count, (int, float)):
         return jsonify({"error": "expectedCount must be a number"}), 400
@@ -252,54 +469,167 @@ def suggest_peaks_route():
     else:
         return jsonify({"error": "searchBudget must be a number or null"}), 400
 
-    suggestion = suggest_params(pressure, int(expected_count), budget)
-    return jsonify(to_jsonable(suggestion))
+    if search_strategy not in SEARCH_STRATEGIES:
+        return jsonify({"error": f"searchStrategy must be one of: {', '.join(SEARCH_STRATEGIES)}"}), 400
+
+    suggestion = suggest_params(
+        dataset,
+        int(expected_count),
+        budget,
+        workers=PEAK_SWEEP_WORKERS,
+        use_processes=PEAK_SWEEP_PROCESSES,
+        strategy=search_strategy,
+    )
+    return jsonify(suggestion)
 
 
 @app.route("/api/segments/derive", methods=["POST"])
 def derive_segments_route():
-    if not request.is_json:
-        return jsonify({"error": "Expected JSON body"}), 400
-
-    payload = request.get_json(silent=True) or {}
+    payload, payload_error = _read_payload()
+    if payload_error:
+        return payload_error
+    dataset, dataset_error = _resolve_dataset(payload)
+    if dataset_error:
+        return dataset_error
     data = payload.get("data")
     peaks = payload.get("peaks")
     params_raw = payload.get("params")
 
-    if not isinstance(data, dict):
-        return jsonify({"error": "data must be an object"}), 400
-
-    pressure_rows = data.get("pressure")
-    scale_rows = data.get("scale")
-    volume_rows = data.get("volume")
+    if dataset is None:
+        try:
+            dataset = series_recording(data)
+        except ValidationError as exc:
+            return _invalid(SERIES_ERRORS.get(exc.series, str(exc)), exc)
 
-    if not _validate_series(pressure_rows, "Elapsed Time", "Bladder Pressure", allow_none=False):
-        return jsonify({"error": "Invalid or missing pressure data"}), 400
-    if not _validate_series(scale_rows, "Elapsed Time", "Scale"):
-        return jsonify({"error": "Invalid scale data"}), 400
-    if not _validate_series(volume_rows, "Elapsed Time", "Tot Infused Vol"):
-        return jsonify({"error": "Invalid volume data"}), 400
-    if not _validate_peaks(peaks):
-        return jsonify({"error": "Invalid or missing peaks"}), 400
+    try:
+        validate_peaks(peaks)
+    except ValidationError as exc:
+        return _invalid("Invalid or missing peaks", exc)
 
     params, error = _validate_segment_params(params_raw)
     if error:
         return jsonify({"error": error}), 400
 
-    result = derive_segments(
-        {"pressure": pressure_rows, "scale": scale_rows, "volume": volume_rows},
-        peaks,
-        params,
-    )
-    return jsonify(to_jsonable(result))
+    result = derive_segments(dataset, peaks, params)
+    return jsonify(result)
+
+
+@app.route("/api/segments/patch", methods=["POST"])
+def patch_segments_route():
+    payload, payload_error = _read_payload()
+    if payload_error:
+        return payload_error
+    dataset, dataset_error = _resolve_dataset(payload)
+    if dataset_error:
+        return dataset_error
+    previous = payload.get("previous")
+    changes = payload.get("changes")
+
+    if dataset is None:
+        try:
+            dataset = series_recording(payload.get("data"))
+        except ValidationError as exc:
+            return _invalid(SERIES_ERRORS.get(exc.series, str(exc)), exc)
+
+    try:
+        validate_segment_patch(previous, changes)
+    except ValidationError as exc:
+        return _invalid(str(exc), exc)
+
+    params, error = _validate_segment_params(payload.get("params"))
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        result = patch_segments(dataset, previous, changes, params)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 409
+    return jsonify(result)
+
+
+@app.route("/api/series/downsample", methods=["POST"])
+def downsample_route():
+    payload, payload_error = _read_payload()
+    if payload_error:
+        return payload_error
+    dataset, dataset_error = _resolve_dataset(payload, strict=False)
+    if dataset_error:
+        return dataset_error
+    if dataset is None:
+        try:
+            dataset = series_recording(payload.get("data"))
+        except ValidationError as exc:
+            return _invalid(SERIES_ERRORS.get(exc.series, str(exc)), exc)
+
+    points = payload.get("points")
+    mode = payload.get("mode") or "lttb"
+    start = payload.get("start")
+    end = payload.get("end")
+    series = payload.get("series")
+
+    if isinstance(points, bool) or not isinstance(points, int) or not 3 <= points <= DOWNSAMPLE_MAX_POINTS:
+        return jsonify({"error": f"points must be an integer between 3 and {DOWNSAMPLE_MAX_POINTS}"}), 400
+    if mode not in DOWNSAMPLE_MODES:
+        return jsonify({"error": f"mode must be one of: {', '.join(DOWNSAMPLE_MODES)}"}), 400
+    for name, value in (("start", start), ("end", end)):
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            return jsonify({"error": f"{name} must be a number or null"}), 400
+    if start is not None and end is not None and start > end:
+        return jsonify({"error": "start must not be after end"}), 400
+    if series is not None and (not isinstance(series, list) or not all(isinstance(name, str) for name in series)):
+        return jsonify({"error": "series must be a list of series names"}), 400
+
+    try:
+        result = downsample(dataset, points, mode=mode, start=start, end=end, series=series)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(result)
+
+
+@app.route("/api/series/range", methods=["POST"])
+def series_range_route():
+    payload, payload_error = _read_payload()
+    if payload_error:
+        return payload_error
+    # The whole recording's cached pyramid answers every view of it.
+    dataset, intervals, window, dataset_error = _dataset_view(payload)
+    if dataset_error:
+        return dataset_error
+    if dataset is None:
+        return jsonify({"error": "datasetId or columns is required"}), 400
+
+    points = payload.get("points")
+    start = payload.get("start")
+    end = payload.get("end")
+    series = payload.get("series")
+
+    if isinstance(points, bool) or not isinstance(points, int) or not 1 <= points <= DOWNSAMPLE_MAX_POINTS:
+        return jsonify({"error": f"points must be an integer between 1 and {DOWNSAMPLE_MAX_POINTS}"}), 400
+    for name, value in (("start", start), ("end", end)):
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            return jsonify({"error": f"{name} must be a number or null"}), 400
+    if start is not None and end is not None and start > end:
+        return jsonify({"error": "start must not be after end"}), 400
+    if series is not None and (not isinstance(series, list) or not all(isinstance(name, str) for name in series)):
+        return jsonify({"error": "series must be a list of series names"}), 400
+
+    try:
+        result = query_range(
+            dataset, points, start=start, end=end, series=series, intervals=intervals, window=window
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(result)
 
 
 @app.route("/api/generate-report", methods=["POST"])
 def generate_report_route():
-    if not request.is_json:
-        return jsonify({"error": "Expected JSON body"}), 400
-
-    payload = request.get_json(silent=True) or {}
+    payload, payload_error = _read_payload()
+    if payload_error:
+        return payload_error
+    dataset, dataset_error = _resolve_dataset(payload, strict=False)
+    if dataset_error:
+        return dataset_error
     data = payload.get("data")
     peaks = payload.get("peaks")
     points = payload.get("points")
@@ -307,16 +637,31 @@ def generate_report_route():
     peak_params_raw = payload.get("peakParams")
     segment_params_raw = payload.get("segmentParams")
     experiment_window = payload.get("experimentWindow")
+    series_max_rows = payload.get("seriesMaxRows", REPORT_SERIES_MAX_ROWS)
+    output_format = payload.get("format") or "xlsx"
 
-    if not isinstance(data, dict):
-        return jsonify({"error": "Invalid or missing data"}), 400
+    kept_intervals = data.get("kept_intervals") if isinstance(data, dict) else None
+    if dataset is not None and isinstance(payload.get("keptIntervals"), list) and payload["keptIntervals"]:
+        kept_intervals = len(payload["keptIntervals"])
+    if dataset is None:
+        try:
+            # Missing samples come back from /api/upload as null values. Each
+            # series keeps its own time axis in the report tables.
+            dataset = series_arrays(data, required=(), nullable=True)
+        except ValidationError as exc:
+            return _invalid("Invalid or missing data", exc)
     if peaks is not None and not isinstance(peaks, list):
         return jsonify({"error": "Peaks must be a list"}), 400
-    if peaks is not None and not _validate_peaks(peaks):
-        return jsonify({"error": "Invalid peaks format"}), 400
+    if peaks is not None:
+        try:
+            validate_peaks(peaks)
+        except ValidationError as exc:
+            return _invalid("Invalid peaks format", exc)
 
-    if not _validate_points(points):
-        return jsonify({"error": "Invalid points format"}), 400
+    try:
+        validate_points(points)
+    except ValidationError as exc:
+        return _invalid("Invalid points format", exc)
 
     if not _validate_segments(segments):
         return jsonify({"error": "Invalid segments format"}), 400
@@ -329,17 +674,150 @@ def generate_report_route():
     if seg_error:
         return jsonify({"error": seg_error}), 400
 
-    filename = create_report(
-        data,
+    if series_max_rows is not None and (
+        isinstance(series_max_rows, bool) or not isinstance(series_max_rows, int) or series_max_rows < 0
+    ):
+        return jsonify({"error": "seriesMaxRows must be a non-negative integer or null"}), 400
+
+    formats = available_report_formats()
+    if output_format not in formats:
+        return jsonify({"error": f"format must be one of: {', '.join(formats)}"}), 400
+
+    report_args = dict(
         peaks=peaks,
         points=points,
         segments=segments,
         peak_params=peak_params,
         segment_params=segment_params,
         experiment_window=experiment_window,
+        kept_intervals=kept_intervals,
+        series_max_rows=series_max_rows or None,
+        output_format=output_format,
+    )
+
+    if payload.get("async"):
+        try:
+            job = REPORT_JOBS.submit(_build_report, dataset, **report_args)
+        except RuntimeError as exc:
+            return jsonify({"error": str(exc)}), 503
+        return jsonify({"jobId": job.id, "status_url": f"/api/report-jobs/{job.id}"}), 202
+
+    return jsonify(_build_report(dataset, **report_args))
+
+
+def _build_report(data, progress=None, **report_args):
+    filename = create_report(data, progress=progress, cache=REPORT_CACHE, **report_args)
+    return {"filename": filename, "download_url": f"/download/{filename}"}
+
+
+@app.route("/api/report-jobs/<job_id>", methods=["GET"])
+def report_job_status(job_id: str):
+    status = REPORT_JOBS.get(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown or expired jobId"}), 404
+    return jsonify(status)
+
+
+@app.route("/api/streams", methods=["POST"])
+def open_stream():
+    payload, payload_error = _read_payload() if request.content_length else ({}, None)
+    if payload_error:
+        return payload_error
+
+    peak_params, error = _validate_peak_params(payload.get("peakParams"))
+    if error:
+        return jsonify({"error": error}), 400
+    segment_params, error = _validate_segment_params(payload.get("segmentParams"))
+    if error:
+        return jsonify({"error": error}), 400
+    delimiter = payload.get("delimiter", "\t")
+    if delimiter not in {"\t", ","}:
+        return jsonify({"error": "delimiter must be a tab or a comma"}), 400
+
+    try:
+        stream = LIVE_STREAMS.open(
+            peak_params=peak_params if payload.get("peakParams") is not None else None,
+            segment_params=segment_params,
+            delimiter=delimiter,
+        )
+    except RuntimeError as exc:
+        return jsonify({"error": str(exc)}), 503
+    return (
+        jsonify(
+            {
+                "streamId": stream.id,
+                "samples_url": f"/api/streams/{stream.id}/samples",
+                "events_url": f"/api/streams/{stream.id}/events",
+            }
+        ),
+        201,
     )
-    download_url = f"/download/{filename}"
-    return jsonify({"filename": filename, "download_url": download_url})
+
+
+def _unknown_stream(stream_id):
+    """404 for a stream id; an expired stream's kept ``datasetId`` is included."""
+
+    body = {"error": "Unknown or expired streamId"}
+    dataset_id = LIVE_STREAMS.expired_dataset(stream_id)
+    if dataset_id is not None:
+        body["datasetId"] = dataset_id
+    return jsonify(body), 404
+
+
+def _live_stream(stream_id):
+    stream = LIVE_STREAMS.get(stream_id)
+    if stream is None:
+        return None, _unknown_stream(stream_id)
+    return stream, None
+
+
+@app.route("/api/streams/<stream_id>/samples", methods=["POST"])
+def stream_samples(stream_id: str):
+    """Append export text; the body may be sent with chunked transfer encoding."""
+
+    stream, error = _live_stream(stream_id)
+    if error:
+        return error
+    events = []
+    try:
+        while True:
+            chunk = request.stream.read(STREAM_READ_BYTES)
+            if not chunk:
+                break
+            events.extend(stream.feed(chunk))
+    except ValueError as exc:
+        return jsonify({"error": str(exc), "events": events, **stream.status()}), 400
+    return jsonify({"events": events, **stream.status()})
+
+
+@app.route("/api/streams/<stream_id>/events", methods=["GET"])
+def stream_events(stream_id: str):
+    stream, error = _live_stream(stream_id)
+    if error:
+        return error
+    try:
+        after = int(request.args.get("after", 0))
+        wait = min(STREAM_MAX_WAIT_SEC, max(0.0, float(request.args.get("wait", 0))))
+    except ValueError:
+        return jsonify({"error": "after and wait must be numbers"}), 400
+    return jsonify(stream.events_after(after, wait))
+
+
+@app.route("/api/streams/<stream_id>", methods=["GET", "DELETE"])
+def stream_status(stream_id: str):
+    """Status of a stream; ``DELETE`` finishes it and keeps its samples as a dataset."""
+
+    if request.method == "GET":
+        stream, error = _live_stream(stream_id)
+        if error:
+            return error
+        return jsonify(stream.status())
+
+    stream = LIVE_STREAMS.pop(stream_id)
+    if stream is None:
+        return _unknown_stream(stream_id)
+    events, dataset_id = LIVE_STREAMS.finish(stream)
+    return jsonify({"events": events, "datasetId": dataset_id, **stream.status()})
 
 
 @app.route("/api/upload", methods=["POST"])
@@ -362,20 +840,38 @@ def upload_file():
         return jsonify({"error": "Uploaded file is empty"}), 400
     file.stream.seek(0)
 
+    flag = request.args.get("annotations", request.form.get("annotations", ""))
+    include_annotations = flag.lower() in {"1", "true", "yes"}
+
     try:
-        parsed_data = process_uploaded_data(file.stream, filename)
+        recording = process_uploaded_data(file.stream, filename, include_annotations=include_annotations)
     except ValueError as exc:
         return jsonify({"error": str(exc)}), 400
     except Exception:
         return jsonify({"error": "Failed to process uploaded file"}), 500
 
-    return jsonify({"data": parsed_data})
+    dataset_id = SESSION_STORE.put(recording)
+    meta = {"datasetId": dataset_id}
+    if include_annotations:
+        meta["annotations"] = recording.annotations or []
+
+    media_type = negotiate(request.headers.get("Accept"))
+    with stage("encode"):
+        if media_type == COLUMNAR_BINARY:
+            response = Response(encode_frame(recording_columns(recording), meta), mimetype=COLUMNAR_BINARY)
+        elif media_type == COLUMNAR_JSON:
+            response = jsonify({"columns": to_columnar_json(recording), **meta})
+            response.mimetype = COLUMNAR_JSON
+        else:
+            response = jsonify({"data": recording.to_rows(), **meta})
+    response.vary.add("Accept")
+    return response
 
 
 @app.route("/download/<path:filename>", methods=["GET"])
 def download_file(filename: str):
     safe_name = os.path.basename(filename)
-    if not safe_name.endswith(".xlsx"):
+    if not safe_name.endswith(REPORT_EXTENSIONS):
         return jsonify({"error": "Invalid file type"}), 400
 
     file_path = os.path.join(DOWNLOAD_DIR, safe_name)
@@ -0,0 +1,274 @@
+"""Run the analysis pipeline over many recordings without the web app.
+
+Each input export is parsed, peaks are found (with fixed parameters or via
+``suggest_params``), onset/empty segments are derived and a report is
+written. Recordings are processed in parallel on a process pool. Run from
+``backend/``::
+
+    python batch.py data/study1 "data/extra/*.txt" --params params.json --out reports/
+
+The optional params file is JSON with any of::
+
+    {
+      "peakParams": {"distance": 200, "prominence": 5},
+      "expectedCount": 12,
+      "searchStrategy": "refine",
+      "searchBudget": 60,
+      "segmentParams": {"kNoise": 3.0},
+      "experimentWindow": {"start": 0, "end": 3600},
+      "format": "xlsx",
+      "seriesMaxRows": 50000
+    }
+
+``peakParams`` takes precedence; otherwise ``expectedCount`` runs the
+parameter search. ``experimentWindow`` (seconds) trims each recording
+before peaks and segments are found, as the web app does. Besides one report per recording, the output directory
+gets ``segments.csv`` (every segment of every recording) and
+``recordings.csv`` (one status line per input).
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services import (
+    ReportCache,
+    available_report_formats,
+    create_report,
+    derive_segments,
+    process_uploaded_data,
+    run_find_peaks,
+    suggest_params,
+)
+from services.intervals import select as select_intervals
+
+EXTENSIONS = (".txt", ".csv")
+SEGMENT_FIELDS = [
+    "recording",
+    "i",
+    "onsetTime",
+    "peakTime",
+    "emptyTime",
+    "imiSec",
+    "maxPressure",
+    "avgPressureBetweenEmptyAndNextOnset",
+    "deltaVolume",
+]
+RECORDING_FIELDS = ["recording", "status", "samples", "peaks", "segments", "seconds", "report", "error"]
+
+Params = Dict[str, Any]
+
+
+def _experiment_window(value: Any) -> Optional[Tuple[float, float]]:
+    """``(start, end)`` of an ``experimentWindow`` object, or ``None`` if it is malformed."""
+
+    if not isinstance(value, dict):
+        return None
+    bounds = (value.get("start"), value.get("end"))
+    if any(isinstance(bound, bool) or not isinstance(bound, (int, float)) or bound != bound for bound in bounds):
+        return None
+    return float(bounds[0]), float(bounds[1])
+
+
+def collect_inputs(patterns: Iterable[str], recursive: bool = False) -> List[str]:
+    """Expand directories and glob patterns into a sorted list of export files."""
+
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*") if recursive else os.path.join(pattern, "*")
+        for path in glob.glob(pattern, recursive=recursive):
+            if os.path.isfile(path) and path.lower().endswith(EXTENSIONS):
+                found.add(os.path.abspath(path))
+    return sorted(found)
+
+
+def _labels(paths: List[str]) -> List[str]:
+    """Input paths relative to their common directory, so equal file names stay distinct."""
+
+    if not paths:
+        return []
+    root = os.path.dirname(paths[0]) if len(paths) == 1 else os.path.commonpath(paths)
+    if len(paths) > 1 and os.path.isfile(root):
+        root = os.path.dirname(root)
+    return [os.path.relpath(path, root) for path in paths]
+
+
+def _report_name(label: str, filename: str) -> str:
+    stem = os.path.splitext(label)[0].replace(os.sep, "__")
+    # Cached names are report_<32 hex><extension>.
+    return f"{stem}_report{filename[len('report_') + 32:]}"
+
+
+def process_file(
+    path: str, params: Params, out_dir: str, label: Optional[str] = None
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Run the full pipeline on one export; returns (status row, segment rows)."""
+
+    started = time.perf_counter()
+    name = label or os.path.basename(path)
+    status: Dict[str, Any] = {"recording": name, "status": "ok"}
+    scratch: Optional[str] = None
+    try:
+        with open(path, "rb") as handle:
+            recording = process_uploaded_data(handle, path)
+        window = _experiment_window(params.get("experimentWindow"))
+        if window is not None:
+            recording = select_intervals(recording, window=window)
+            if not len(recording):
+                raise ValueError("no samples inside experimentWindow")
+
+        peak_params = params.get("peakParams")
+        if peak_params is None and params.get("expectedCount") is not None:
+            suggestion = suggest_params(
+                recording,
+                int(params["expectedCount"]),
+                int(params.get("searchBudget") or 60),
+                strategy=params.get("searchStrategy") or "grid",
+            )
+            peak_params = suggestion["best"]["params"]
+            peaks = suggestion["best"]["peaks"]
+        else:
+            peak_params = peak_params or {}
+            result = run_find_peaks(recording, peak_params)
+            peak_params, peaks = result["paramsUsed"], result["peaks"]
+
+        segment_params = params.get("segmentParams") or {}
+        derived = derive_segments(recording, peaks, segment_params)
+
+        # Write through a private, non-evicting cache so identical recordings
+        # processed concurrently never share a file, then name it after the input.
+        scratch = tempfile.mkdtemp(prefix=".report-", dir=out_dir)
+        filename = create_report(
+            recording,
+            peaks=peaks,
+            points=derived["points"],
+            segments=derived["segments"],
+            peak_params=peak_params,
+            segment_params=segment_params,
+            experiment_window=params.get("experimentWindow"),
+            series_max_rows=params.get("seriesMaxRows"),
+            cache=ReportCache(scratch, max_bytes=0, max_age_seconds=0),
+            output_format=params.get("format") or "xlsx",
+        )
+        report = _report_name(name, filename)
+        os.replace(os.path.join(scratch, filename), os.path.join(out_dir, report))
+    except Exception as exc:  # one bad export must not stop the batch
+        status.update({"status": "error", "error": str(exc) or type(exc).__name__})
+        status["seconds"] = round(time.perf_counter() - started, 3)
+        return status, []
+    finally:
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    segment_rows = []
+    for segment in derived["segments"]:
+        metrics = segment.get("metrics") or {}
+        segment_rows.append(
+            {
+                "recording": name,
+                "i": segment.get("i"),
+                "onsetTime": segment.get("onsetTime"),
+                "peakTime": segment.get("peakTime"),
+                "emptyTime": segment.get("emptyTime"),
+                **{key: metrics.get(key) for key in SEGMENT_FIELDS[5:]},
+            }
+        )
+    status.update(
+        {
+            "samples": len(recording),
+            "peaks": len(peaks),
+            "segments": len(segment_rows),
+            "seconds": round(time.perf_counter() - started, 3),
+            "report": report,
+        }
+    )
+    return status, segment_rows
+
+
+def _write_csv(path: str, fields: List[str], rows: Iterable[Dict[str, Any]]) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def run_batch(paths: List[str], params: Params, out_dir: str, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Process ``paths`` on a process pool and write the combined tables.
+
+    Results are collected in input order, so the combined tables are stable
+    regardless of which worker finishes first.
+    """
+
+    os.makedirs(out_dir, exist_ok=True)
+    labels = _labels(paths)
+    workers = max(1, workers or os.cpu_count() or 1)
+    if workers == 1 or len(paths) <= 1:
+        results = [process_file(path, params, out_dir, label) for path, label in zip(paths, labels)]
+    else:
+        count = len(paths)
+        with ProcessPoolExecutor(max_workers=min(workers, count)) as pool:
+            results = list(pool.map(process_file, paths, [params] * count, [out_dir] * count, labels))
+
+    statuses = [status for status, _ in results]
+    _write_csv(os.path.join(out_dir, "recordings.csv"), RECORDING_FIELDS, statuses)
+    _write_csv(
+        os.path.join(out_dir, "segments.csv"),
+        SEGMENT_FIELDS,
+        (row for _, rows in results for row in rows),
+    )
+    return statuses
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="export files, directories or glob patterns")
+    parser.add_argument("--params", help="JSON file with peak, segment and report settings")
+    parser.add_argument("--out", default="batch_reports", help="output directory (default: batch_reports)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--format", dest="output_format", help="report format, overrides the params file")
+    parser.add_argument("--recursive", action="store_true", help="search directories recursively")
+    args = parser.parse_args(argv)
+
+    params: Params = {}
+    if args.params:
+        with open(args.params, "r", encoding="utf-8") as handle:
+            params = json.load(handle)
+        if not isinstance(params, dict):
+            parser.error("params file must contain a JSON object")
+    if args.output_format:
+        params["format"] = args.output_format
+    if params.get("experimentWindow") is not None and _experiment_window(params["experimentWindow"]) is None:
+        parser.error("experimentWindow must have numeric start and end")
+    formats = available_report_formats()
+    if (params.get("format") or "xlsx") not in formats:
+        parser.error(f"format must be one of: {', '.join(formats)}")
+
+    paths = collect_inputs(args.inputs, recursive=args.recursive)
+    if not paths:
+        parser.error("no .txt or .csv exports matched the given inputs")
+
+    started = time.perf_counter()
+    statuses = run_batch(paths, params, args.out, args.workers)
+    failed = [status for status in statuses if status["status"] != "ok"]
+    for status in failed:
+        print(f"{status['recording']}: {status['error']}", file=sys.stderr)
+    print(
+        f"Processed {len(statuses)} recordings ({len(failed)} failed) in "
+        f"{time.perf_counter() - started:.1f}s; results in {os.path.abspath(args.out)}"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
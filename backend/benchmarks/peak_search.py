@@ -0,0 +1,82 @@
+"""Compare peak-parameter search strategies on the bundled recordings.
+
+For each strategy this reports the mean best score reached over a range of
+expected peak counts, the number of ``find_peaks`` evaluations spent, and how
+many evaluations it took to first reach that score. Run from ``backend/``::
+
+    python -m benchmarks.peak_search [--budget 60] [--expected 3 6 9]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from typing import Dict, List, Optional
+
+from services.peak_search import STRATEGIES
+from services import peak_sweep, process_uploaded_data
+from services.peak_sweep import _rank_key
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DATASETS = ["testdata.txt", "testdata2.txt"]
+
+
+def _load(name: str):
+    with open(os.path.join(REPO_ROOT, name), "rb") as handle:
+        return process_uploaded_data(handle, name)
+
+
+def _trace(recording, expected: int, budget: int, strategy: str) -> Dict[str, object]:
+    """Run ``suggest_params`` while recording the score after every evaluation."""
+
+    scores: List[float] = []
+    original = peak_sweep.evaluate_candidates
+
+    def traced(*args, **kwargs):
+        results = original(*args, **kwargs)
+        scores.extend(_rank_key(result)[0] for result in results)
+        return results
+
+    peak_sweep.evaluate_candidates = traced
+    try:
+        started = time.perf_counter()
+        result = peak_sweep.suggest_params(recording, expected, budget, strategy=strategy)
+        elapsed = time.perf_counter() - started
+    finally:
+        peak_sweep.evaluate_candidates = original
+
+    best = result["best"]["score"]
+    to_best: Optional[int] = next((idx + 1 for idx, score in enumerate(scores) if score <= best), None)
+    return {"best": best, "evaluations": len(scores), "toBest": to_best, "seconds": elapsed}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=int, default=60)
+    parser.add_argument(
+        "--expected", type=int, nargs="*", default=list(range(3, 25, 3)), help="expected peak counts to try"
+    )
+    args = parser.parse_args(argv)
+
+    # The full default grid (96 points) is the reference every strategy is compared against.
+    runs = [("grid (full)", "grid", 10_000)] + [(name, name, args.budget) for name in STRATEGIES]
+
+    print(f"{'dataset':<15}{'strategy':<13}{'mean best':>10}{'mean evals':>12}{'mean to best':>14}{'ms':>9}")
+    for name in DATASETS:
+        recording = _load(name)
+        for label, strategy, budget in runs:
+            rows = [_trace(recording, expected, budget, strategy) for expected in args.expected]
+            count = len(rows)
+            to_best = [row["toBest"] for row in rows if row["toBest"] is not None]
+            print(
+                f"{name:<15}{label:<13}"
+                f"{sum(row['best'] for row in rows) / count:>10.3f}"
+                f"{sum(row['evaluations'] for row in rows) / count:>12.1f}"
+                f"{(sum(to_best) / len(to_best)) if to_best else 0:>14.1f}"
+                f"{sum(row['seconds'] for row in rows) * 1000 / count:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
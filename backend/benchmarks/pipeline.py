@@ -0,0 +1,280 @@
+"""Time and peak memory of each analysis stage, with stored baselines.
+
+Stages run on the bundled recordings and on synthetic recordings made by
+tiling ``testdata2.txt`` end to end (``--scales 10 100``). Each stage is
+timed as the best of ``--repeat`` runs, then run once more under
+``tracemalloc`` for its peak traced allocation. Run from ``backend/``::
+
+    python -m benchmarks.pipeline [--scales 1 10 100] [--stages parse derive] [--report-format csv]
+    python -m benchmarks.pipeline --save            # baselines/<git commit>.json
+    python -m benchmarks.pipeline --compare main    # diff against baselines/main.json
+    python -m benchmarks.pipeline --save main       # refresh the committed reference
+
+Baselines store each stage's time relative to a fixed calibration workload
+(``relative``) rather than in seconds, so a baseline recorded on one machine
+still means something on another, plus its peak memory. ``--compare`` flags
+stages whose relative time (or memory) grew by more than ``--threshold`` and
+exits non-zero when any did.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services import (
+    CONDITIONING_CACHE,
+    ReportCache,
+    Recording,
+    create_report,
+    derive_segments,
+    process_uploaded_data,
+    run_find_peaks,
+    suggest_params,
+    to_jsonable,
+)
+from services.json_sanitize import dumps
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+DATASETS = ["testdata.txt", "testdata2.txt"]
+SYNTHETIC_SOURCE = "testdata2.txt"
+PEAK_PARAMS = {"distance": 200, "prominence": 5}
+STAGES = ["parse", "find_peaks", "suggest", "derive", "to_jsonable", "dumps", "report"]
+
+
+def _read(name: str) -> bytes:
+    with open(os.path.join(REPO_ROOT, name), "rb") as handle:
+        return handle.read()
+
+
+def _export_bytes(recording: Recording) -> bytes:
+    """Serialise a recording in the instrument's tab-separated export layout."""
+
+    columns = recording.to_columns()
+    header = "\t".join(columns)
+    table = np.column_stack(list(columns.values()))
+    buffer = io.StringIO()
+    np.savetxt(buffer, table, delimiter="\t", fmt="%.10g", header=header, comments="")
+    return ("Synthetic recording\n" + buffer.getvalue()).encode("utf-8")
+
+
+def synthetic_export(scale: int) -> bytes:
+    """``testdata2.txt`` repeated ``scale`` times on one continuous time axis."""
+
+    base = process_uploaded_data(io.BytesIO(_read(SYNTHETIC_SOURCE)), SYNTHETIC_SOURCE)
+    step = float(np.median(np.diff(base.time))) if len(base) > 1 else 1.0
+    span = float(base.time[-1] - base.time[0]) + step
+    columns = {name: np.tile(values, scale) for name, values in base.to_columns().items()}
+    columns["Elapsed Time"] = np.concatenate([base.time + span * idx for idx in range(scale)])
+    return _export_bytes(Recording.from_columns(columns))
+
+
+def _datasets(scales: List[int]) -> List[Tuple[str, bytes]]:
+    datasets = []
+    if 1 in scales:
+        datasets.extend((name, _read(name)) for name in DATASETS)
+    datasets.extend((f"synthetic_x{scale}", synthetic_export(scale)) for scale in scales if scale > 1)
+    return datasets
+
+
+def _stages(raw: bytes, name: str, report_dir: str, report_format: str) -> Dict[str, Callable[[], object]]:
+    """Stage callables; each prepares its inputs once, outside the measured call."""
+
+    recording = process_uploaded_data(io.BytesIO(raw), name)
+    peaks = run_find_peaks(recording, PEAK_PARAMS)["peaks"]
+    derived = derive_segments(recording, peaks, {})
+    rows = recording.to_rows()
+
+    def derive():
+        CONDITIONING_CACHE.clear()  # measure the conditioning, not a cache hit
+        return derive_segments(recording, peaks, {})
+
+    def report():
+        # A fresh directory per call so the report cache never short-circuits.
+        cache = ReportCache(tempfile.mkdtemp(dir=report_dir), max_bytes=0, max_age_seconds=0)
+        return create_report(
+            recording,
+            peaks=peaks,
+            points=derived["points"],
+            segments=derived["segments"],
+            cache=cache,
+            output_format=report_format,
+        )
+
+    return {
+        "parse": lambda: process_uploaded_data(io.BytesIO(raw), name),
+        "find_peaks": lambda: run_find_peaks(recording, PEAK_PARAMS),
+        "suggest": lambda: suggest_params(recording, max(1, min(len(peaks), 24)), 60),
+        "derive": derive,
+        "to_jsonable": lambda: to_jsonable(rows),
+        "dumps": lambda: dumps(rows),
+        "report": report,
+    }
+
+
+def _best_time(fn: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def _calibration_workload() -> None:
+    """Fixed mix of NumPy and interpreter work that no change to the app affects."""
+
+    values = np.random.default_rng(0).random(1_000_000)
+    np.sort(values)
+    np.cumsum(values)
+    rows = [{"time": index * 0.25, "value": float(index % 97)} for index in range(100_000)]
+    json.dumps(rows)
+
+
+def calibrate(repeat: int) -> float:
+    """Best time of the calibration workload, the unit of ``relative`` timings."""
+
+    return _best_time(_calibration_workload, max(5, repeat))
+
+
+def _measure(fn: Callable[[], object], repeat: int, unit: float) -> Dict[str, float]:
+    seconds = _best_time(fn, repeat)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": seconds, "relative": seconds / unit, "peak_mb": peak / 1e6}
+
+
+def run(
+    scales: List[int], stages: List[str], repeat: int, report_format: str = "xlsx", unit: float = 1.0
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    with tempfile.TemporaryDirectory() as report_dir:
+        for name, raw in _datasets(scales):
+            available = _stages(raw, name, report_dir, report_format)
+            results[name] = {}
+            for stage in stages:
+                results[name][stage] = _measure(available[stage], repeat, unit)
+                row = results[name][stage]
+                print(
+                    f"{name:<18}{stage:<13}{row['seconds'] * 1000:>11.1f}{row['relative']:>11.3f}"
+                    f"{row['peak_mb']:>11.1f}",
+                    flush=True,
+                )
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict, results: Dict, threshold: float) -> List[str]:
+    """Lines describing stages slower or hungrier than ``baseline`` by ``threshold``."""
+
+    regressions = []
+    for name, stages in results.items():
+        for stage, row in stages.items():
+            before = baseline.get("results", {}).get(name, {}).get(stage)
+            if not before:
+                continue
+            for metric in ("relative", "peak_mb"):
+                if before.get(metric, 0) > 0 and row[metric] > before[metric] * (1 + threshold):
+                    regressions.append(
+                        f"{name} {stage} {metric}: {before[metric]:.4g} -> {row[metric]:.4g} "
+                        f"(+{(row[metric] / before[metric] - 1) * 100:.0f}%)"
+                    )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10], help="1 = bundled files, N = synthetic N x")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (best is kept)")
+    parser.add_argument("--report-format", default="xlsx", help="output format for the report stage")
+    parser.add_argument("--save", nargs="?", const="", help="store results as baselines/<name or commit>.json")
+    parser.add_argument("--compare", help="baseline name to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        baseline_path = os.path.join(BASELINE_DIR, f"{args.compare}.json")
+        if not os.path.exists(baseline_path):
+            names = os.listdir(BASELINE_DIR) if os.path.isdir(BASELINE_DIR) else []
+            saved = sorted(name[:-5] for name in names if name.endswith(".json"))
+            parser.error(
+                f"no baseline named {args.compare!r} (saved: {', '.join(saved) or 'none'}); "
+                f"record one with --save {args.compare}"
+            )
+        with open(baseline_path, "r", encoding="utf-8") as handle:
+            baseline = json.load(handle)
+
+    unit = calibrate(args.repeat)
+    print(f"Calibration workload: {unit * 1000:.1f} ms")
+    print(f"{'dataset':<18}{'stage':<13}{'ms':>11}{'relative':>11}{'peak MB':>11}")
+    results = run(args.scales, args.stages, max(1, args.repeat), args.report_format, unit)
+
+    status = 0
+    if baseline is not None:
+        regressions = compare(baseline, results, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if not regressions:
+            print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+        status = 1 if regressions else 0
+
+    if args.save is not None:
+        name = args.save or _git_commit() or time.strftime("%Y%m%d_%H%M%S")
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{name}.json")
+        # Raw seconds only describe this machine; the baseline keeps the
+        # relative timings and memory, and the host they were recorded on.
+        payload = {
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+            "report_format": args.report_format,
+            "results": {
+                name: {
+                    stage: {"relative": row["relative"], "peak_mb": row["peak_mb"]}
+                    for stage, row in stages.items()
+                }
+                for name, stages in results.items()
+            },
+        }
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, indent=2, sort_keys=True)
+        print(f"Saved {path}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,38 @@
 from .parsing import process_uploaded_data
+from .peak_search import STRATEGIES as SEARCH_STRATEGIES
 from .peak_sweep import suggest_params
 from .peaks import detect_peaks, run_find_peaks
-from .segments import derive_segments
-from .reporting import create_report
+from .segments import derive_segments, patch_segments
+from .downsampling import MODES as DOWNSAMPLE_MODES, downsample
+from .pyramid import PYRAMID_CACHE, query_range
+from .reporting import ReportCache, available_formats as available_report_formats, create_report
 from .json_sanitize import to_jsonable
+from .conditioning import CONDITIONING_CACHE
+from .recording import Recording
+from .session_store import SessionStore
+from .streaming import LiveStream, StreamRegistry
+from .jobs import JobQueue
 
 __all__ = [
     "process_uploaded_data",
+    "Recording",
+    "SessionStore",
+    "LiveStream",
+    "StreamRegistry",
+    "JobQueue",
     "detect_peaks",
     "run_find_peaks",
     "suggest_params",
+    "SEARCH_STRATEGIES",
     "create_report",
+    "ReportCache",
+    "available_report_formats",
     "derive_segments",
+    "patch_segments",
+    "downsample",
+    "DOWNSAMPLE_MODES",
+    "query_range",
+    "PYRAMID_CACHE",
     "to_jsonable",
+    "CONDITIONING_CACHE",
 ]
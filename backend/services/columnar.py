@@ -0,0 +1,174 @@
+"""Compact columnar wire formats for recordings.
+
+Two opt-in encodings replace the row-oriented ``{"Elapsed Time": ..}`` lists:
+
+``application/vnd.visio.columnar+json``
+    A JSON object whose series are parallel arrays:
+    ``{"time": [...], "pressure": [...], "scale": [...], "volume": [...]}``.
+    Missing scale and volume samples are ``null``; absent channels are
+    omitted. Time and pressure have no missing samples.
+
+``application/vnd.visio.columnar``
+    A binary frame: a little-endian ``uint32`` header length, a UTF-8 JSON
+    header padded with spaces to a multiple of eight bytes, then one
+    little-endian float64 block per column in header order. The header holds
+    ``columns`` (names), ``length`` (samples per column) and any other payload
+    fields. Missing scale and volume samples are NaN.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .recording import Recording, SERIES
+from .validation import ValidationError, sample_errors
+
+COLUMNAR_JSON = "application/vnd.visio.columnar+json"
+COLUMNAR_BINARY = "application/vnd.visio.columnar"
+
+_HEADER_LENGTH = struct.Struct("<I")
+_FLOAT = np.dtype("<f8")
+
+# wire name -> Recording attribute
+COLUMN_ATTRS = {"time": "time", **{name: attr for name, _, attr in SERIES}}
+
+# Columns that may not have missing (null/NaN) samples.
+REQUIRED_COLUMNS = ("time", "pressure")
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """Return the columnar media type requested by an ``Accept`` header, if any.
+
+    Only an explicit columnar type opts in; ``*/*`` and ``application/json``
+    keep the row-oriented JSON response.
+    """
+
+    if not accept:
+        return None
+    best: Tuple[float, Optional[str]] = (0.0, None)
+    for part in accept.split(","):
+        fields = [field.strip() for field in part.split(";")]
+        media = fields[0].lower()
+        if media not in (COLUMNAR_JSON, COLUMNAR_BINARY):
+            continue
+        quality = 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > best[0]:
+            best = (quality, media)
+    return best[1]
+
+
+def recording_columns(recording: Recording) -> Dict[str, np.ndarray]:
+    """Columns of ``recording`` keyed by wire name, skipping absent channels."""
+
+    columns = {}
+    for name, attr in COLUMN_ATTRS.items():
+        values = getattr(recording, attr)
+        if values is not None:
+            columns[name] = values
+    return columns
+
+
+def _json_list(values: np.ndarray) -> list:
+    items = values.tolist()
+    if np.isnan(values).any():
+        return [None if item != item else item for item in items]
+    return items
+
+
+def to_columnar_json(recording: Recording) -> Dict[str, list]:
+    return {name: _json_list(values) for name, values in recording_columns(recording).items()}
+
+
+def recording_from_columns(columns: Any) -> Recording:
+    """Build a recording from ``{"time": [...], "pressure": [...], ...}``.
+
+    Like the row payload, samples are taken in the order given. Raises
+    ``ValueError`` when the object is malformed or the columns differ in
+    length, and :class:`~services.validation.ValidationError` with row-level
+    details for missing time or pressure samples and non-finite values.
+    """
+
+    if not isinstance(columns, dict):
+        raise ValueError("columns must be an object")
+    unknown = set(columns) - set(COLUMN_ATTRS)
+    if unknown:
+        raise ValueError(f"Unknown column: {sorted(unknown)[0]}")
+    if "time" not in columns or "pressure" not in columns:
+        raise ValueError("columns must include time and pressure")
+
+    arrays = {}
+    for name, values in columns.items():
+        if values is None:
+            continue
+        if isinstance(values, np.ndarray):
+            arrays[COLUMN_ATTRS[name]] = values
+            continue
+        if not isinstance(values, list):
+            raise ValueError(f"{name} must be an array")
+        try:
+            arrays[COLUMN_ATTRS[name]] = np.array(
+                [np.nan if value is None else value for value in values], dtype=np.float64
+            )
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must contain only numbers or null") from None
+
+    for name, attr in COLUMN_ATTRS.items():
+        if attr in arrays:
+            details = sample_errors(arrays[attr], name, nullable=name not in REQUIRED_COLUMNS)
+            if details:
+                raise ValidationError(f"{name} contains invalid samples", details, series=name)
+    try:
+        return Recording(**arrays)
+    except ValueError:
+        raise ValueError("columns must all have the same length") from None
+
+
+def encode_frame(columns: Dict[str, np.ndarray], header: Optional[Dict[str, Any]] = None) -> bytes:
+    """Pack float columns and a JSON header into one binary frame."""
+
+    names = list(columns)
+    length = len(next(iter(columns.values()))) if columns else 0
+    meta = dict(header or {})
+    meta.update({"columns": names, "length": length})
+    encoded = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    encoded += b" " * (-(_HEADER_LENGTH.size + len(encoded)) % 8)
+    parts: Iterable[bytes] = (
+        np.ascontiguousarray(columns[name], dtype=_FLOAT).tobytes() for name in names
+    )
+    return _HEADER_LENGTH.pack(len(encoded)) + encoded + b"".join(parts)
+
+
+def decode_frame(frame: bytes) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Inverse of :func:`encode_frame`; returns ``(header, columns)``."""
+
+    if len(frame) < _HEADER_LENGTH.size:
+        raise ValueError("Columnar frame is truncated")
+    (header_length,) = _HEADER_LENGTH.unpack_from(frame)
+    start = _HEADER_LENGTH.size + header_length
+    try:
+        header = json.loads(frame[_HEADER_LENGTH.size : start].decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("Columnar frame header is not valid JSON") from None
+    if not isinstance(header, dict):
+        raise ValueError("Columnar frame header must be an object")
+
+    names: Sequence[str] = header.pop("columns", [])
+    length = header.pop("length", 0)
+    if not isinstance(names, list) or not isinstance(length, int) or length < 0:
+        raise ValueError("Columnar frame header is malformed")
+    if len(frame) != start + len(names) * length * _FLOAT.itemsize:
+        raise ValueError("Columnar frame size does not match its header")
+
+    data = np.frombuffer(frame, dtype=_FLOAT, offset=start).astype(np.float64)
+    columns = {name: data[idx * length : (idx + 1) * length] for idx, name in enumerate(names)}
+    return header, columns
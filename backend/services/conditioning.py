@@ -0,0 +1,232 @@
+"""Vectorised signal conditioning used by segment derivation.
+
+These functions reproduce the pure-Python reference implementations in
+``segments`` (``_median_filter``, ``_moving_average_by_time`` and
+``_derivative``) sample for sample, but run in NumPy. Timestamps are expected
+to be sorted ascending, as produced by ``process_uploaded_data``.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .recording import Recording
+from .timing import timed
+
+ConditionKey = Tuple[str, int, float, float]
+
+
+def _as_array(values: Sequence[float]) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def median_filter(values: Sequence[float], kernel: int) -> np.ndarray:
+    """Centred running median; windows are truncated (not padded) at the edges."""
+
+    values = _as_array(values)
+    if kernel <= 1 or kernel % 2 == 0:
+        kernel = max(1, kernel | 1)
+    half = kernel // 2
+    n = values.size
+    if n == 0 or kernel == 1:
+        return values.copy()
+
+    result = np.empty(n, dtype=np.float64)
+    if n >= kernel:
+        result[half : n - half] = np.median(sliding_window_view(values, kernel), axis=1)
+        edges = list(range(half)) + list(range(n - half, n))
+    else:
+        edges = list(range(n))
+    for idx in edges:
+        result[idx] = np.median(values[max(0, idx - half) : min(n, idx + half + 1)])
+    return result
+
+
+def moving_average_by_time(times: Sequence[float], values: Sequence[float], window_sec: float) -> np.ndarray:
+    """Mean of all samples within ``window_sec / 2`` of each timestamp."""
+
+    times = _as_array(times)
+    values = _as_array(values)
+    if not values.size or window_sec <= 0:
+        return values.copy()
+
+    n = times.size
+    half_window = window_sec / 2
+    positions = np.arange(n)
+
+    # First index whose distance to t is within the half window.
+    start = np.minimum(np.searchsorted(times, times - half_window, side="left"), positions)
+    while True:
+        back = (start > 0) & (times - times[np.maximum(start - 1, 0)] <= half_window)
+        if not back.any():
+            break
+        start = start - back
+    while True:
+        forward = (start < n) & (times - times[np.minimum(start, n - 1)] > half_window)
+        if not forward.any():
+            break
+        start = start + forward
+
+    # Last index whose distance to t is within the half window.
+    end = np.maximum(np.searchsorted(times, times + half_window, side="right") - 1, positions)
+    while True:
+        back = (end > positions) & (times[end] - times > half_window)
+        if not back.any():
+            break
+        end = end - back
+    while True:
+        forward = (end + 1 < n) & (times[np.minimum(end + 1, n - 1)] - times <= half_window)
+        if not forward.any():
+            break
+        end = end + forward
+
+    prefix = np.empty(n + 1, dtype=np.float64)
+    prefix[0] = 0.0
+    np.cumsum(values, out=prefix[1:])
+    total = prefix[end + 1] - prefix[start]
+    count = np.maximum(1, end - start + 1)
+    return total / count
+
+
+def derivative(times: Sequence[float], values: Sequence[float], window_sec: float) -> np.ndarray:
+    """Central difference across a ``window_sec`` span around each sample."""
+
+    times = _as_array(times)
+    values = _as_array(values)
+    n = times.size
+    if n < 2:
+        return np.zeros(n, dtype=np.float64)
+    if window_sec <= 0:
+        window_sec = times[-1] - times[0]
+    half = window_sec / 2
+    positions = np.arange(n)
+
+    # Largest index <= idx with t - times[prev] >= half (or 0).
+    prev = np.clip(np.searchsorted(times, times - half, side="right") - 1, 0, positions)
+    while True:
+        back = (prev > 0) & (times - times[prev] < half)
+        if not back.any():
+            break
+        prev = prev - back
+    while True:
+        candidate = np.minimum(prev + 1, positions)
+        forward = (candidate > prev) & (times - times[candidate] >= half)
+        if not forward.any():
+            break
+        prev = prev + forward
+
+    # Smallest index >= idx with times[next] - t >= half (or n - 1).
+    nxt = np.clip(np.searchsorted(times, times + half, side="left"), positions, n - 1)
+    while True:
+        forward = (nxt + 1 < n) & (times[nxt] - times < half)
+        if not forward.any():
+            break
+        nxt = nxt + forward
+    while True:
+        candidate = np.maximum(nxt - 1, positions)
+        back = (candidate < nxt) & (times[candidate] - times >= half)
+        if not back.any():
+            break
+        nxt = nxt - back
+
+    same = prev == nxt
+    first = same & (positions == 0)
+    last = same & (positions == n - 1)
+    prev[first], nxt[first] = 0, 1
+    prev[last], nxt[last] = n - 2, n - 1
+
+    delta_t = times[nxt] - times[prev]
+    delta_v = values[nxt] - values[prev]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        deriv = np.where(delta_t > 0, delta_v / np.where(delta_t > 0, delta_t, 1.0), 0.0)
+    return deriv
+
+
+@timed("condition")
+def condition_signal(
+    times: Sequence[float],
+    values: Sequence[float],
+    median_kernel: int,
+    ma_window_sec: float,
+    derivative_window_sec: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Median filter, time-based moving average and windowed derivative in one pass."""
+
+    times = _as_array(times)
+    smoothed = moving_average_by_time(times, median_filter(values, median_kernel), ma_window_sec)
+    return smoothed, derivative(times, smoothed, derivative_window_sec)
+
+
+class ConditioningCache:
+    """Bounded LRU cache of conditioned (smoothed, derivative) arrays.
+
+    Entries are keyed by the recording fingerprint plus the three parameters
+    that affect conditioning, so threshold-only changes reuse the arrays.
+    """
+
+    def __init__(self, max_entries: int = 16) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self._entries: "OrderedDict[ConditionKey, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: ConditionKey) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached
+
+    def put(self, key: ConditionKey, value: Tuple[np.ndarray, np.ndarray]) -> None:
+        if not self.max_entries:
+            return
+        for array in value:
+            array.setflags(write=False)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+CONDITIONING_CACHE = ConditioningCache()
+
+
+def conditioned(
+    recording: Recording,
+    median_kernel: int,
+    ma_window_sec: float,
+    derivative_window_sec: float,
+    cache: Optional[ConditioningCache] = CONDITIONING_CACHE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Memoised :func:`condition_signal` for the pressure channel of ``recording``."""
+
+    key = (recording.fingerprint, int(median_kernel), float(ma_window_sec), float(derivative_window_sec))
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    result = condition_signal(
+        recording.time, recording.pressure, median_kernel, ma_window_sec, derivative_window_sec
+    )
+    if cache is not None:
+        cache.put(key, result)
+    return result
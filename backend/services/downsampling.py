@@ -0,0 +1,156 @@
+"""Reduce recording channels to a chart-sized number of samples.
+
+Two modes pick about ``points`` samples from a time window of a channel:
+
+``minmax``
+    Splits the window into equal-width time buckets (one per pair of output
+    points) and keeps the lowest and highest sample of each, so spikes stay
+    visible at any zoom level.
+``lttb``
+    Largest-Triangle-Three-Buckets: splits the samples into equal-count
+    buckets and keeps, per bucket, the sample forming the largest triangle
+    with the previous pick and the next bucket's mean, which preserves the
+    visual shape of the trace.
+
+Both select real samples (no averaging), always keep the first and last
+sample of the window and skip NaN values. Timestamps are expected to be
+sorted ascending, as produced by ``process_uploaded_data``.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .recording import SERIES, Recording
+from .timing import timed
+
+MODES = ("lttb", "minmax")
+
+
+def window_slice(times: np.ndarray, start: Optional[float], end: Optional[float]) -> slice:
+    """Samples within ``[start, end]`` plus one on each side, so lines reach the edges."""
+
+    lo = 0 if start is None else max(0, int(np.searchsorted(times, start, side="left")) - 1)
+    hi = times.size if end is None else min(times.size, int(np.searchsorted(times, end, side="right")) + 1)
+    return slice(lo, max(lo, hi))
+
+
+def _first_in_buckets(mask: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    # Every bucket holds at least one True (its own extreme value).
+    hits = np.flatnonzero(mask)
+    return hits[np.searchsorted(hits, starts)]
+
+
+def minmax_indices(times: np.ndarray, values: np.ndarray, points: int) -> np.ndarray:
+    """Indices of the per-bucket minimum and maximum, in time order."""
+
+    count = times.size
+    buckets = max(1, (points - 2) // 2)
+    if count <= points or count < 3:
+        return np.arange(count)
+
+    span = times[-1] - times[0]
+    if span > 0:
+        bucket = np.minimum(((times - times[0]) * (buckets / span)).astype(np.intp), buckets - 1)
+    else:
+        bucket = np.arange(count) * buckets // count
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    counts = np.diff(np.r_[starts, count])
+
+    lows = np.minimum.reduceat(values, starts)
+    highs = np.maximum.reduceat(values, starts)
+    low_index = _first_in_buckets(values == np.repeat(lows, counts), starts)
+    high_index = _first_in_buckets(values == np.repeat(highs, counts), starts)
+    return np.unique(np.concatenate(([0, count - 1], low_index, high_index)))
+
+
+def lttb_indices(times: np.ndarray, values: np.ndarray, points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets selection of ``points`` indices."""
+
+    count = times.size
+    if count <= points or points < 3:
+        return np.arange(count)
+
+    # points - 2 buckets over the interior samples 1 .. count - 2; the spacing
+    # is above one sample, so every bucket is non-empty.
+    edges = np.linspace(1, count - 1, points - 1).astype(np.intp)
+    starts = edges[:-1]
+    sizes = np.diff(edges)
+    mean_time = np.add.reduceat(times[: count - 1], starts) / sizes
+    mean_value = np.add.reduceat(values[: count - 1], starts) / sizes
+    mean_time = np.append(mean_time[1:], times[-1])
+    mean_value = np.append(mean_value[1:], values[-1])
+
+    picked = np.empty(points, dtype=np.intp)
+    picked[0], picked[-1] = 0, count - 1
+    anchor = 0
+    for bucket in range(points - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        anchor_time, anchor_value = times[anchor], values[anchor]
+        area = np.abs(
+            (anchor_time - mean_time[bucket]) * (values[lo:hi] - anchor_value)
+            - (anchor_time - times[lo:hi]) * (mean_value[bucket] - anchor_value)
+        )
+        anchor = lo + int(np.argmax(area))
+        picked[bucket + 1] = anchor
+    return picked
+
+
+SELECTORS: Dict[str, Callable[[np.ndarray, np.ndarray, int], np.ndarray]] = {
+    "lttb": lttb_indices,
+    "minmax": minmax_indices,
+}
+
+
+def downsample_channel(
+    times: np.ndarray,
+    values: np.ndarray,
+    points: int,
+    mode: str = "lttb",
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Return (times, values, samples in window) for one channel."""
+
+    if mode not in SELECTORS:
+        raise ValueError(f"Unknown downsampling mode: {mode}")
+    window = window_slice(times, start, end)
+    times, values = times[window], values[window]
+    finite = np.isfinite(values)
+    if not finite.all():
+        times, values = times[finite], values[finite]
+    picked = SELECTORS[mode](times, values, points)
+    return times[picked], values[picked], int(times.size)
+
+
+@timed("downsample")
+def downsample(
+    recording: Recording,
+    points: int,
+    mode: str = "lttb",
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    series: Optional[Sequence[str]] = None,
+) -> Dict[str, object]:
+    """Downsample the requested channels (default: all present) of ``recording``.
+
+    Each channel in the result carries ``time`` and ``value`` lists and
+    ``total``, the number of non-NaN samples in the window before reduction.
+    """
+
+    names = [name for name, _, _ in SERIES]
+    wanted = list(series) if series is not None else names
+    unknown = [name for name in wanted if name not in names]
+    if unknown:
+        raise ValueError(f"Unknown series: {unknown[0]}")
+
+    result: Dict[str, object] = {}
+    for name, _, attr in SERIES:
+        values = getattr(recording, attr)
+        if name not in wanted or values is None:
+            continue
+        times, picked, total = downsample_channel(recording.time, values, points, mode, start, end)
+        result[name] = {"time": times.tolist(), "value": picked.tolist(), "total": total}
+    return {"mode": mode, "points": points, "start": start, "end": end, "series": result}
@@ -0,0 +1,88 @@
+"""Select kept intervals and the experiment window of a recording by index.
+
+Timestamps are sorted ascending, so every time interval maps to one
+contiguous index range found with two binary searches. A selection that
+resolves to a single range (the usual experiment window, or one kept
+interval) is returned as zero-copy views of the original columns; several
+disjoint ranges are gathered with one concatenation per column. Bounds are
+inclusive, matching ``filterRowsByIntervals``/``filterByWindow`` in the
+frontend.
+"""
+
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .recording import SERIES, Recording
+from .timing import timed
+
+Interval = Tuple[float, float]
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sort intervals, swap reversed bounds and merge overlapping or touching ones."""
+
+    merged: List[Interval] = []
+    for start, end in sorted((min(a, b), max(a, b)) for a, b in intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def index_ranges(
+    times: np.ndarray, intervals: Optional[Sequence[Interval]] = None, window: Optional[Interval] = None
+) -> List[Tuple[int, int]]:
+    """Half-open index ranges of the samples inside ``intervals`` and ``window``.
+
+    ``None`` or an empty interval list keeps every sample.
+    """
+
+    spans = merge_intervals(intervals) if intervals else [(-np.inf, np.inf)]
+    if window is not None:
+        low, high = min(window), max(window)
+        spans = [(max(start, low), min(end, high)) for start, end in spans if start <= high and end >= low]
+    if not spans:
+        return []
+    bounds = np.asarray(spans, dtype=np.float64)
+    starts = np.searchsorted(times, bounds[:, 0], side="left")
+    ends = np.searchsorted(times, bounds[:, 1], side="right")
+    return [(int(lo), int(hi)) for lo, hi in zip(starts, ends) if hi > lo]
+
+
+@timed("select")
+def select(
+    recording: Recording, intervals: Optional[Sequence[Interval]] = None, window: Optional[Interval] = None
+) -> Recording:
+    """Recording restricted to the kept ``intervals`` within ``window``.
+
+    Returns ``recording`` itself when nothing is removed.
+    """
+
+    ranges = index_ranges(recording.time, intervals, window)
+    if ranges == [(0, len(recording))]:
+        return recording
+
+    def take(values: np.ndarray) -> np.ndarray:
+        if len(ranges) == 1:
+            return values[ranges[0][0] : ranges[0][1]]  # basic slicing: a view, no copy
+        if not ranges:
+            return values[:0]
+        return np.concatenate([values[lo:hi] for lo, hi in ranges])
+
+    columns = {"time": take(recording.time)}
+    for _, _, attr in SERIES:
+        values = getattr(recording, attr)
+        columns[attr] = take(values) if values is not None else None
+
+    annotations = recording.annotations
+    if annotations:
+        edges = [(recording.time[lo], recording.time[hi - 1]) for lo, hi in ranges]
+        annotations = [
+            entry for entry in annotations if any(start <= entry["time"] <= end for start, end in edges)
+        ]
+    return replace(recording, annotations=annotations, **columns)
@@ -0,0 +1,123 @@
+"""In-process background job queue with progress reporting.
+
+Jobs run on a thread pool owned by the queue; there is no external broker,
+so job state lives only as long as the process. Finished jobs are kept for
+``ttl_seconds`` (and at most ``max_jobs`` are tracked) so clients can poll
+for the result. At most ``max_pending`` jobs may be queued or running at
+once; ``submit`` refuses more.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+Progress = Callable[[float], None]
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    __slots__ = ("id", "status", "progress", "result", "error", "created", "finished")
+
+    def __init__(self) -> None:
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.progress = 0.0
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created = time.monotonic()
+        self.finished: Optional[float] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "jobId": self.id,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """Run callables on a bounded thread pool and track their progress.
+
+    ``submit(fn, *args, **kwargs)`` calls ``fn(*args, progress=callback,
+    **kwargs)`` on a worker thread, where ``callback(fraction)`` records
+    progress in ``[0, 1]``. Exceptions mark the job failed with their message.
+    """
+
+    def __init__(
+        self, max_workers: int = 2, max_jobs: int = 256, ttl_seconds: float = 3600, max_pending: int = 32
+    ) -> None:
+        self.max_jobs = max(1, int(max_jobs))
+        self.max_pending = max(1, int(max_pending))
+        self.ttl_seconds = float(ttl_seconds)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Job:
+        """Queue ``fn``; raises ``RuntimeError`` when ``max_pending`` jobs are unfinished."""
+
+        job = Job()
+        with self._lock:
+            self._prune_locked()
+            if self._pending_locked() >= self.max_pending:
+                raise RuntimeError("Too many pending jobs")
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._prune_locked()
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job is not None else None
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        def progress(fraction: float) -> None:
+            job.progress = min(1.0, max(job.progress, float(fraction)))
+
+        job.status = RUNNING
+        try:
+            result = fn(*args, progress=progress, **kwargs)
+        except Exception as exc:  # reported to the client through the job status
+            job.error = str(exc) or type(exc).__name__
+            job.status = FAILED
+        else:
+            job.result = result
+            job.progress = 1.0
+            job.status = DONE
+        job.finished = time.monotonic()
+
+    def _prune_locked(self) -> None:
+        if self.ttl_seconds > 0:
+            cutoff = time.monotonic() - self.ttl_seconds
+            expired = [
+                key for key, job in self._jobs.items() if job.finished is not None and job.finished < cutoff
+            ]
+            for key in expired:
+                del self._jobs[key]
+        # Drop the oldest finished jobs first; running ones are never evicted.
+        for key in [key for key, job in self._jobs.items() if job.finished is not None]:
+            if len(self._jobs) < self.max_jobs:
+                break
+            del self._jobs[key]
+
+    def _pending_locked(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.finished is None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._jobs)
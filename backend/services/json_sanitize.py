@@ -2,20 +2,77 @@
 
 from __future__ import annotations
 
-from typing import Any
+import json
+import math
+from typing import Any, Callable, Dict
 
 import numpy as np
 import pandas as pd
 
+try:  # Optional dependency: native encoder with numpy support
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - fall back to the stdlib encoder
+    orjson = None
+
+_NATIVE = (str, int, float, bool, type(None))
+_NATIVE_TYPES = frozenset(_NATIVE)
+
+
+def _convert_ndarray(array: np.ndarray) -> Any:
+    # tolist() already yields native Python scalars for every non-object dtype.
+    if array.dtype.kind == "O":
+        return [to_jsonable(item) for item in array.tolist()]
+    return array.tolist()
+
+
+def _convert_list(items) -> Any:
+    if all(type(item) in _NATIVE_TYPES for item in items):
+        return list(items)
+    return [to_jsonable(item) for item in items]
+
+
+def _convert_dict(mapping: dict) -> Any:
+    if all(type(value) in _NATIVE_TYPES for value in mapping.values()):
+        return dict(mapping)
+    return {key: to_jsonable(value) for key, value in mapping.items()}
+
+
+# Exact-type dispatch; subclasses fall through to the isinstance checks below.
+_CONVERTERS: Dict[type, Callable[[Any], Any]] = {
+    dict: _convert_dict,
+    list: _convert_list,
+    tuple: _convert_list,
+    np.ndarray: _convert_ndarray,
+    np.float64: float,
+    np.float32: float,
+    np.int64: int,
+    np.int32: int,
+    np.bool_: bool,
+    pd.Timestamp: pd.Timestamp.isoformat,
+}
+
 
 def to_jsonable(obj: Any) -> Any:
-    """Recursively convert common numpy/pandas scalars to native JSONable types."""
+    """Recursively convert common numpy/pandas scalars to native JSONable types.
+
+    Containers are always returned as new objects, never the caller's own;
+    those that already hold only native scalars are copied in one step
+    rather than rebuilt item by item.
+    """
+
+    obj_type = type(obj)
+    if obj_type in _NATIVE_TYPES:
+        return obj
+
+    converter = _CONVERTERS.get(obj_type)
+    if converter is not None:
+        return converter(obj)
 
     if isinstance(obj, dict):
-        return {key: to_jsonable(value) for key, value in obj.items()}
+        return _convert_dict(obj)
 
     if isinstance(obj, (list, tuple)):
-        return [to_jsonable(item) for item in obj]
+        return _convert_list(obj)
 
     if isinstance(obj, np.integer):
         return int(obj)
@@ -27,9 +84,71 @@ def to_jsonable(obj: Any) -> Any:
         return bool(obj)
 
     if isinstance(obj, np.ndarray):
-        return [to_jsonable(item) for item in obj.tolist()]
+        return _convert_ndarray(obj)
 
     if isinstance(obj, pd.Timestamp):
         return obj.isoformat()
 
     return obj
+
+
+def json_default(obj: Any) -> Any:
+    """``default`` hook for JSON encoders: handles numpy/pandas values only."""
+
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return _convert_ndarray(obj)
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _null_non_finite(obj: Any) -> Any:
+    """Copy of a JSONable ``obj`` with NaN and infinities replaced by ``None``."""
+
+    if type(obj) is float:
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _null_non_finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_null_non_finite(item) for item in obj]
+    return obj
+
+
+def dumps(
+    obj: Any,
+    default: Callable[[Any], Any] = json_default,
+    sort_keys: bool = True,
+    indent: bool = False,
+) -> str:
+    """Serialize ``obj`` in one pass, converting numpy values on the fly.
+
+    Uses orjson when it is installed, otherwise the stdlib encoder with
+    :func:`json_default`. Either way NaN and infinities are written as
+    ``null``; the stdlib path only converts the payload when it has to.
+    """
+
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option).decode("utf-8")
+    kwargs = {
+        "sort_keys": sort_keys,
+        "indent": 2 if indent else None,
+        "separators": None if indent else (",", ":"),
+        "allow_nan": False,
+    }
+    try:
+        return json.dumps(obj, default=default, **kwargs)
+    except ValueError as exc:
+        if "JSON compliant" not in str(exc):  # not a NaN/inf, e.g. a circular reference
+            raise
+    return json.dumps(
+        _null_non_finite(to_jsonable(obj)),
+        default=lambda value: _null_non_finite(to_jsonable(default(value))),
+        **kwargs,
+    )
@@ -1,60 +1,157 @@
 import io
-from typing import Dict, List
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+from .recording import Recording
+from .timing import timed
+
 REQUIRED_COLUMNS = ["Elapsed Time", "Scale", "Tot Infused Vol", "Bladder Pressure"]
+# Optional columns kept as sparse annotations when requested.
+ANNOTATION_COLUMNS = ["Event", "Comments"]
+
+# The header must appear within this many lines of the start of the file.
+HEADER_SEARCH_LINES = 50
+# Rows parsed per pandas chunk; bounds the transient memory used while parsing.
+CHUNK_ROWS = 200_000
+
+
+def _text_stream(file_stream) -> Tuple[io.TextIOBase, bool]:
+    """Return a text view of ``file_stream`` and whether it was wrapped here."""
+
+    if isinstance(file_stream, io.TextIOBase):
+        return file_stream, False
+    return io.TextIOWrapper(file_stream, encoding="utf-8", errors="replace"), True
+
 
+def _header_columns(line: str, delimiter: str) -> Optional[List[str]]:
+    columns = [col.strip() for col in line.split(delimiter)]
+    if all(required in columns for required in REQUIRED_COLUMNS):
+        return columns
+    return None
 
-def _decode_stream(file_stream) -> str:
-    content = file_stream.read()
-    if isinstance(content, bytes):
-        content = content.decode("utf-8", errors="replace")
-    return content
 
+def _sniff_header(text: io.TextIOBase, delimiter: str) -> List[str]:
+    """Consume lines up to and including the header row and return its column names.
 
-def _find_header_index(lines: List[str], delimiter: str) -> int:
-    for idx, line in enumerate(lines[:50]):
-        columns = [col.strip() for col in line.split(delimiter)]
-        if all(required in columns for required in REQUIRED_COLUMNS):
-            return idx
+    Only the preamble is read, so the stream is left positioned at the first
+    data row.
+    """
+
+    seen_content = False
+    for _ in range(HEADER_SEARCH_LINES):
+        line = text.readline()
+        if not line:
+            break
+        seen_content = seen_content or bool(line.strip())
+        columns = _header_columns(line.rstrip("\r\n"), delimiter)
+        if columns is not None:
+            return columns
+
+    if not seen_content:
+        raise ValueError("Uploaded file is empty")
     raise ValueError(
         "Could not locate header row with required columns: " + ", ".join(REQUIRED_COLUMNS)
     )
 
 
-def process_uploaded_data(file_stream, filename: str) -> Dict[str, List[Dict[str, float]]]:
-    delimiter = "," if filename.lower().endswith(".csv") else "\t"
+def _numeric_column(series: pd.Series) -> np.ndarray:
+    # The C parser already yields float64/int64 for clean numeric columns;
+    # only fall back to element-wise coercion when a chunk has stray text.
+    if series.dtype.kind in "fiu":
+        return series.to_numpy(dtype=np.float64)
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
 
-    content = _decode_stream(file_stream)
-    if not content.strip():
-        raise ValueError("Uploaded file is empty")
 
-    lines = content.splitlines()
-    header_index = _find_header_index(lines, delimiter)
+def _text_column(series: pd.Series) -> np.ndarray:
+    return series.astype(object).where(series.notna(), "").to_numpy(dtype=object)
 
-    df = pd.read_csv(
-        io.StringIO(content),
-        delimiter=delimiter,
-        skiprows=header_index,
-        header=0,
-    )
 
-    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
-    if missing_columns:
-        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+def _sparse_annotations(
+    times: np.ndarray, events: Optional[np.ndarray], comments: Optional[np.ndarray]
+) -> List[Dict[str, object]]:
+    """Rows carrying a non-zero Event or a non-blank comment."""
+
+    flagged = np.zeros(times.shape, dtype=bool)
+    if events is not None:
+        flagged |= ~np.isnan(events) & (events != 0)
+    if comments is not None:
+        flagged |= np.array([bool(str(comment).strip()) for comment in comments], dtype=bool)
+
+    annotations: List[Dict[str, object]] = []
+    for idx in np.flatnonzero(flagged).tolist():
+        event = float(events[idx]) if events is not None and events[idx] == events[idx] else None
+        comment = str(comments[idx]).strip() if comments is not None else ""
+        annotations.append({"time": float(times[idx]), "event": event, "comment": comment or None})
+    return annotations
 
-    for column in REQUIRED_COLUMNS:
-        df[column] = pd.to_numeric(df[column], errors="coerce")
 
-    df = df.dropna(subset=["Elapsed Time"])
-    df = df.sort_values(by="Elapsed Time", ascending=True)
+@timed("parse")
+def process_uploaded_data(file_stream, filename: str, include_annotations: bool = False) -> Recording:
+    """Parse an instrument export into a :class:`Recording`.
+
+    Only the required columns are parsed. With ``include_annotations`` the
+    ``Event`` and ``Comments`` columns are read too and kept as a sparse list
+    of the rows that carry an event or a comment.
+    """
+
+    delimiter = "," if filename.lower().endswith(".csv") else "\t"
 
-    return {
-        "scale": df[["Elapsed Time", "Scale"]].replace({np.nan: None}).to_dict(orient="records"),
-        "volume": df[["Elapsed Time", "Tot Infused Vol"]].replace({np.nan: None}).to_dict(orient="records"),
-        "pressure": df[["Elapsed Time", "Bladder Pressure"]]
-        .replace({np.nan: None})
-        .to_dict(orient="records"),
+    text, wrapped = _text_stream(file_stream)
+    try:
+        header = _sniff_header(text, delimiter)
+
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in header]
+        if missing_columns:
+            raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+
+        annotation_columns = (
+            [col for col in ANNOTATION_COLUMNS if col in header] if include_annotations else []
+        )
+        usecols = REQUIRED_COLUMNS + annotation_columns
+        chunks: Dict[str, List[np.ndarray]] = {column: [] for column in usecols}
+        reader = pd.read_csv(
+            text,
+            delimiter=delimiter,
+            header=None,
+            names=header,
+            usecols=usecols,
+            dtype={"Comments": object} if "Comments" in annotation_columns else None,
+            engine="c",
+            chunksize=CHUNK_ROWS,
+        )
+        try:
+            for frame in reader:
+                for column in usecols:
+                    if column == "Comments":
+                        chunks[column].append(_text_column(frame[column]))
+                    else:
+                        chunks[column].append(_numeric_column(frame[column]))
+        except pd.errors.EmptyDataError:
+            pass
+    finally:
+        if wrapped:
+            text.detach()
+
+    columns = {
+        column: np.concatenate(parts)
+        if parts
+        else np.empty(0, dtype=object if column == "Comments" else np.float64)
+        for column, parts in chunks.items()
     }
+
+    keep = ~np.isnan(columns["Elapsed Time"])
+    if not keep.all():
+        columns = {column: values[keep] for column, values in columns.items()}
+    order = np.argsort(columns["Elapsed Time"], kind="quicksort")
+    columns = {column: values[order] for column, values in columns.items()}
+
+    recording = Recording.from_columns({column: columns[column] for column in REQUIRED_COLUMNS})
+    if include_annotations:
+        annotations = _sparse_annotations(
+            columns["Elapsed Time"], columns.get("Event"), columns.get("Comments")
+        )
+        recording = replace(recording, annotations=annotations)
+    return recording
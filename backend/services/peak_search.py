@@ -0,0 +1,141 @@
+"""Search strategies for the peak parameter sweep.
+
+A strategy walks a :class:`SearchSpace` (a lattice of distance, prominence
+and height candidates) and asks an evaluator to score lattice points until
+its budget is spent. ``grid`` reproduces the original nested-loop sweep,
+``random`` samples the lattice uniformly and ``refine`` does coarse-to-fine
+successive halving around the best points found so far.
+"""
+
+from __future__ import annotations
+
+import itertools
+import random
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+Point = Tuple[int, int, int]
+RankKey = Tuple[float, int, int]
+
+
+class SearchSpace:
+    """Lattice of candidate values for ``distance``, ``prominence`` and ``height``."""
+
+    def __init__(
+        self,
+        distances: Sequence[int],
+        prominences: Sequence[Optional[float]],
+        heights: Sequence[Optional[float]],
+    ) -> None:
+        self.axes = (list(distances) or [1], list(prominences) or [None], list(heights) or [None])
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return tuple(len(axis) for axis in self.axes)  # type: ignore[return-value]
+
+    def __len__(self) -> int:
+        distances, prominences, heights = self.shape
+        return distances * prominences * heights
+
+    def points(self) -> List[Point]:
+        return list(itertools.product(*(range(size) for size in self.shape)))
+
+    def params(self, point: Point) -> Dict[str, Optional[float]]:
+        return {
+            "distance": self.axes[0][point[0]],
+            "prominence": self.axes[1][point[1]],
+            "height": self.axes[2][point[2]],
+        }
+
+
+class Evaluator:
+    """Budgeted, memoised scorer handed to strategies.
+
+    ``score_fn`` receives a batch of parameter dicts and returns one rank key
+    per entry (lower is better). Points already scored are not re-evaluated.
+    """
+
+    def __init__(
+        self,
+        space: SearchSpace,
+        score_fn: Callable[[List[Dict[str, Optional[float]]]], List[RankKey]],
+        budget: int,
+    ) -> None:
+        self.space = space
+        self.score_fn = score_fn
+        self.budget = max(1, int(budget))
+        self.scores: Dict[Point, RankKey] = {}
+        self.order: List[Point] = []
+
+    @property
+    def remaining(self) -> int:
+        return self.budget - len(self.order)
+
+    def __call__(self, points: Sequence[Point]) -> List[RankKey]:
+        pending: List[Point] = []
+        seen = set()
+        for point in points:
+            if point in self.scores or point in seen:
+                continue
+            if len(pending) >= self.remaining:
+                break
+            pending.append(point)
+            seen.add(point)
+        if pending:
+            keys = self.score_fn([self.space.params(point) for point in pending])
+            for point, key in zip(pending, keys):
+                self.scores[point] = key
+                self.order.append(point)
+        return [self.scores[point] for point in points if point in self.scores]
+
+    def best(self, count: int = 1) -> List[Point]:
+        return sorted(self.scores, key=lambda point: self.scores[point])[:count]
+
+
+def grid_search(space: SearchSpace, evaluate: Evaluator, rng: random.Random) -> None:
+    evaluate(space.points())
+
+
+def random_search(space: SearchSpace, evaluate: Evaluator, rng: random.Random) -> None:
+    points = space.points()
+    rng.shuffle(points)
+    evaluate(points)
+
+
+def refine_search(
+    space: SearchSpace, evaluate: Evaluator, rng: random.Random, keep: int = 1, coarse_levels: int = 2
+) -> None:
+    # Coarse pass: ``coarse_levels`` evenly spread, centred samples per axis.
+    levels = [sorted({int((k + 0.5) * size / coarse_levels) for k in range(coarse_levels)}) for size in space.shape]
+    evaluate(list(itertools.product(*levels)))  # type: ignore[arg-type]
+    strides = [max(1, size // (2 * coarse_levels)) for size in space.shape]
+
+    # Fine passes: halve the step and probe the neighbourhood of the best points.
+    while evaluate.remaining > 0:
+        before = len(evaluate.order)
+        for parent in evaluate.best(keep):
+            neighbours = []
+            for offsets in itertools.product(*((0, -stride, stride) for stride in strides)):
+                point = tuple(
+                    min(size - 1, max(0, coord + offset))
+                    for coord, offset, size in zip(parent, offsets, space.shape)
+                )
+                neighbours.append(point)
+            evaluate(neighbours)  # type: ignore[arg-type]
+            if evaluate.remaining <= 0:
+                return
+        if all(stride == 1 for stride in strides):
+            if len(evaluate.order) == before:
+                # Converged: every neighbour of the best points has been scored.
+                return
+        else:
+            strides = [max(1, stride // 2) for stride in strides]
+
+
+Strategy = Callable[[SearchSpace, Evaluator, random.Random], None]
+
+# name -> (strategy, whether it searches the dense lattice)
+STRATEGIES: Dict[str, Tuple[Strategy, bool]] = {
+    "grid": (grid_search, False),
+    "random": (random_search, True),
+    "refine": (refine_search, True),
+}
@@ -1,18 +1,21 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+import random
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 
-from .peaks import run_find_peaks
+from .peak_search import STRATEGIES, Evaluator, SearchSpace
+from .peaks import PeakTable, PressureInput, find_peak_indices, peaks_from_indices
+from .recording import Recording
+from .timing import stage
 
-PressureRow = Dict[str, float]
 
-
-def _percentile_candidates(values: List[float]) -> List[float]:
-    if not values:
+def _percentile_candidates(values: np.ndarray) -> List[float]:
+    if not len(values):
         return []
-    percentiles = np.percentile(np.array(values), [50, 60, 70, 80])
+    percentiles = np.percentile(values, [50, 60, 70, 80])
     return sorted({float(val) for val in percentiles})
 
 
@@ -28,10 +31,10 @@ def _distance_candidates(length: int, expected_count: int) -> List[int]:
     return sorted(distances)
 
 
-def _prominence_candidates(values: List[float]) -> List[Optional[float]]:
-    if not values:
+def _prominence_candidates(values: np.ndarray) -> List[Optional[float]]:
+    if not len(values):
         return [None]
-    span = max(values) - min(values)
+    span = float(values.max() - values.min())
     if span <= 0:
         return [None]
     base = span * 0.05
@@ -39,33 +42,37 @@ def _prominence_candidates(values: List[float]) -> List[Optional[float]]:
     return candidates
 
 
-def _local_prominence(values: List[float], index: int, window: int = 5) -> float:
-    start = max(0, index - window)
-    end = min(len(values), index + window + 1)
-    left_min = min(values[start:index] or [values[index]])
-    right_min = min(values[index + 1 : end] or [values[index]])
-    baseline = max(left_min, right_min)
-    return values[index] - baseline
+def _dense_space(values: np.ndarray, expected_count: int) -> SearchSpace:
+    """Finer lattice spanning the same ranges as the default grid, for adaptive strategies."""
+
+    length = len(values)
+    rough_spacing = max(1, int(length / max(expected_count, 1)))
+    distances = sorted({max(1, int(rough_spacing * mult)) for mult in np.linspace(0.5, 2.0, 13)})
 
+    prominences: List[Optional[float]] = [None]
+    heights: List[Optional[float]] = [None]
+    if length:
+        span = float(values.max() - values.min())
+        if span > 0:
+            prominences += [float(span * 0.05 * mult) for mult in np.linspace(1.0, 3.0, 9)]
+        heights += sorted({float(val) for val in np.percentile(values, np.linspace(50, 80, 13))})
+    return SearchSpace(distances, prominences, heights)
 
-def _score_candidate(
-    values: List[float], peaks: List[Dict[str, float]], params: Dict[str, float], expected: int
-) -> float:
-    count_penalty = abs(len(peaks) - expected)
+
+def _score_candidate(table: PeakTable, indices: np.ndarray, params: Dict[str, float], expected: int) -> float:
+    count_penalty = abs(len(indices) - expected)
 
     distance_penalty = 0.0
     distance = params.get("distance")
-    if distance and len(peaks) > 1:
-        sorted_indices = sorted(int(p["index"]) for p in peaks)
-        for left, right in zip(sorted_indices, sorted_indices[1:]):
-            if right - left < distance:
-                distance_penalty += (distance - (right - left)) / max(distance, 1)
+    if distance and len(indices) > 1:
+        gaps = np.diff(np.sort(indices))
+        short = gaps[gaps < distance]
+        distance_penalty = sum(((distance - short) / max(distance, 1)).tolist(), 0.0)
 
     prominence_penalty = 0.0
-    if peaks:
-        prominences = [_local_prominence(values, int(p["index"])) for p in peaks]
-        median_prom = float(np.median(prominences))
-        spread = max(values) - min(values) if values else 0
+    if len(indices):
+        median_prom = float(np.median(table.local_prominences[indices]))
+        spread = table.spread
         if spread > 0:
             if median_prom < 0.03 * spread:
                 prominence_penalty += 0.75
@@ -75,46 +82,120 @@ def _score_candidate(
     return float(count_penalty + distance_penalty + prominence_penalty)
 
 
-def suggest_params(
-    pressure_rows: List[PressureRow], expected_count: int, budget: int = 60
-) -> Dict[str, object]:
-    values = [float(row.get("Bladder Pressure", 0)) for row in pressure_rows]
-
-    height_candidates = _percentile_candidates(values)
-    if not height_candidates:
-        height_candidates = [None]
-    distance_candidates = _distance_candidates(len(values), expected_count)
-    prominence_candidates = _prominence_candidates(values)
-
-    candidates: List[Dict[str, object]] = []
-
-    for distance in distance_candidates:
-        for prominence in prominence_candidates:
-            for height in height_candidates:
-                params = {
-                    "distance": distance,
-                    "prominence": prominence,
-                    "height": height,
-                }
-                result = run_find_peaks(pressure_rows, params)
-                peaks = result.get("peaks", [])
-                score = _score_candidate(values, peaks, result.get("paramsUsed", {}), expected_count)
-
-                candidates.append({"params": result.get("paramsUsed", params), "peaks": peaks, "score": score})
-
-                if len(candidates) >= max(budget, 1):
-                    break
-            if len(candidates) >= max(budget, 1):
-                break
-        if len(candidates) >= max(budget, 1):
-            break
-
-    candidates = sorted(
-        candidates,
-        key=lambda c: (c["score"], -len(c.get("peaks", [])), c["params"].get("distance", 0)),
+Evaluation = Tuple[Dict[str, float], np.ndarray, float]
+
+# Per-process state for pool workers, populated once by ``_init_worker``.
+_WORKER_STATE: Dict[str, object] = {}
+
+
+def _evaluate_chunk(
+    table: PeakTable, expected: int, chunk: Sequence[Dict[str, Optional[float]]]
+) -> List[Evaluation]:
+    evaluations: List[Evaluation] = []
+    for params in chunk:
+        indices, used = find_peak_indices(table.values, params, table)
+        evaluations.append((used, indices, _score_candidate(table, indices, used, expected)))
+    return evaluations
+
+
+def _init_worker(values: np.ndarray, expected: int) -> None:
+    _WORKER_STATE["table"] = PeakTable(values)
+    _WORKER_STATE["expected"] = expected
+
+
+def _evaluate_in_worker(chunk: Sequence[Dict[str, Optional[float]]]) -> List[Evaluation]:
+    return _evaluate_chunk(
+        _WORKER_STATE["table"],  # type: ignore[arg-type]
+        _WORKER_STATE["expected"],  # type: ignore[arg-type]
+        chunk,
     )
 
-    top_candidates = candidates[:5]
+
+def _chunks(items: List[Dict[str, Optional[float]]], count: int) -> List[List[Dict[str, Optional[float]]]]:
+    size = max(1, -(-len(items) // max(count, 1)))
+    return [items[start : start + size] for start in range(0, len(items), size)]
+
+
+def evaluate_candidates(
+    values: np.ndarray,
+    expected: int,
+    grid: List[Dict[str, Optional[float]]],
+    workers: int = 1,
+    use_processes: bool = False,
+    table: Optional[PeakTable] = None,
+) -> List[Evaluation]:
+    """Run ``find_peaks`` for every parameter set in ``grid`` and score the result.
+
+    With ``workers > 1`` the grid is split into chunks evaluated on a thread
+    pool, or a process pool when ``use_processes`` is set (the signal is sent
+    to each worker once). Prominences are looked up in a :class:`PeakTable`
+    built once per call (or passed in as ``table``). Results keep the order
+    of ``grid``.
+    """
+
+    if workers <= 1 or len(grid) <= 1:
+        return _evaluate_chunk(table or PeakTable(values), expected, grid)
+
+    chunks = _chunks(grid, workers * 4)
+    if use_processes:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(values, expected)
+        ) as pool:
+            results = list(pool.map(_evaluate_in_worker, chunks))
+    else:
+        table = table or PeakTable(values)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda chunk: _evaluate_chunk(table, expected, chunk), chunks))
+    return [evaluation for chunk in results for evaluation in chunk]
+
+
+def suggest_params(
+    pressure_rows: PressureInput,
+    expected_count: int,
+    budget: int = 60,
+    workers: int = 1,
+    use_processes: bool = False,
+    strategy: str = "grid",
+    seed: int = 0,
+) -> Dict[str, object]:
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown search strategy: {strategy}")
+    search, dense = STRATEGIES[strategy]
+
+    recording = Recording.coerce(pressure_rows)
+    values = recording.pressure
+
+    if dense:
+        space = _dense_space(values, expected_count)
+    else:
+        space = SearchSpace(
+            _distance_candidates(len(values), expected_count),
+            _prominence_candidates(values),
+            _percentile_candidates(values) or [None],
+        )
+
+    evaluations: List[Evaluation] = []
+    table = None if use_processes and workers > 1 else PeakTable(values)
+
+    def score_batch(batch: List[Dict[str, Optional[float]]]) -> List[Tuple[float, int, int]]:
+        results = evaluate_candidates(values, expected_count, batch, workers, use_processes, table)
+        evaluations.extend(results)
+        return [_rank_key(evaluation) for evaluation in results]
+
+    evaluator = Evaluator(space, score_batch, budget)
+    with stage("search"):
+        search(space, evaluator, random.Random(seed))
+
+    ranked = sorted(evaluations, key=_rank_key)
+    top_candidates = [
+        {"params": params, "peaks": peaks_from_indices(recording, indices), "score": score}
+        for params, indices, score in ranked[:5]
+    ]
     best = top_candidates[0] if top_candidates else {"params": {}, "peaks": [], "score": float("inf")}
 
-    return {"best": best, "candidates": top_candidates}
+    return {"best": best, "candidates": top_candidates, "evaluations": len(evaluations)}
+
+
+def _rank_key(evaluation: Evaluation) -> Tuple[float, int, int]:
+    params, indices, score = evaluation
+    return (score, -len(indices), params.get("distance", 0))
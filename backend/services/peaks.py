@@ -1,15 +1,22 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
 
 try:  # Optional dependency
-    from scipy.signal import find_peaks  # type: ignore
+    from scipy.signal import find_peaks, peak_prominences, peak_widths  # type: ignore
 except Exception:  # pragma: no cover - fallback when scipy missing
     find_peaks = None
+    peak_prominences = None
+    peak_widths = None
 
+from .recording import Recording
+from .timing import timed
 
 PressureRow = Dict[str, float]
 Peak = Dict[str, float]
+PressureInput = Union[Recording, List[PressureRow]]
 
 
 def _fallback_peaks(values: List[float], min_height: Optional[float], min_distance: Optional[int]) -> List[int]:
@@ -35,12 +42,12 @@ def _fallback_peaks(values: List[float], min_height: Optional[float], min_distan
 
 
 def detect_peaks(
-    pressure_rows: List[PressureRow],
+    pressure_rows: PressureInput,
     min_height: Optional[float] = None,
     min_distance: Optional[int] = None,
 ) -> List[Peak]:
-    times = [float(row.get("Elapsed Time", 0)) for row in pressure_rows]
-    values = [float(row.get("Bladder Pressure", 0)) for row in pressure_rows]
+    recording = Recording.coerce(pressure_rows)
+    times, values = recording.time, recording.pressure
 
     if len(values) < 3:
         return []
@@ -53,11 +60,11 @@ def detect_peaks(
             kwargs["distance"] = min_distance
 
         peaks_indices, _ = find_peaks(values, **kwargs)  # type: ignore[arg-type]
-        indices = list(peaks_indices)
+        indices = peaks_indices.tolist()
     else:
-        indices = _fallback_peaks(values, min_height, min_distance)
+        indices = _fallback_peaks(values.tolist(), min_height, min_distance)
 
-    return [{"time": times[idx], "value": values[idx]} for idx in indices]
+    return [{"time": float(times[idx]), "value": float(values[idx])} for idx in indices]
 
 
 def _clean_params(params: Dict[str, Optional[float]]) -> Tuple[Dict[str, float], Optional[float], Optional[int]]:
@@ -80,24 +87,169 @@ def _clean_params(params: Dict[str, Optional[float]]) -> Tuple[Dict[str, float],
     return used_params, min_height, min_distance
 
 
-def run_find_peaks(pressure_rows: List[PressureRow], params: Dict[str, Optional[float]]) -> Dict[str, object]:
-    times = [float(row.get("Elapsed Time", 0)) for row in pressure_rows]
-    values = [float(row.get("Bladder Pressure", 0)) for row in pressure_rows]
+def local_prominences(values: np.ndarray, window: int = 5) -> np.ndarray:
+    """Height of every sample above the higher of its left/right ``window`` minima.
+
+    An empty side (at the signal edges) contributes the sample itself.
+    """
+
+    n = len(values)
+    if n == 0:
+        return np.empty(0, dtype=np.float64)
+    padded = np.concatenate([np.full(window, np.inf), values, np.full(window, np.inf)])
+    mins = np.lib.stride_tricks.sliding_window_view(padded, window).min(axis=1)
+    left = mins[:n]
+    right = mins[window + 1 : window + 1 + n]
+    left = np.where(np.isinf(left), values, left)
+    right = np.where(np.isinf(right), values, right)
+    return values - np.maximum(left, right)
+
+
+def _select_by_distance(peaks: np.ndarray, priority: np.ndarray, distance: float) -> np.ndarray:
+    """Mask of ``peaks`` kept by ``find_peaks``' ``distance`` filter.
+
+    Same greedy pass as scipy: peaks are visited from highest ``priority``
+    down, and each kept peak removes its neighbours closer than ``distance``.
+    """
+
+    distance = np.ceil(distance)
+    starts = np.searchsorted(peaks, peaks - distance, side="right")
+    stops = np.searchsorted(peaks, peaks + distance, side="left")
+    keep = np.ones(len(peaks), dtype=bool)
+    # Peaks with no neighbour in range are always kept; only the rest need the pass.
+    crowded = stops - starts > 1
+    if not crowded.any():
+        return keep
+    order = np.argsort(priority)[::-1]
+    starts, stops = starts.tolist(), stops.tolist()
+    removed = bytearray(len(peaks))
+    for index in order[crowded[order]].tolist():
+        if not removed[index]:
+            start, stop = starts[index], stops[index]
+            removed[start:stop] = b"\x01" * (stop - start)
+            removed[index] = 0
+    keep[np.frombuffer(bytes(removed), dtype=bool)] = False
+    return keep
+
+
+class PeakTable:
+    """Per-peak properties computed once from an unconstrained ``find_peaks`` pass.
+
+    Every peak returned by ``find_peaks`` with constraints is one of the
+    unconstrained local maxima, so sweeps can look properties up by index
+    instead of recomputing them per candidate.
+    """
+
+    def __init__(self, values: np.ndarray) -> None:
+        self.values = values
+        if find_peaks and len(values) >= 3:
+            self.indices, _ = find_peaks(values)
+            self.prominences = peak_prominences(values, self.indices)[0]
+        else:
+            self.indices = np.asarray(_fallback_peaks(values.tolist(), None, None), dtype=np.intp)
+            self.prominences = None
+        self.heights = values[self.indices]
+        self._widths: Optional[np.ndarray] = None
+        self.local_prominences = local_prominences(values)
+        self.spread = float(values.max() - values.min()) if len(values) else 0.0
+
+    @property
+    def widths(self) -> Optional[np.ndarray]:
+        """``scipy.signal.peak_widths`` at half prominence, computed on first use."""
+
+        if self._widths is None and peak_widths is not None and len(self.indices):
+            self._widths = peak_widths(self.values, self.indices)[0]
+        return self._widths
+
+    def select(self, height: Optional[float], distance: Optional[int]) -> Optional[np.ndarray]:
+        """Apply ``find_peaks``' height and distance filters to the stored maxima.
+
+        Returns ``None`` when scipy is unavailable.
+        """
+
+        if self.prominences is None:
+            return None
+        peaks = self.indices
+        if height is not None:
+            peaks = peaks[self.heights >= height]
+        if distance is not None and len(peaks):
+            peaks = peaks[_select_by_distance(peaks, self.values[peaks], distance)]
+        return peaks
+
+    def _positions(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        positions = np.searchsorted(self.indices, indices)
+        positions = np.minimum(positions, max(len(self.indices) - 1, 0))
+        found = self.indices[positions] == indices if len(self.indices) else np.zeros(len(indices), bool)
+        return positions, found
+
+    def prominence(self, indices: np.ndarray) -> np.ndarray:
+        """``scipy.signal.peak_prominences`` for ``indices``."""
+
+        if self.prominences is None:
+            return peak_prominences(self.values, indices)[0]
+        positions, found = self._positions(indices)
+        if found.all():
+            return self.prominences[positions]
+        result = np.empty(len(indices), dtype=np.float64)
+        result[found] = self.prominences[positions[found]]
+        result[~found] = peak_prominences(self.values, indices[~found])[0]
+        return result
+
+    def width(self, indices: np.ndarray) -> np.ndarray:
+        """``scipy.signal.peak_widths`` at half prominence for ``indices``."""
+
+        positions, found = self._positions(indices)
+        widths = self.widths
+        if widths is None or not found.all():
+            return peak_widths(self.values, indices)[0]
+        return widths[positions]
+
+
+@timed("find_peaks")
+def find_peak_indices(
+    values: np.ndarray, params: Dict[str, Optional[float]], table: Optional[PeakTable] = None
+) -> Tuple[np.ndarray, Dict[str, float]]:
+    """Return sorted peak indices for ``values`` and the cleaned params used.
+
+    When ``table`` is given the prominence and width constraints are applied
+    by looking the values up in it rather than letting ``find_peaks``
+    recompute them.
+    """
 
     cleaned_params, min_height, min_distance = _clean_params(params)
 
     if len(values) < 3:
-        return {"peaks": [], "paramsUsed": cleaned_params}
-
-    if find_peaks:
+        return np.empty(0, dtype=np.intp), cleaned_params
+
+    selected = None
+    if table is not None and not set(cleaned_params) - {"height", "distance", "prominence", "width"}:
+        selected = table.select(cleaned_params.get("height"), cleaned_params.get("distance"))
+
+    if selected is not None:
+        # find_peaks filters by prominence and width after height and
+        # distance, and neither depends on which other peaks survived.
+        peak_indices = selected
+        if "prominence" in cleaned_params:
+            peak_indices = peak_indices[table.prominence(peak_indices) >= cleaned_params["prominence"]]
+        if "width" in cleaned_params:
+            peak_indices = peak_indices[table.width(peak_indices) >= cleaned_params["width"]]
+    elif find_peaks:
         peak_indices, _ = find_peaks(values, **cleaned_params)  # type: ignore[arg-type]
-        indices = list(peak_indices)
     else:
-        indices = _fallback_peaks(values, min_height, min_distance)
+        peak_indices = np.asarray(_fallback_peaks(values.tolist(), min_height, min_distance), dtype=np.intp)
+    return peak_indices, cleaned_params
+
 
-    peaks = [
-        {"time": times[idx], "value": values[idx], "index": idx}
-        for idx in indices
+def peaks_from_indices(recording: Recording, indices: np.ndarray) -> List[Peak]:
+    times = recording.time[indices].tolist()
+    values = recording.pressure[indices].tolist()
+    return [
+        {"time": time, "value": value, "index": idx}
+        for time, value, idx in zip(times, values, indices.tolist())
     ]
 
-    return {"peaks": peaks, "paramsUsed": cleaned_params}
+
+def run_find_peaks(pressure_rows: PressureInput, params: Dict[str, Optional[float]]) -> Dict[str, object]:
+    recording = Recording.coerce(pressure_rows)
+    indices, cleaned_params = find_peak_indices(recording.pressure, params)
+    return {"peaks": peaks_from_indices(recording, indices), "paramsUsed": cleaned_params}
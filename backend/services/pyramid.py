@@ -0,0 +1,253 @@
+"""Multi-resolution aggregate pyramid for zoomable access to long channels.
+
+Level ``k`` of a :class:`SeriesPyramid` summarises consecutive runs of
+``2**k`` samples by their minimum, maximum, sum and count of non-NaN
+values. Level ``k + 1`` is built from pairs of level ``k`` buckets, so the
+whole pyramid costs O(n) to build and about ``n / 2**(MIN_LEVEL - 1)``
+buckets of storage. A range query maps its time window to sample indices
+with a binary search, picks the coarsest level that still yields at least
+``points`` buckets and slices it, which is O(log n + output) however long
+the recording is.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .intervals import Interval, index_ranges
+from .recording import SERIES, Recording
+from .timing import timed
+
+# Finest stored level; narrower queries are answered from the raw samples.
+MIN_LEVEL = 2
+
+
+class _Level:
+    __slots__ = ("low", "high", "total", "count")
+
+    def __init__(self, low: np.ndarray, high: np.ndarray, total: np.ndarray, count: np.ndarray) -> None:
+        self.low = low
+        self.high = high
+        self.total = total
+        self.count = count
+
+    @classmethod
+    def from_samples(cls, values: np.ndarray, size: int) -> "_Level":
+        buckets = -(-values.size // size)
+        padded = np.full(buckets * size, np.nan)
+        padded[: values.size] = values
+        grid = padded.reshape(buckets, size)
+        finite = ~np.isnan(grid)
+        with np.errstate(invalid="ignore"):
+            # All-NaN buckets legitimately reduce to NaN here.
+            low = np.fmin.reduce(grid, axis=1)
+            high = np.fmax.reduce(grid, axis=1)
+        return cls(low, high, np.where(finite, grid, 0.0).sum(axis=1), finite.sum(axis=1).astype(np.int32))
+
+    def coarser(self) -> "_Level":
+        def pairs(array: np.ndarray, fill) -> np.ndarray:
+            if array.size % 2:
+                array = np.append(array, fill)
+            return array.reshape(-1, 2)
+
+        return _Level(
+            np.fmin.reduce(pairs(self.low, np.nan), axis=1),
+            np.fmax.reduce(pairs(self.high, np.nan), axis=1),
+            pairs(self.total, 0.0).sum(axis=1),
+            pairs(self.count, 0).sum(axis=1),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.low.nbytes + self.high.nbytes + self.total.nbytes + self.count.nbytes)
+
+
+class SeriesPyramid:
+    """Power-of-two aggregate levels over one channel of a recording."""
+
+    def __init__(self, times: np.ndarray, values: np.ndarray) -> None:
+        self.times = times
+        self.values = values
+        self.levels: Dict[int, _Level] = {}
+        if times.size > 2**MIN_LEVEL:
+            level = _Level.from_samples(values, 2**MIN_LEVEL)
+            self.levels[MIN_LEVEL] = level
+            while level.low.size > 1:
+                level = level.coarser()
+                self.levels[max(self.levels) + 1] = level
+
+    @property
+    def nbytes(self) -> int:
+        return sum(level.nbytes for level in self.levels.values())
+
+    def index_range(self, start: Optional[float], end: Optional[float]) -> Tuple[int, int]:
+        """Half-open sample index range covering ``[start, end]`` in time."""
+
+        lo = 0 if start is None else int(np.searchsorted(self.times, start, side="left"))
+        hi = self.times.size if end is None else int(np.searchsorted(self.times, end, side="right"))
+        return lo, max(lo, hi)
+
+    def level_for(self, samples: int, points: int) -> int:
+        """Coarsest stored level giving at least ``points`` buckets, or 0 for raw samples."""
+
+        if samples <= points or not self.levels:
+            return 0
+        level = int(math.floor(math.log2(samples / points)))
+        if level < MIN_LEVEL:
+            return 0
+        return min(level, max(self.levels))
+
+    def query(self, start: Optional[float], end: Optional[float], points: int) -> Dict[str, object]:
+        """Buckets over ``[start, end]``: start/end time and min/max/mean of each.
+
+        Buckets stay aligned to the level grid, so the first and last may
+        extend slightly beyond the window. Level 0 returns raw samples, with
+        min, max and mean all equal to the value.
+        """
+
+        lo, hi = self.index_range(start, end)
+        return self.view(lo, hi, self.level_for(hi - lo, points))
+
+    def view(self, lo: int, hi: int, level: int) -> Dict[str, object]:
+        """Buckets of ``level`` covering the sample index range ``[lo, hi)``."""
+
+        if level == 0:
+            values = self.values[lo:hi]
+            times = self.times[lo:hi]
+            return {
+                "level": 0,
+                "bucketSize": 1,
+                "time": times,
+                "end": times,
+                "min": values,
+                "max": values,
+                "mean": values,
+            }
+
+        size = 2**level
+        first, last = lo // size, (hi - 1) // size + 1
+        data = self.levels[level]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = data.total[first:last] / data.count[first:last]
+        ends = np.minimum(np.arange(first + 1, last + 1) * size, self.times.size) - 1
+        return {
+            "level": level,
+            "bucketSize": size,
+            "time": self.times[first * size : last * size : size],
+            "end": self.times[ends],
+            "min": data.low[first:last],
+            "max": data.high[first:last],
+            "mean": mean,
+        }
+
+
+def _json_values(values: np.ndarray) -> List[Optional[float]]:
+    return [None if value != value else value for value in values.tolist()]
+
+
+class PyramidCache:
+    """Bounded LRU of pyramids keyed by recording fingerprint and channel."""
+
+    def __init__(self, max_entries: int = 24) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self._entries: "OrderedDict[Tuple[str, str], SeriesPyramid]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, recording: Recording, attr: str) -> SeriesPyramid:
+        key = (recording.fingerprint, attr)
+        with self._lock:
+            pyramid = self._entries.get(key)
+            if pyramid is not None:
+                self._entries.move_to_end(key)
+                return pyramid
+        pyramid = build_pyramid(recording, attr)
+        if self.max_entries:
+            with self._lock:
+                self._entries[key] = pyramid
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return pyramid
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+PYRAMID_CACHE = PyramidCache()
+
+
+@timed("pyramid_build")
+def build_pyramid(recording: Recording, attr: str) -> SeriesPyramid:
+    return SeriesPyramid(recording.time, getattr(recording, attr))
+
+
+def _span_view(pyramid: SeriesPyramid, ranges: List[Tuple[int, int]], points: int) -> Dict[str, object]:
+    """One view over several index ranges, all read from the same level."""
+
+    if not ranges:
+        return pyramid.view(0, 0, 0)
+    level = pyramid.level_for(sum(hi - lo for lo, hi in ranges), points)
+    if len(ranges) == 1:
+        return pyramid.view(ranges[0][0], ranges[0][1], level)
+    views = [pyramid.view(lo, hi, level) for lo, hi in ranges]
+    merged = {key: np.concatenate([view[key] for view in views]) for key in ("time", "end", "min", "max", "mean")}
+    merged.update(level=views[0]["level"], bucketSize=views[0]["bucketSize"])
+    return merged
+
+
+@timed("pyramid_query")
+def query_range(
+    recording: Recording,
+    points: int,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    series: Optional[Sequence[str]] = None,
+    cache: PyramidCache = PYRAMID_CACHE,
+    intervals: Optional[Sequence[Interval]] = None,
+    window: Optional[Interval] = None,
+) -> Dict[str, object]:
+    """Aggregated view of the requested channels (default: all present) over a time range.
+
+    ``intervals`` and ``window`` restrict the range the way
+    :func:`services.intervals.select` would, but are answered from the
+    pyramid of the whole recording, so a stored dataset's pyramid is reused
+    for every view of it. Buckets stay on the level grid and may reach past
+    the edges of each kept interval.
+    """
+
+    names = [name for name, _, _ in SERIES]
+    wanted = list(series) if series is not None else names
+    unknown = [name for name in wanted if name not in names]
+    if unknown:
+        raise ValueError(f"Unknown series: {unknown[0]}")
+
+    low = -np.inf if start is None else start
+    high = np.inf if end is None else end
+    if window is not None:
+        low, high = max(low, min(window)), min(high, max(window))
+    ranges = index_ranges(recording.time, intervals, (low, high)) if low <= high else []
+
+    result: Dict[str, object] = {}
+    for name, _, attr in SERIES:
+        if name not in wanted or getattr(recording, attr) is None:
+            continue
+        view = _span_view(cache.get(recording, attr), ranges, points)
+        result[name] = {
+            "level": view["level"],
+            "bucketSize": view["bucketSize"],
+            "time": view["time"].tolist(),
+            "end": view["end"].tolist(),
+            "min": _json_values(view["min"]),
+            "max": _json_values(view["max"]),
+            "mean": _json_values(view["mean"]),
+        }
+    return {"points": points, "start": start, "end": end, "series": result}
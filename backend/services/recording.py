@@ -0,0 +1,221 @@
+"""Columnar in-memory representation of a parsed cystometry recording."""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .timing import stage
+
+TIME_KEY = "Elapsed Time"
+SCALE_KEY = "Scale"
+VOLUME_KEY = "Tot Infused Vol"
+PRESSURE_KEY = "Bladder Pressure"
+
+# (series name in the row payload, column name, Recording attribute)
+SERIES = (
+    ("scale", SCALE_KEY, "scale"),
+    ("volume", VOLUME_KEY, "volume"),
+    ("pressure", PRESSURE_KEY, "pressure"),
+)
+
+Row = Dict[str, Optional[float]]
+RowData = Dict[str, List[Row]]
+# {series name: (times, values)}, each series on its own time axis
+SeriesArrays = Dict[str, Tuple[np.ndarray, np.ndarray]]
+
+
+def _frozen(values) -> np.ndarray:
+    array = np.ascontiguousarray(values, dtype=np.float64)
+    array.setflags(write=False)
+    return array
+
+
+def _to_float(value) -> float:
+    if value is None:
+        return np.nan
+    return float(value)
+
+
+def nearest_indices(times: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Vectorised nearest-index lookup; ties resolve to the earlier sample."""
+
+    if times.size == 0:
+        return np.zeros(targets.shape, dtype=np.intp)
+    pos = np.searchsorted(times, targets, side="left")
+    before = np.clip(pos - 1, 0, times.size - 1)
+    after = np.clip(pos, 0, times.size - 1)
+    use_after = np.abs(times[after] - targets) < np.abs(times[before] - targets)
+    nearest = np.where(use_after, after, before)
+    nearest[pos <= 0] = 0
+    nearest[pos >= times.size] = times.size - 1
+    return nearest
+
+
+def row_series(data: RowData) -> SeriesArrays:
+    """``(times, values)`` arrays per series of the row payload, each on its own axis.
+
+    Empty series are left out.
+    """
+
+    series: SeriesArrays = {}
+    for name, column, _ in SERIES:
+        rows = data.get(name) or []
+        if rows:
+            series[name] = (
+                np.fromiter((_to_float(row.get(TIME_KEY, 0)) for row in rows), np.float64, len(rows)),
+                np.fromiter((_to_float(row.get(column, 0)) for row in rows), np.float64, len(rows)),
+            )
+    return series
+
+
+@dataclass(frozen=True, eq=False)
+class Recording:
+    """Contiguous float64 columns sharing a single ``Elapsed Time`` axis.
+
+    Missing samples are stored as NaN; ``scale``/``volume`` are ``None`` when
+    the channel was not supplied at all. ``annotations`` optionally holds the
+    sparse Event/Comments rows kept at upload time.
+    """
+
+    time: np.ndarray
+    pressure: np.ndarray
+    scale: Optional[np.ndarray] = None
+    volume: Optional[np.ndarray] = None
+    annotations: Optional[List[Dict[str, object]]] = None
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "time", _frozen(self.time))
+        for _, _, attr in SERIES:
+            values = getattr(self, attr)
+            if values is None:
+                continue
+            values = _frozen(values)
+            if values.shape != self.time.shape:
+                raise ValueError(f"{attr} column length does not match time column")
+            object.__setattr__(self, attr, values)
+
+    def __len__(self) -> int:
+        return int(self.time.size)
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(array.nbytes for array in self.to_columns().values()))
+
+    @cached_property
+    def fingerprint(self) -> str:
+        """Content hash of all columns, stable across processes."""
+
+        digest = hashlib.blake2b(digest_size=16)
+        for column, values in self.to_columns().items():
+            digest.update(column.encode("utf-8"))
+            digest.update(values.tobytes())
+        return digest.hexdigest()
+
+    @cached_property
+    def missing(self) -> Dict[str, np.ndarray]:
+        """Boolean NaN masks per available value column."""
+
+        return {column: np.isnan(values) for column, values in self.to_columns().items() if column != TIME_KEY}
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> "Recording":
+        return cls(
+            time=columns[TIME_KEY],
+            pressure=columns.get(PRESSURE_KEY, np.full(len(columns[TIME_KEY]), np.nan)),
+            scale=columns.get(SCALE_KEY),
+            volume=columns.get(VOLUME_KEY),
+        )
+
+    def to_columns(self) -> Dict[str, np.ndarray]:
+        columns = {TIME_KEY: self.time}
+        for _, column, attr in SERIES:
+            values = getattr(self, attr)
+            if values is not None:
+                columns[column] = values
+        return columns
+
+    @classmethod
+    def from_pressure_rows(cls, rows: List[Row]) -> "Recording":
+        times = np.fromiter((_to_float(row.get(TIME_KEY, 0)) for row in rows), np.float64, len(rows))
+        values = np.fromiter((_to_float(row.get(PRESSURE_KEY, 0)) for row in rows), np.float64, len(rows))
+        return cls(time=times, pressure=values)
+
+    @classmethod
+    def from_rows(cls, data: RowData) -> "Recording":
+        """Build a recording from the row-oriented API payload.
+
+        The first non-empty series defines the time axis. Other series are
+        used as-is when they share that axis, otherwise they are aligned to it
+        by nearest ``Elapsed Time``.
+        """
+
+        return cls.from_series(row_series(data))
+
+    @classmethod
+    def from_series(cls, series: SeriesArrays) -> "Recording":
+        """Build a recording from ``{series name: (times, values)}`` arrays.
+
+        Alignment follows :meth:`from_rows`; empty series count as absent.
+        """
+
+        parsed: Dict[str, np.ndarray] = {}
+        axis: Optional[np.ndarray] = None
+        for name, _, attr in (SERIES[2], SERIES[0], SERIES[1]):
+            times, values = series.get(name) or (None, None)
+            if times is None or not times.size:
+                continue
+            if axis is None:
+                axis = times
+            elif times.shape != axis.shape or not np.array_equal(times, axis):
+                values = values[nearest_indices(times, axis)]
+            parsed[attr] = values
+
+        if axis is None:
+            axis = np.empty(0, dtype=np.float64)
+        return cls(
+            time=axis,
+            pressure=parsed.get("pressure", np.full(axis.shape, np.nan)),
+            scale=parsed.get("scale"),
+            volume=parsed.get("volume"),
+        )
+
+    @classmethod
+    def coerce(cls, data: Union["Recording", RowData, List[Row], None]) -> "Recording":
+        """Accept a recording, the row payload dict or a bare list of pressure rows."""
+
+        if isinstance(data, Recording):
+            return data
+        with stage("coerce"):
+            if data is None:
+                return cls.from_rows({})
+            if isinstance(data, list):
+                return cls.from_pressure_rows(data)
+            return cls.from_rows(data)
+
+    def series_rows(self, name: str) -> List[Row]:
+        for series, column, attr in SERIES:
+            if series != name:
+                continue
+            values = getattr(self, attr)
+            if values is None:
+                return []
+            return [
+                {TIME_KEY: t, column: (None if v != v else v)}
+                for t, v in zip(self.time.tolist(), values.tolist())
+            ]
+        raise KeyError(name)
+
+    def to_rows(self) -> RowData:
+        """Expand into the row-oriented payload used by the JSON API."""
+
+        return {name: self.series_rows(name) for name, _, _ in SERIES}
+
+    def to_series(self) -> SeriesArrays:
+        """``(time, values)`` per available series, all sharing the recording's axis."""
+
+        return {name: (self.time, getattr(self, attr)) for name, _, attr in SERIES if getattr(self, attr) is not None}
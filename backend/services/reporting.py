@@ -1,122 +1,309 @@
 from __future__ import annotations
 
+import hashlib
+import importlib.util
+import io
+import json
 import os
+import re
+import threading
+import time
+import uuid
+import zipfile
 from datetime import datetime
-from typing import Dict, Iterable, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
+import numpy as np
+import pandas as pd
 from openpyxl import Workbook
 
+from .json_sanitize import json_default
+from .recording import Recording, RowData, SeriesArrays, row_series
+from .timing import stage
+
 DOWNLOAD_DIR = os.path.join(os.path.dirname(__file__), "..", "downloads")
 
+# Series rows written between progress callbacks.
+PROGRESS_ROWS = 20_000
+
+
+class ReportCache:
+    """Content-addressed report files in a downloads directory.
+
+    Reports are named ``report_<key><extension>`` where ``key`` hashes the series
+    fingerprint and every other report input, so identical requests map to
+    the same file. Only files following that naming scheme are managed:
+    those older than ``max_age_seconds`` are removed, then the least recently
+    used until the total is within ``max_bytes`` (``0`` disables a limit).
+    """
+
+    _NAME = re.compile(r"^report_[0-9a-f]{32}\.(xlsx|csv\.zip|parquet\.zip|h5)$")
+
+    def __init__(
+        self,
+        directory: str = DOWNLOAD_DIR,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age_seconds: float = 7 * 24 * 3600,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_age_seconds = max(0.0, float(max_age_seconds))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(fingerprint: str, inputs: Dict[str, Any]) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(fingerprint.encode("ascii"))
+        digest.update(json.dumps(inputs, sort_keys=True, default=json_default).encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def filename(key: str, extension: str = ".xlsx") -> str:
+        return f"report_{key}{extension}"
+
+    def get(self, key: str, extension: str = ".xlsx") -> Optional[str]:
+        """Return the cached filename for ``key`` and mark it recently used."""
+
+        filename = self.filename(key, extension)
+        try:
+            os.utime(os.path.join(self.directory, filename))
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return filename
+
+    def save(self, key: str, extension: str, write: Callable[[str], None]) -> str:
+        """Run ``write(path)`` into a temporary file, move it under ``key`` and prune."""
+
+        os.makedirs(self.directory, exist_ok=True)
+        filename = self.filename(key, extension)
+        target = os.path.join(self.directory, filename)
+        temp = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            write(temp)
+            os.replace(temp, target)
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+        self.prune(keep=filename)
+        return filename
+
+    def prune(self, keep: Optional[str] = None) -> None:
+        with self._lock:
+            entries = []
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return
+            for name in names:
+                if not self._NAME.match(name) or name == keep:
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
 
-def _ensure_download_dir() -> None:
-    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+            entries.sort()
+            now = time.time()
+            total = sum(size for _, size, _ in entries)
+            if keep is not None:
+                try:
+                    total += os.path.getsize(os.path.join(self.directory, keep))
+                except OSError:
+                    pass
+            for mtime, size, name in entries:
+                expired = self.max_age_seconds and now - mtime > self.max_age_seconds
+                if not expired and (not self.max_bytes or total <= self.max_bytes):
+                    continue
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                total -= size
 
 
-def _get_duration(series: Iterable[Dict[str, float]]) -> float:
-    times = sorted(float(row.get("Elapsed Time", 0)) for row in series)
-    if not times:
+REPORT_CACHE = ReportCache()
+
+
+def _get_duration(times: np.ndarray) -> float:
+    if not times.size:
         return 0.0
-    return float(times[-1] - times[0])
+    return float(times.max() - times.min())
 
 
-def _get_max_pressure(pressure_rows: Iterable[Dict[str, float]]) -> float:
-    pressures = [float(row.get("Bladder Pressure", 0)) for row in pressure_rows]
-    return float(max(pressures)) if pressures else 0.0
+def _get_max_pressure(pressures: np.ndarray) -> float:
+    finite = pressures[~np.isnan(pressures)]
+    return float(finite.max()) if finite.size else 0.0
 
 
-def _get_final_volume(volume_rows: Iterable[Dict[str, float]]) -> float:
-    sorted_rows = sorted(volume_rows, key=lambda row: float(row.get("Elapsed Time", 0)))
-    if not sorted_rows:
+def _get_final_volume(times: np.ndarray, volumes: Optional[np.ndarray]) -> Optional[float]:
+    if volumes is None or not volumes.size:
         return 0.0
-    return float(sorted_rows[-1].get("Tot Infused Vol", 0))
+    last = times.size - 1 - int(np.argmax(times[::-1]))
+    value = float(volumes[last])
+    return value if value == value else None
 
 
-def _append_kv_rows(ws, title: str, values: Optional[Dict[str, object]]) -> None:
-    if not values:
-        return
-    ws.append([title, ""])  # spacer/title row
-    for key, value in values.items():
-        ws.append([key, value])
+SERIES_SHEETS = (
+    ("TimeSeries_Scale", "Scale", "scale"),
+    ("TimeSeries_Volume", "Tot Infused Vol", "volume"),
+    ("TimeSeries_Pressure", "Bladder Pressure", "pressure"),
+)
+SERIES_NAMES = frozenset(name for _, _, name in SERIES_SHEETS)
 
 
-def create_report(
-    data: Dict,
-    peaks: Optional[List[Dict[str, float]]] = None,
-    points: Optional[Dict[str, List[Dict[str, object]]]] = None,
-    segments: Optional[List[Dict[str, object]]] = None,
-    peak_params: Optional[Dict[str, object]] = None,
-    segment_params: Optional[Dict[str, object]] = None,
-    experiment_window: Optional[Dict[str, float]] = None,
-) -> str:
-    _ensure_download_dir()
+def _report_series(data: Union[Recording, RowData, SeriesArrays]) -> Tuple[SeriesArrays, str]:
+    """The series to report and their content fingerprint.
 
-    wb = Workbook()
-    ws_summary = wb.active
-    ws_summary.title = "Summary"
+    Row payloads and per-series arrays keep each series on its own time axis
+    rather than aligning them to the first one as a :class:`Recording` does.
+    """
 
-    duration = _get_duration(
-        data.get("pressure") or data.get("scale") or data.get("volume") or []
-    )
-    max_pressure = _get_max_pressure(data.get("pressure", []))
-    final_volume = _get_final_volume(data.get("volume", []))
-    kept_intervals = data.get("kept_intervals")
+    if not isinstance(data, dict):
+        data = Recording.coerce(data)
+    if isinstance(data, Recording):
+        return data.to_series(), data.fingerprint
+    if any(isinstance(value, tuple) for value in data.values()):
+        series = {name: pair for name, pair in data.items() if name in SERIES_NAMES}
+    else:
+        series = row_series(data)
+    digest = hashlib.blake2b(digest_size=16)
+    for name in sorted(series):
+        digest.update(name.encode("utf-8"))
+        for values in series[name]:
+            digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return series, digest.hexdigest()
 
-    ws_summary.append(["Metric", "Value"])
+
+def _series_stride(length: int, max_rows: Optional[int]) -> int:
+    """Sample stride that keeps a time-series sheet within ``max_rows`` rows."""
+
+    if not max_rows or length <= max_rows:
+        return 1
+    return -(-length // max_rows)
+
+
+POINT_COLUMNS = ["Type", "Time", "Value", "Index"]
+SEGMENT_COLUMNS = [
+    "i",
+    "onsetTime",
+    "peakTime",
+    "emptyTime",
+    "imiSec",
+    "maxPressure",
+    "avgPressureBetweenEmptyAndNextOnset",
+    "deltaVolume",
+]
+
+
+class ReportTables:
+    """The report content, independent of the output format.
+
+    ``summary``, ``points`` and ``segments`` are lists of rows; ``series``
+    maps each TimeSeries sheet to its (times, values) arrays, or ``None``
+    when the channel is absent.
+    """
+
+    def __init__(
+        self,
+        summary: List[list],
+        series: Dict[str, Optional[tuple]],
+        points: List[list],
+        segments: List[list],
+    ) -> None:
+        self.summary = summary
+        self.series = series
+        self.points = points
+        self.segments = segments
+
+    @property
+    def series_rows(self) -> int:
+        return sum(len(pair[0]) for pair in self.series.values() if pair is not None)
+
+    def frames(self) -> Dict[str, pd.DataFrame]:
+        """One DataFrame per sheet, in sheet order.
+
+        Summary values are mixed (numbers, strings, params), so they are
+        stored as text for the typed formats.
+        """
+
+        frames = {
+            "Summary": pd.DataFrame(
+                [[metric, "" if value is None else str(value)] for metric, value in self.summary],
+                columns=["Metric", "Value"],
+            )
+        }
+        for sheet, column, _ in SERIES_SHEETS:
+            pair = self.series[sheet]
+            times, values = pair if pair is not None else (np.empty(0), np.empty(0))
+            frames[sheet] = pd.DataFrame({"Elapsed Time": times, column: values})
+        frames["Points"] = pd.DataFrame(self.points, columns=POINT_COLUMNS).astype(
+            {"Time": "float64", "Value": "float64", "Index": "float64"}
+        )
+        segments = pd.DataFrame(self.segments, columns=SEGMENT_COLUMNS).astype("float64")
+        if not segments["i"].isna().any():
+            segments["i"] = segments["i"].astype("int64")
+        frames["Segments"] = segments
+        return frames
+
+
+def _kv_rows(title: str, values: Optional[Dict[str, object]]) -> List[list]:
+    if not values:
+        return []
+    return [[title, ""]] + [[key, value] for key, value in values.items()]  # spacer/title row first
+
+
+def _build_tables(
+    series: SeriesArrays,
+    peaks: Optional[List[Dict[str, float]]],
+    points: Optional[Dict[str, List[Dict[str, object]]]],
+    segments: Optional[List[Dict[str, object]]],
+    peak_params: Optional[Dict[str, object]],
+    segment_params: Optional[Dict[str, object]],
+    experiment_window: Optional[Dict[str, float]],
+    kept_intervals: Optional[object],
+    stride: int,
+) -> ReportTables:
+    summary: List[list] = []
     if experiment_window:
-        ws_summary.append(["Experiment Window Start", experiment_window.get("start")])
-        ws_summary.append(["Experiment Window End", experiment_window.get("end")])
-    ws_summary.append(["Duration", duration])
-    ws_summary.append(["Max Pressure", max_pressure])
-    ws_summary.append(["Final Volume", final_volume])
-    ws_summary.append(["Peak Count", len(peaks) if peaks else 0])
-    ws_summary.append(["Segment Count", len(segments) if segments else 0])
+        summary.append(["Experiment Window Start", experiment_window.get("start")])
+        summary.append(["Experiment Window End", experiment_window.get("end")])
+    axis = next((series[name][0] for name in ("pressure", "scale", "volume") if name in series), np.empty(0))
+    pressure = series.get("pressure")
+    volume_times, volumes = series.get("volume") or (np.empty(0), None)
+    summary.append(["Duration", _get_duration(axis)])
+    summary.append(["Max Pressure", _get_max_pressure(pressure[1] if pressure else np.empty(0))])
+    summary.append(["Final Volume", _get_final_volume(volume_times, volumes)])
+    summary.append(["Peak Count", len(peaks) if peaks else 0])
+    summary.append(["Segment Count", len(segments) if segments else 0])
     if kept_intervals is not None:
-        ws_summary.append(["Number of kept intervals", kept_intervals])
-    _append_kv_rows(ws_summary, "Peak Detection Params", peak_params)
-    _append_kv_rows(ws_summary, "Onset/Empty Params", segment_params)
-    ws_summary.append(["Generated", datetime.utcnow().isoformat()])
-
-    ws_scale = wb.create_sheet("TimeSeries_Scale")
-    ws_scale.append(["Elapsed Time", "Scale"])
-    for row in data.get("scale", []):
-        ws_scale.append([row.get("Elapsed Time"), row.get("Scale")])
-
-    ws_volume = wb.create_sheet("TimeSeries_Volume")
-    ws_volume.append(["Elapsed Time", "Tot Infused Vol"])
-    for row in data.get("volume", []):
-        ws_volume.append([row.get("Elapsed Time"), row.get("Tot Infused Vol")])
-
-    ws_pressure = wb.create_sheet("TimeSeries_Pressure")
-    ws_pressure.append(["Elapsed Time", "Bladder Pressure"])
-    for row in data.get("pressure", []):
-        ws_pressure.append([row.get("Elapsed Time"), row.get("Bladder Pressure")])
+        summary.append(["Number of kept intervals", kept_intervals])
+    summary.extend(_kv_rows("Peak Detection Params", peak_params))
+    summary.extend(_kv_rows("Onset/Empty Params", segment_params))
+    if stride > 1:
+        summary.append(["Time Series Decimation", f"every {stride} samples"])
+    summary.append(["Generated", datetime.utcnow().isoformat()])
 
-    ws_points = wb.create_sheet("Points")
-    ws_points.append(["Type", "Time", "Value", "Index"])
-    for peak in peaks or []:
-        ws_points.append(["peak", peak.get("time"), peak.get("value"), peak.get("index")])
-    for onset in (points or {}).get("onset", []):
-        ws_points.append(["onset", onset.get("time"), onset.get("value"), onset.get("index")])
-    for empty in (points or {}).get("empty", []):
-        ws_points.append(["empty", empty.get("time"), empty.get("value"), empty.get("index")])
+    sheets = {}
+    for sheet, _, name in SERIES_SHEETS:
+        pair = series.get(name)
+        sheets[sheet] = None if pair is None else (pair[0][::stride], pair[1][::stride])
 
-    ws_segments = wb.create_sheet("Segments")
-    ws_segments.append(
-        [
-            "i",
-            "onsetTime",
-            "peakTime",
-            "emptyTime",
-            "imiSec",
-            "maxPressure",
-            "avgPressureBetweenEmptyAndNextOnset",
-            "deltaVolume",
-        ]
-    )
+    point_rows = [["peak", peak.get("time"), peak.get("value"), peak.get("index")] for peak in peaks or []]
+    for kind in ("onset", "empty"):
+        for point in (points or {}).get(kind, []):
+            point_rows.append([kind, point.get("time"), point.get("value"), point.get("index")])
+
+    segment_rows = []
     for segment in segments or []:
         metrics = segment.get("metrics") or {}
-        ws_segments.append(
+        segment_rows.append(
             [
                 segment.get("i"),
                 segment.get("onsetTime"),
@@ -129,8 +316,206 @@ def create_report(
             ]
         )
 
-    filename = f"report_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    filepath = os.path.join(DOWNLOAD_DIR, filename)
-    wb.save(filepath)
+    return ReportTables(summary, sheets, point_rows, segment_rows)
+
+
+def _append_series(
+    ws,
+    times: np.ndarray,
+    values: np.ndarray,
+    progress: Optional[Callable[[int], None]] = None,
+) -> None:
+    for idx, (t, v) in enumerate(zip(times.tolist(), values.tolist()), 1):
+        ws.append([t, None if v != v else v])
+        if progress is not None and idx % PROGRESS_ROWS == 0:
+            progress(PROGRESS_ROWS)
+
+
+def _write_xlsx(tables: ReportTables, path: str, progress: Optional[Callable[[float], None]]) -> None:
+    """Stream the workbook in openpyxl write-only mode.
+
+    Rows are serialised as they are appended rather than held as cell
+    objects; the series sheets account for 5%..90% of the progress.
+    """
+
+    wb = Workbook(write_only=True)
+    ws_summary = wb.create_sheet("Summary")
+    ws_summary.append(["Metric", "Value"])
+    for row in tables.summary:
+        ws_summary.append(row)
+
+    series_rows = tables.series_rows
+    written = 0
+
+    def series_progress(rows: int) -> None:
+        nonlocal written
+        written += rows
+        if progress is not None and series_rows:
+            progress(0.05 + 0.85 * min(1.0, written / series_rows))
+
+    if progress is not None:
+        progress(0.05)
+
+    for sheet, column, _ in SERIES_SHEETS:
+        ws = wb.create_sheet(sheet)
+        ws.append(["Elapsed Time", column])
+        pair = tables.series[sheet]
+        if pair is not None:
+            _append_series(ws, pair[0], pair[1], series_progress)
+
+    if progress is not None:
+        progress(0.9)
+
+    ws_points = wb.create_sheet("Points")
+    ws_points.append(POINT_COLUMNS)
+    for row in tables.points:
+        ws_points.append(row)
+
+    ws_segments = wb.create_sheet("Segments")
+    ws_segments.append(SEGMENT_COLUMNS)
+    for row in tables.segments:
+        ws_segments.append(row)
+
+    wb.save(path)
+
+
+def _write_csv_zip(tables: ReportTables, path: str, progress: Optional[Callable[[float], None]]) -> None:
+    """One ``<sheet>.csv`` per sheet in a deflated zip; missing values are empty."""
+
+    frames = tables.frames()
+    # Summary keeps its original (untyped) values in CSV.
+    frames["Summary"] = pd.DataFrame(tables.summary, columns=["Metric", "Value"])
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for idx, (sheet, frame) in enumerate(frames.items(), 1):
+            archive.writestr(f"{sheet}.csv", frame.to_csv(index=False))
+            if progress is not None:
+                progress(idx / len(frames))
+
+
+def _write_parquet_zip(tables: ReportTables, path: str, progress: Optional[Callable[[float], None]]) -> None:
+    """One ``<sheet>.parquet`` per sheet in a stored (already compressed) zip."""
+
+    frames = tables.frames()
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for idx, (sheet, frame) in enumerate(frames.items(), 1):
+            buffer = io.BytesIO()
+            frame.to_parquet(buffer, index=False)
+            archive.writestr(f"{sheet}.parquet", buffer.getvalue())
+            if progress is not None:
+                progress(idx / len(frames))
+
+
+def _write_hdf5(tables: ReportTables, path: str, progress: Optional[Callable[[float], None]]) -> None:
+    """One table per sheet in a single HDF5 file, keyed by sheet name."""
+
+    frames = tables.frames()
+    with pd.HDFStore(path, mode="w", complevel=5, complib="zlib") as store:
+        for idx, (sheet, frame) in enumerate(frames.items(), 1):
+            store.put(sheet, frame, format="table")
+            if progress is not None:
+                progress(idx / len(frames))
+
+
+def _has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+
+# format -> (file extension, writer, optional modules of which one is required)
+REPORT_FORMATS: Dict[str, tuple] = {
+    "xlsx": (".xlsx", _write_xlsx, ()),
+    "csv": (".csv.zip", _write_csv_zip, ()),
+    "parquet": (".parquet.zip", _write_parquet_zip, ("pyarrow", "fastparquet")),
+    "hdf5": (".h5", _write_hdf5, ("tables",)),
+}
+
+
+def available_formats() -> List[str]:
+    """Report formats whose optional dependencies are installed."""
+
+    return [
+        name
+        for name, (_, _, modules) in REPORT_FORMATS.items()
+        if not modules or any(_has_module(module) for module in modules)
+    ]
+
+
+def create_report(
+    data: Union[Recording, RowData, SeriesArrays],
+    peaks: Optional[List[Dict[str, float]]] = None,
+    points: Optional[Dict[str, List[Dict[str, object]]]] = None,
+    segments: Optional[List[Dict[str, object]]] = None,
+    peak_params: Optional[Dict[str, object]] = None,
+    segment_params: Optional[Dict[str, object]] = None,
+    experiment_window: Optional[Dict[str, float]] = None,
+    kept_intervals: Optional[object] = None,
+    series_max_rows: Optional[int] = None,
+    progress: Optional[Callable[[float], None]] = None,
+    cache: ReportCache = REPORT_CACHE,
+    output_format: str = "xlsx",
+) -> str:
+    """Write the report and return its filename in the cache directory.
+
+    ``output_format`` selects the file written from the same tables (Summary,
+    TimeSeries_Scale/Volume/Pressure, Points, Segments): ``xlsx`` (one sheet
+    each), ``csv`` or ``parquet`` (a zip with one file per table) or ``hdf5``
+    (one key per table). Parquet and HDF5 need pyarrow/fastparquet and
+    PyTables respectively; ``ValueError`` is raised when they are missing.
+
+    With ``series_max_rows`` the TimeSeries tables keep every n-th sample so
+    that none exceeds that many rows; the Summary records the stride.
+    ``progress`` is called with the completed fraction as tables are written.
+    Identical inputs return the file already in ``cache`` without rebuilding
+    it. Row payloads and ``{series: (times, values)}`` arrays are reported
+    with each series on its own time axis.
+    """
+
+    if output_format not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format: {output_format}")
+    if output_format not in available_formats():
+        modules = " or ".join(REPORT_FORMATS[output_format][2])
+        raise ValueError(f"The {output_format} report format requires {modules} to be installed")
+    extension, writer, _ = REPORT_FORMATS[output_format]
+
+    if kept_intervals is None and isinstance(data, dict):
+        kept_intervals = data.get("kept_intervals")
+    series, fingerprint = _report_series(data)
+
+    key = cache.key(
+        fingerprint,
+        {
+            "peaks": peaks,
+            "points": points,
+            "segments": segments,
+            "peak_params": peak_params,
+            "segment_params": segment_params,
+            "experiment_window": experiment_window,
+            "kept_intervals": kept_intervals,
+            "series_max_rows": series_max_rows,
+            "format": output_format,
+        },
+    )
+    cached = cache.get(key, extension)
+    if cached is not None:
+        if progress is not None:
+            progress(1.0)
+        return cached
+
+    stride = _series_stride(max((len(times) for times, _ in series.values()), default=0), series_max_rows)
+    with stage("report_tables"):
+        tables = _build_tables(
+            series,
+            peaks,
+            points,
+            segments,
+            peak_params,
+            segment_params,
+            experiment_window,
+            kept_intervals,
+            stride,
+        )
+    with stage("report_write"):
+        filename = cache.save(key, extension, lambda path: writer(tables, path, progress))
+    if progress is not None:
+        progress(1.0)
 
     return filename
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
 import bisect
-from typing import Dict, List, Optional, Sequence
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .conditioning import CONDITIONING_CACHE, ConditioningCache, conditioned
+from .recording import Recording, RowData, nearest_indices
+from .timing import timed
 
 PeakPoint = Dict[str, float]
 
@@ -25,45 +31,6 @@ DEFAULT_PARAMS = {
 }
 
 
-def _nearest_index(times: List[float], target: float) -> int:
-    if not times:
-        return 0
-    pos = bisect.bisect_left(times, target)
-    if pos <= 0:
-        return 0
-    if pos >= len(times):
-        return len(times) - 1
-    before = pos - 1
-    after = pos
-    if abs(times[after] - target) < abs(times[before] - target):
-        return after
-    return before
-
-
-def _value_at_time(rows: List[Dict[str, float]], time_key: str, value_key: str, target: float) -> Optional[float]:
-    if not rows:
-        return None
-    times = [float(row.get(time_key, 0)) for row in rows]
-    idx = _nearest_index(times, target)
-    if 0 <= idx < len(rows):
-        value = rows[idx].get(value_key)
-        return float(value) if value is not None else None
-    return None
-
-
-def _average_between(times: List[float], values: List[float], start_time: float, end_time: float) -> Optional[float]:
-    if not times or start_time >= end_time:
-        return None
-    start_idx = _nearest_index(times, start_time)
-    end_idx = _nearest_index(times, end_time)
-    if start_idx >= end_idx:
-        return None
-    segment_values = values[start_idx:end_idx + 1]
-    if not segment_values:
-        return None
-    return sum(segment_values) / len(segment_values)
-
-
 def _median(values: Sequence[float]) -> float:
     if not values:
         return 0.0
@@ -74,14 +41,6 @@ def _median(values: Sequence[float]) -> float:
     return sorted_vals[mid]
 
 
-def _mad(values: Sequence[float]) -> float:
-    if not values:
-        return 0.0
-    med = _median(values)
-    deviations = [abs(v - med) for v in values]
-    return _median(deviations) * 1.4826
-
-
 def _median_filter(values: List[float], kernel: int) -> List[float]:
     if kernel <= 1 or kernel % 2 == 0:
         kernel = max(1, kernel | 1)
@@ -145,6 +104,35 @@ def _derivative(times: List[float], values: List[float], window_sec: float) -> L
     return deriv
 
 
+def _condition_reference(
+    times: List[float], values: List[float], cfg: Dict[str, float]
+) -> Tuple[List[float], List[float]]:
+    """Pure-Python conditioning pipeline kept as the reference for ``condition_signal``."""
+
+    smoothed = _moving_average_by_time(
+        times, _median_filter(values, int(cfg["medianKernel"])), cfg["maWindowSec"]
+    )
+    return smoothed, _derivative(times, smoothed, cfg["derivativeWindowSec"])
+
+
+def _condition(
+    recording: Recording,
+    cfg: Dict[str, float],
+    reference: bool = False,
+    cache: Optional[ConditioningCache] = CONDITIONING_CACHE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    if reference:
+        smoothed, deriv = _condition_reference(recording.time.tolist(), recording.pressure.tolist(), cfg)
+        return np.asarray(smoothed, dtype=np.float64), np.asarray(deriv, dtype=np.float64)
+    return conditioned(
+        recording,
+        int(cfg["medianKernel"]),
+        cfg["maWindowSec"],
+        cfg["derivativeWindowSec"],
+        cache,
+    )
+
+
 def _clean_params(params: Optional[Dict[str, float]]) -> Dict[str, float]:
     cleaned = DEFAULT_PARAMS.copy()
     if not params:
@@ -160,205 +148,353 @@ def _clean_params(params: Optional[Dict[str, float]]) -> Dict[str, float]:
     return cleaned
 
 
-def _sustain_condition(
-    times: List[float],
-    start_idx: int,
+def _robust_stats(window: np.ndarray) -> Tuple[float, float]:
+    """Median and scaled MAD of ``window`` (0.0, 0.0 when empty)."""
+
+    if not window.size:
+        return 0.0, 0.0
+    med = float(np.median(window))
+    return med, float(np.median(np.abs(window - med))) * 1.4826
+
+
+def _first_sustained(
+    times: np.ndarray,
+    lo: int,
+    hi: int,
     sustain_sec: float,
-    predicate,
-) -> bool:
-    end_time = times[start_idx] + sustain_sec
-    idx = start_idx
-    while idx < len(times) and times[idx] <= end_time:
-        if not predicate(idx):
-            return False
-        idx += 1
-    return True
+    mask_fn: Callable[[int, int], np.ndarray],
+) -> Optional[int]:
+    """First index in ``[lo, hi]`` whose condition holds for ``sustain_sec``.
+
+    ``mask_fn(a, b)`` evaluates the condition for indices ``a..b-1``. A
+    candidate is sustained when no failing index occurs before the last
+    sample within ``sustain_sec`` of it, found via the next-failure position.
+    """
+
+    if hi < lo:
+        return None
+    stop = max(hi + 1, int(np.searchsorted(times, times[hi] + sustain_sec, side="right")))
+    mask = mask_fn(lo, stop)
+    candidates = np.flatnonzero(mask[: hi - lo + 1])
+    if not candidates.size:
+        return None
+    failures = np.flatnonzero(~mask)
+    next_failure = np.full(candidates.shape, mask.size)
+    slot = np.searchsorted(failures, candidates)
+    has_failure = slot < failures.size
+    next_failure[has_failure] = failures[slot[has_failure]]
+    last_in_span = np.searchsorted(times, times[lo + candidates] + sustain_sec, side="right") - 1 - lo
+    sustained = np.flatnonzero(next_failure > last_in_span)
+    if not sustained.size:
+        return None
+    return lo + int(candidates[sustained[0]])
 
 
 def _find_onset(
     peak_idx: int,
-    times: List[float],
-    smoothed: List[float],
-    deriv: List[float],
+    times: np.ndarray,
+    smoothed: np.ndarray,
+    rising: np.ndarray,
     cfg: Dict[str, float],
 ) -> int:
     start_time = max(times[0], times[peak_idx] - cfg["preWindowSec"])
     end_time = max(times[0], times[peak_idx] - cfg["guardSec"])
-    start_idx = _nearest_index(times, start_time)
-    end_idx = _nearest_index(times, end_time)
-    window_values = smoothed[start_idx : end_idx + 1]
-    baseline = _median(window_values)
-    noise = _mad(window_values)
+    start_idx, end_idx = nearest_indices(times, np.array([start_time, end_time])).tolist()
+    baseline, noise = _robust_stats(smoothed[start_idx : end_idx + 1])
     threshold = baseline + cfg["kNoise"] * noise
 
-    for idx in range(start_idx, end_idx + 1):
-        if smoothed[idx] <= threshold:
-            continue
-        if deriv[idx] <= cfg["slopeThreshold"]:
-            continue
-        if _sustain_condition(
-            times,
-            idx,
-            cfg["sustainSec"],
-            lambda j: smoothed[j] > threshold and deriv[j] > cfg["slopeThreshold"],
-        ):
-            return idx
+    onset = _first_sustained(
+        times,
+        start_idx,
+        end_idx,
+        cfg["sustainSec"],
+        lambda a, b: (smoothed[a:b] > threshold) & rising[a:b],
+    )
+    if onset is not None:
+        return onset
 
     fallback_time = max(times[0], times[peak_idx] - cfg["fallbackOnsetSec"])
-    return _nearest_index(times, fallback_time)
+    return int(nearest_indices(times, np.array([fallback_time]))[0])
 
 
 def _find_empty(
     peak_idx: int,
-    times: List[float],
-    smoothed: List[float],
-    deriv: List[float],
+    times: np.ndarray,
+    smoothed: np.ndarray,
+    dropping: np.ndarray,
+    flat_slope: np.ndarray,
     cfg: Dict[str, float],
 ) -> int:
     start_time = times[peak_idx] + cfg["minAfterPeakSec"]
     end_time = times[peak_idx] + cfg["postWindowSec"]
-    start_idx = _nearest_index(times, start_time)
-    end_idx = _nearest_index(times, end_time)
-    drop_idx = start_idx
-    for idx in range(start_idx, end_idx + 1):
-        if deriv[idx] < -cfg["dropSlopeThreshold"]:
-            drop_idx = idx
-            break
-
-    post_values = smoothed[drop_idx : end_idx + 1]
-    baseline_post = _median(post_values)
-    noise_post = _mad(post_values)
-
-    def _flat_pred(j: int) -> bool:
-        return (
-            abs(deriv[j]) < cfg["flatSlopeThreshold"]
-            and abs(smoothed[j] - baseline_post) < cfg["flatToleranceKNoise"] * noise_post
-        )
+    fallback_time = times[peak_idx] + cfg["fallbackEmptySec"]
+    start_idx, end_idx, fallback_idx = nearest_indices(
+        times, np.array([start_time, end_time, fallback_time])
+    ).tolist()
 
-    for idx in range(drop_idx, end_idx + 1):
-        if not _flat_pred(idx):
-            continue
-        if _sustain_condition(times, idx, cfg["dwellSec"], _flat_pred):
-            return idx
+    drop_idx = start_idx
+    drops = np.flatnonzero(dropping[start_idx : end_idx + 1])
+    if drops.size:
+        drop_idx = start_idx + int(drops[0])
+
+    baseline_post, noise_post = _robust_stats(smoothed[drop_idx : end_idx + 1])
+    tolerance = cfg["flatToleranceKNoise"] * noise_post
+
+    empty = _first_sustained(
+        times,
+        drop_idx,
+        end_idx,
+        cfg["dwellSec"],
+        lambda a, b: flat_slope[a:b] & (np.abs(smoothed[a:b] - baseline_post) < tolerance),
+    )
+    if empty is not None:
+        return empty
 
     # fallback: min pressure in window
     if end_idx >= start_idx:
-        window = smoothed[start_idx : end_idx + 1]
-        min_val = min(window)
-        local_idx = window.index(min_val)
-        min_idx = start_idx + local_idx
+        min_idx = start_idx + int(np.argmin(smoothed[start_idx : end_idx + 1]))
     else:
         min_idx = peak_idx
-    fallback_time = times[peak_idx] + cfg["fallbackEmptySec"]
-    fallback_idx = _nearest_index(times, fallback_time)
     if start_idx <= min_idx <= end_idx:
         return min_idx
     return fallback_idx
 
 
+class Segmenter:
+    """Onset/empty detection and segment metrics over one conditioned recording.
+
+    Everything peak-independent (conditioning, slope predicates) is computed
+    once here, so each peak costs only its own search windows. ``cfg`` is a
+    cleaned parameter dict; pass ``cache=None`` for short-lived recordings.
+    """
+
+    def __init__(
+        self, recording: Recording, cfg: Dict[str, float], cache: Optional[ConditioningCache] = CONDITIONING_CACHE
+    ) -> None:
+        self.cfg = cfg
+        self.times = recording.time
+        self.pressures = recording.pressure
+        self.volumes = recording.volume
+        self.smoothed, derivatives = _condition(recording, cfg, cache=cache)
+        # Slope predicates do not depend on the peak, so evaluate them once for the batch.
+        self.rising = derivatives > cfg["slopeThreshold"]
+        self.dropping = derivatives < -cfg["dropSlopeThreshold"]
+        self.flat_slope = np.abs(derivatives) < cfg["flatSlopeThreshold"]
+
+    def peak_indices(self, peaks: Sequence[PeakPoint]) -> List[int]:
+        return nearest_indices(self.times, np.array([float(peak.get("time", 0)) for peak in peaks])).tolist()
+
+    def _nearest(self, target: float) -> int:
+        return int(nearest_indices(self.times, np.array([target]))[0])
+
+    def _point(self, index: int) -> Dict[str, float]:
+        return {"time": float(self.times[index]), "value": float(self.pressures[index]), "index": index}
+
+    def points(self, peak_index: int) -> Tuple[Dict[str, float], Dict[str, float], Dict[str, float]]:
+        """Onset, peak and empty points for the peak at sample ``peak_index``."""
+
+        cfg = self.cfg
+        times = self.times
+        peak_time = float(times[peak_index])
+        onset_index = _find_onset(peak_index, times, self.smoothed, self.rising, cfg)
+        empty_index = _find_empty(peak_index, times, self.smoothed, self.dropping, self.flat_slope, cfg)
+
+        # Enforce ordering strictly
+        if times[onset_index] >= peak_time:
+            onset_index = self._nearest(max(float(times[0]), peak_time - cfg["fallbackOnsetSec"]))
+        if times[empty_index] <= peak_time:
+            empty_index = self._nearest(peak_time + cfg["fallbackEmptySec"])
+        if times[empty_index] <= times[onset_index]:
+            empty_index = self._nearest(float(times[onset_index]) + max(cfg["minAfterPeakSec"], cfg["dwellSec"]))
+
+        return self._point(onset_index), self._point(peak_index), self._point(empty_index)
+
+    def _volume_at(self, target: float) -> Optional[float]:
+        if self.volumes is None or not self.times.size:
+            return None
+        value = float(self.volumes[self._nearest(target)])
+        return value if value == value else None
+
+    def segment(
+        self,
+        i: int,
+        onset: Dict[str, float],
+        peak: Dict[str, float],
+        empty: Dict[str, float],
+        previous_empty: Optional[float],
+    ) -> Dict[str, object]:
+        delta_volume = None
+        onset_volume = self._volume_at(onset["time"])
+        empty_volume = self._volume_at(empty["time"])
+        if onset_volume is not None and empty_volume is not None:
+            delta_volume = empty_volume - onset_volume
+        return {
+            "i": i,
+            "onsetTime": onset["time"],
+            "peakTime": peak["time"],
+            "emptyTime": empty["time"],
+            "metrics": {
+                "imiSec": _imi(previous_empty, onset["time"]),
+                "maxPressure": peak["value"],
+                "avgPressureBetweenEmptyAndNextOnset": None,
+                "deltaVolume": delta_volume,
+            },
+        }
+
+    def average_between(self, start_time: Optional[float], end_time: Optional[float]) -> Optional[float]:
+        """Mean pressure from ``start_time`` to ``end_time`` (nearest samples, inclusive)."""
+
+        if start_time is None or end_time is None or start_time >= end_time or not self.times.size:
+            return None
+        start_idx, end_idx = nearest_indices(self.times, np.array([start_time, end_time])).tolist()
+        if start_idx >= end_idx:
+            return None
+        # Summed in Python, in order, to match the reference result to the last bit.
+        return sum(self.pressures[start_idx : end_idx + 1].tolist()) / (end_idx - start_idx + 1)
+
+
+def _imi(previous_empty: Optional[float], onset_time: Optional[float]) -> Optional[float]:
+    if previous_empty is None or onset_time is None:
+        return None
+    return onset_time - previous_empty if onset_time > previous_empty else None
+
+
+@timed("segments")
 def derive_segments(
-    data: Dict[str, List[Dict[str, float]]],
+    data: Union[Recording, RowData],
     peaks: List[PeakPoint],
     params: Optional[Dict[str, float]] = None,
 ) -> Dict[str, object]:
     cfg = _clean_params(params or {})
 
-    pressure_rows = data.get("pressure") or []
-    volume_rows = data.get("volume") or []
-
-    times = [float(row.get("Elapsed Time", 0)) for row in pressure_rows]
-    pressures = [float(row.get("Bladder Pressure", 0)) for row in pressure_rows]
-
-    if not times or not peaks:
+    recording = Recording.coerce(data)
+    if not recording.time.size or not peaks:
         return {"points": {"onset": [], "peak": [], "empty": []}, "segments": []}
 
-    smoothed = _moving_average_by_time(
-        times, _median_filter(pressures, int(cfg["medianKernel"])), cfg["maWindowSec"]
-    )
-    derivatives = _derivative(times, smoothed, cfg["derivativeWindowSec"])
-
+    segmenter = Segmenter(recording, cfg)
     ordered_peaks = sorted(peaks, key=lambda p: p.get("time", 0))
     onset_points = []
     peak_points = []
     empty_points = []
     segments = []
 
-    for idx, peak in enumerate(ordered_peaks):
-        peak_index = _nearest_index(times, float(peak.get("time", 0)))
-        peak_time = times[peak_index]
-        peak_value = pressures[peak_index]
-
-        onset_index = _find_onset(peak_index, times, smoothed, derivatives, cfg)
-        onset_time = times[onset_index]
-        onset_value = pressures[onset_index]
-
-        empty_index = _find_empty(peak_index, times, smoothed, derivatives, cfg)
-        empty_time = times[empty_index]
-        empty_value = pressures[empty_index]
-
-        # Enforce ordering strictly
-        if onset_time >= peak_time:
-            fallback_time = max(times[0], peak_time - cfg["fallbackOnsetSec"])
-            onset_index = _nearest_index(times, fallback_time)
-            onset_time = times[onset_index]
-            onset_value = pressures[onset_index]
-
-        if empty_time <= peak_time:
-            fallback_time = peak_time + cfg["fallbackEmptySec"]
-            empty_index = _nearest_index(times, fallback_time)
-            empty_time = times[empty_index]
-            empty_value = pressures[empty_index]
-
-        if empty_time <= onset_time:
-            fallback_time = onset_time + max(cfg["minAfterPeakSec"], cfg["dwellSec"])
-            empty_index = _nearest_index(times, fallback_time)
-            empty_time = times[min(empty_index, len(times) - 1)]
-            empty_value = pressures[min(empty_index, len(pressures) - 1)]
-
-        peak_points.append({"time": peak_time, "value": peak_value, "index": peak_index})
-        onset_points.append(
-            {"time": onset_time, "value": onset_value, "index": onset_index}
-        )
-        empty_points.append(
-            {"time": empty_time, "value": empty_value, "index": empty_index}
-        )
-
-        imi = None
-        if segments:
-            prev_empty = segments[-1]["emptyTime"]
-            imi = onset_time - prev_empty if onset_time > prev_empty else None
-
-        delta_volume = None
-        onset_volume = _value_at_time(
-            volume_rows, "Elapsed Time", "Tot Infused Vol", onset_time
-        )
-        empty_volume = _value_at_time(
-            volume_rows, "Elapsed Time", "Tot Infused Vol", empty_time
-        )
-        if onset_volume is not None and empty_volume is not None:
-            delta_volume = empty_volume - onset_volume
-
-        segments.append(
-            {
-                "i": idx,
-                "onsetTime": onset_time,
-                "peakTime": peak_time,
-                "emptyTime": empty_time,
-                "metrics": {
-                    "imiSec": imi,
-                    "maxPressure": peak_value,
-                    "avgPressureBetweenEmptyAndNextOnset": None,
-                    "deltaVolume": delta_volume,
-                },
-            }
-        )
+    for idx, peak_index in enumerate(segmenter.peak_indices(ordered_peaks)):
+        onset, peak, empty = segmenter.points(peak_index)
+        onset_points.append(onset)
+        peak_points.append(peak)
+        empty_points.append(empty)
+        previous_empty = segments[-1]["emptyTime"] if segments else None
+        segments.append(segmenter.segment(idx, onset, peak, empty, previous_empty))
 
     for idx, segment in enumerate(segments[:-1]):
-        next_onset = segments[idx + 1]["onsetTime"]
-        avg_pressure = _average_between(times, pressures, segment["emptyTime"], next_onset)
-        segment["metrics"]["avgPressureBetweenEmptyAndNextOnset"] = avg_pressure
+        segment["metrics"]["avgPressureBetweenEmptyAndNextOnset"] = segmenter.average_between(
+            segment["emptyTime"], segments[idx + 1]["onsetTime"]
+        )
 
     return {
         "points": {"onset": onset_points, "peak": peak_points, "empty": empty_points},
         "segments": segments,
     }
+
+
+@timed("segments")
+def patch_segments(
+    data: Union[Recording, RowData],
+    previous: Dict[str, object],
+    changes: Dict[str, List[object]],
+    params: Optional[Dict[str, float]] = None,
+) -> Dict[str, object]:
+    """Update a :func:`derive_segments` result for added, removed and moved peaks.
+
+    ``previous`` is the earlier result (its onset/empty points may have been
+    edited by hand) and ``changes`` holds ``added`` and ``removed`` peak lists
+    and ``moved`` ``{"from": peak, "to": peak}`` pairs. Only the new peaks are
+    searched for onset/empty points; surviving segments keep theirs and get
+    their ``imiSec`` and ``avgPressureBetweenEmptyAndNextOnset`` recomputed when
+    a neighbour changed.
+
+    Returns ``removed``, the indices into ``previous`` that no longer apply
+    (deleted peaks and segments whose metrics or index changed), ``upserted``, the new
+    or updated entries (``onset``, ``peak``, ``empty`` and ``segment``) at
+    their index ``i`` in the patched result, and ``count``, its length. The
+    unchanged segments fill the remaining slots in their previous order.
+    Adding or removing a peak shifts the index ``i`` of every later segment,
+    and each shifted one is removed and upserted again, so the patch is
+    O(segments after the change) rather than O(1): removing the first of 14
+    segments removes indices 0 to 13 and upserts the 13 others at 0 to 12.
+    Removed and moved peaks are matched to ``previous`` by the sample they
+    snap to. Raises ``ValueError`` if one is not in ``previous``.
+    """
+
+    cfg = _clean_params(params or {})
+    recording = Recording.coerce(data)
+    points = previous["points"]
+    old = list(zip(points["onset"], points["peak"], points["empty"], previous["segments"]))
+    if not len(points["onset"]) == len(points["peak"]) == len(points["empty"]) == len(old):
+        raise ValueError("previous points and segments differ in length")
+
+    moved = changes.get("moved") or []
+    removed_peaks = list(changes.get("removed") or []) + [pair["from"] for pair in moved]
+    added_peaks = list(changes.get("added") or []) + [pair["to"] for pair in moved]
+    if not recording.time.size:
+        raise ValueError("recording has no samples")
+
+    # Peaks are matched on the sample they snap to, as derive_segments does,
+    # so times that differ by rounding still match.
+    removed = set()
+    if removed_peaks:
+        times = recording.time
+        old_samples = nearest_indices(times, np.array([float(entry[1]["time"]) for entry in old])).tolist()
+        targets = nearest_indices(times, np.array([float(peak["time"]) for peak in removed_peaks]))
+        for target in targets.tolist():
+            match = next(
+                (idx for idx, sample in enumerate(old_samples) if idx not in removed and sample == target), None
+            )
+            if match is None:
+                raise ValueError(f"Peak at {float(times[target])} is not in the previous result")
+            removed.add(match)
+
+    # (previous index or None, onset, peak, empty, segment or None), in peak order.
+    merged: List[Tuple[Optional[int], Dict, Dict, Dict, Optional[Dict]]] = [
+        (idx, *entry) for idx, entry in enumerate(old) if idx not in removed
+    ]
+    segmenter = Segmenter(recording, cfg)
+    for peak_index in sorted(segmenter.peak_indices(added_peaks)):
+        onset, peak, empty = segmenter.points(peak_index)
+        position = bisect.bisect_right([entry[2]["time"] for entry in merged], peak["time"])
+        merged.insert(position, (None, onset, peak, empty, None))
+
+    segments: List[Dict[str, object]] = []
+    upserted = []
+    # Upserted entries whose neighbours changed, so their metrics need recomputing.
+    changed = []
+    for position, (old_index, onset, peak, empty, segment) in enumerate(merged):
+        previous_empty = segments[-1]["emptyTime"] if segments else None
+        if segment is None:
+            segment = segmenter.segment(position, onset, peak, empty, previous_empty)
+        else:
+            before = merged[position - 1][0] if position else -1
+            after = merged[position + 1][0] if position + 1 < len(merged) else len(old)
+            if before == old_index - 1 and after == old_index + 1:
+                if segment.get("i") != position:
+                    # Same neighbours, shifted slot: only the index changes.
+                    removed.add(old_index)
+                    segment = {**segment, "i": position}
+                    upserted.append({"i": position, "onset": onset, "peak": peak, "empty": empty, "segment": segment})
+                segments.append(segment)
+                continue
+            removed.add(old_index)
+            metrics = {**segment["metrics"], "imiSec": _imi(previous_empty, segment["onsetTime"])}
+            segment = {**segment, "i": position, "metrics": metrics}
+        segments.append(segment)
+        upserted.append({"i": position, "onset": onset, "peak": peak, "empty": empty, "segment": segment})
+        changed.append(upserted[-1])
+
+    for entry in changed:
+        position = entry["i"]
+        next_onset = segments[position + 1]["onsetTime"] if position + 1 < len(segments) else None
+        entry["segment"]["metrics"]["avgPressureBetweenEmptyAndNextOnset"] = segmenter.average_between(
+            entry["segment"]["emptyTime"], next_onset
+        )
+
+    return {"removed": sorted(removed), "upserted": upserted, "count": len(merged)}
@@ -0,0 +1,206 @@
+"""In-process store for parsed recordings so uploads are parsed once and referenced by ID."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Optional
+
+import numpy as np
+
+from .recording import Recording
+from .validation import ValidationError, pressure_error
+
+
+class _Entry:
+    __slots__ = ("recording", "nbytes", "last_access", "invalid")
+
+    def __init__(
+        self,
+        recording: Optional[Recording],
+        nbytes: int,
+        last_access: float,
+        invalid: Optional[ValidationError] = None,
+    ) -> None:
+        self.recording = recording
+        self.nbytes = nbytes
+        self.last_access = last_access
+        self.invalid = invalid
+
+
+class SessionStore:
+    """Thread-safe LRU/TTL store of parsed recordings keyed by dataset ID.
+
+    Entries are evicted least-recently-used first once ``max_entries`` or
+    ``max_bytes`` is exceeded, and expire ``ttl_seconds`` after their last
+    access. When ``spill_dir`` is set, entries evicted for memory pressure are
+    written to disk as ``.npz`` files and transparently reloaded on access
+    instead of being dropped.
+
+    The pressure column is checked once on :meth:`put`; :meth:`invalid`
+    returns the validation error it would raise as a row payload.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 32,
+        ttl_seconds: float = 3600.0,
+        max_bytes: int = 512 * 1024 * 1024,
+        spill_dir: Optional[str] = None,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_bytes = max(0, int(max_bytes))
+        self.spill_dir = spill_dir
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._resident_bytes = 0
+        self._lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def put(self, recording: Recording) -> str:
+        dataset_id = uuid.uuid4().hex
+        entry = _Entry(recording, recording.nbytes, time.monotonic(), pressure_error(recording))
+
+        with self._lock:
+            self._entries[dataset_id] = entry
+            self._resident_bytes += entry.nbytes
+            self._evict_locked(keep=dataset_id)
+        return dataset_id
+
+    def get(self, dataset_id: str) -> Optional[Recording]:
+        if not isinstance(dataset_id, str):
+            return None
+        with self._lock:
+            self._expire_locked()
+            entry = self._entries.get(dataset_id)
+            if entry is None:
+                return None
+            entry.last_access = time.monotonic()
+            self._entries.move_to_end(dataset_id)
+            if entry.recording is None:
+                entry.recording = self._load_spilled(dataset_id)
+                if entry.recording is None:
+                    del self._entries[dataset_id]
+                    return None
+                self._resident_bytes += entry.nbytes
+                self._evict_locked(keep=dataset_id)
+            return entry.recording
+
+    def invalid(self, dataset_id: str) -> Optional[ValidationError]:
+        """The pressure validation error recorded for ``dataset_id`` when it was stored."""
+
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            return entry.invalid if entry is not None else None
+
+    def discard(self, dataset_id: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(dataset_id, None)
+            if entry is not None:
+                self._drop_locked(dataset_id, entry)
+
+    def __contains__(self, dataset_id: object) -> bool:
+        with self._lock:
+            self._expire_locked()
+            return dataset_id in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire_locked()
+            return len(self._entries)
+
+    @property
+    def resident_bytes(self) -> int:
+        return self._resident_bytes
+
+    def _expire_locked(self) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [key for key, entry in self._entries.items() if entry.last_access < cutoff]
+        for key in expired:
+            self._drop_locked(key, self._entries.pop(key))
+
+    def _evict_locked(self, keep: Optional[str] = None) -> None:
+        self._expire_locked()
+        while len(self._entries) > self.max_entries:
+            key, entry = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            self._drop_locked(key, entry)
+
+        if not self.max_bytes:
+            return
+        for key in list(self._entries):
+            if self._resident_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            entry = self._entries[key]
+            if entry.recording is None:
+                continue
+            if self.spill_dir and self._spill(key, entry.recording):
+                entry.recording = None
+                self._resident_bytes -= entry.nbytes
+            else:
+                del self._entries[key]
+                self._drop_locked(key, entry)
+
+    def _drop_locked(self, dataset_id: str, entry: _Entry) -> None:
+        if entry.recording is not None:
+            self._resident_bytes -= entry.nbytes
+        elif self.spill_dir:
+            try:
+                os.remove(self._spill_path(dataset_id))
+            except OSError:
+                pass
+
+    def _spill_path(self, dataset_id: str) -> str:
+        return os.path.join(self.spill_dir or "", f"{dataset_id}.npz")
+
+    def _spill(self, dataset_id: str, recording: Recording) -> bool:
+        columns = recording.to_columns()
+        try:
+            # npz member names cannot contain arbitrary characters reliably, so store by position.
+            keys = list(columns)
+            extras = {}
+            if recording.annotations is not None:
+                extras["__annotations__"] = np.array(json.dumps(recording.annotations))
+            np.savez(
+                self._spill_path(dataset_id),
+                __keys__=np.array(keys),
+                **{f"c{idx}": columns[key] for idx, key in enumerate(keys)},
+                **extras,
+            )
+        except OSError:
+            return False
+        return True
+
+    def _load_spilled(self, dataset_id: str) -> Optional[Recording]:
+        path = self._spill_path(dataset_id)
+        try:
+            with np.load(path) as archive:
+                keys = [str(key) for key in archive["__keys__"]]
+                columns = {key: archive[f"c{idx}"] for idx, key in enumerate(keys)}
+                annotations = (
+                    json.loads(str(archive["__annotations__"]))
+                    if "__annotations__" in archive.files
+                    else None
+                )
+        except (OSError, KeyError, ValueError):
+            return None
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        recording = Recording.from_columns(columns)
+        if annotations is not None:
+            recording = replace(recording, annotations=annotations)
+        return recording
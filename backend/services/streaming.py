@@ -0,0 +1,408 @@
+"""Live ingest of a growing recording with online void detection.
+
+A :class:`LiveStream` is fed the instrument's text export a chunk at a time,
+as it is written during acquisition. Samples go into a fixed-capacity
+:class:`RingBuffer`, so memory stays bounded however long the experiment
+runs. After every chunk the recent part of the buffer is rescanned: peaks are
+found with the usual ``find_peaks`` parameters and a void is reported once
+enough signal has arrived after its peak for the empty-point search to be
+final (``postWindowSec`` plus a margin). Its onset, peak and empty points and
+segment metrics are computed with the same :class:`~services.segments.Segmenter`
+as ``derive_segments``, so completed voids match the batch analysis of the
+same samples, except that peak prominence is measured within the scanned
+window rather than the whole recording.
+
+Events carry increasing ``seq`` numbers: ``void`` when a segment completes
+and ``metrics`` when the previous segment's
+``avgPressureBetweenEmptyAndNextOnset`` becomes known.
+"""
+
+from __future__ import annotations
+
+import codecs
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .parsing import HEADER_SEARCH_LINES, REQUIRED_COLUMNS, _header_columns
+from .peaks import find_peak_indices
+from .recording import PRESSURE_KEY, SCALE_KEY, TIME_KEY, VOLUME_KEY, Recording
+from .segments import Segmenter, _clean_params
+from .session_store import SessionStore
+from .timing import timed
+
+# Column order of the ring buffer and of parsed sample blocks.
+COLUMNS = (TIME_KEY, PRESSURE_KEY, SCALE_KEY, VOLUME_KEY)
+_ATTRS = (("time", TIME_KEY), ("pressure", PRESSURE_KEY), ("scale", SCALE_KEY), ("volume", VOLUME_KEY))
+DEFAULT_CAPACITY = 1 << 16
+DEFAULT_PEAK_PARAMS = {"distance": 200, "prominence": 5.0}
+# Conditioning filters only look a few seconds around each sample; scanned
+# windows are padded by this much so their edge effects stay outside the
+# onset/empty search ranges.
+MARGIN_SEC = 10.0
+# Expired stream ids remembered with the dataset their samples were kept as.
+EXPIRED_IDS = 256
+
+Event = Dict[str, Any]
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of float64 columns keeping the newest samples.
+
+    Every sample is stored twice, at ``i`` and ``i + capacity``, so the
+    retained samples always form one contiguous slice and reads are views.
+    """
+
+    def __init__(self, capacity: int, columns: Sequence[str]) -> None:
+        self.capacity = max(1, int(capacity))
+        self.columns = tuple(columns)
+        self._data = np.full((len(self.columns), 2 * self.capacity), np.nan)
+        self.end = 0  # samples written since the start
+
+    def __len__(self) -> int:
+        return min(self.end, self.capacity)
+
+    @property
+    def start(self) -> int:
+        """Sample number of the oldest retained sample."""
+
+        return self.end - len(self)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._data.nbytes)
+
+    def append(self, block: np.ndarray) -> None:
+        """Append a ``(columns, n)`` block, overwriting the oldest samples."""
+
+        count = block.shape[1]
+        if count > self.capacity:
+            self.end += count - self.capacity
+            block = block[:, -self.capacity :]
+            count = self.capacity
+        positions = (self.end + np.arange(count)) % self.capacity
+        self._data[:, positions] = block
+        self._data[:, positions + self.capacity] = block
+        self.end += count
+
+    def column(self, name: str) -> np.ndarray:
+        offset = self.start % self.capacity
+        return self._data[self.columns.index(name), offset : offset + len(self)]
+
+
+def _number(field: str) -> float:
+    try:
+        return float(field)
+    except ValueError:
+        return math.nan
+
+
+class ExportLineParser:
+    """Incremental parser for the text export, fed arbitrary chunks of text.
+
+    The preamble is skipped up to the header row, as in
+    ``process_uploaded_data``. Unparseable values become NaN and rows without
+    a valid ``Elapsed Time`` are counted in ``skipped``.
+    """
+
+    def __init__(self, delimiter: str = "\t") -> None:
+        self.delimiter = delimiter
+        self.positions: Optional[List[int]] = None
+        self.skipped = 0
+        self._preamble = 0
+        self._partial = ""
+
+    def feed(self, text: str) -> np.ndarray:
+        """Parse the complete lines in ``text`` into a ``(len(COLUMNS), n)`` block."""
+
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        rows: List[List[float]] = []
+        for line in lines:
+            line = line.rstrip("\r")
+            if self.positions is None:
+                header = _header_columns(line, self.delimiter)
+                if header is not None:
+                    self.positions = [header.index(column) for column in COLUMNS]
+                    continue
+                self._preamble += 1
+                if self._preamble >= HEADER_SEARCH_LINES:
+                    raise ValueError(
+                        "Could not locate header row with required columns: " + ", ".join(REQUIRED_COLUMNS)
+                    )
+                continue
+            if not line.strip():
+                continue
+            fields = line.split(self.delimiter)
+            row = [_number(fields[position]) if position < len(fields) else math.nan for position in self.positions]
+            if row[0] == row[0]:
+                rows.append(row)
+            else:
+                self.skipped += 1
+        return np.array(rows, dtype=np.float64).reshape(-1, len(COLUMNS)).T
+
+    def flush(self) -> np.ndarray:
+        """Parse a trailing line that has no newline yet."""
+
+        return self.feed("\n") if self._partial else np.empty((len(COLUMNS), 0))
+
+
+class LiveStream:
+    """A recording that grows chunk by chunk and reports voids as they complete."""
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        peak_params: Optional[Dict[str, float]] = None,
+        segment_params: Optional[Dict[str, float]] = None,
+        delimiter: str = "\t",
+        max_events: int = 1024,
+    ) -> None:
+        self.id = uuid.uuid4().hex
+        self.buffer = RingBuffer(capacity, COLUMNS)
+        self.parser = ExportLineParser(delimiter)
+        self.peak_params = dict(DEFAULT_PEAK_PARAMS if peak_params is None else peak_params)
+        self.cfg = _clean_params(segment_params or {})
+        self.events: "deque[Event]" = deque(maxlen=max(1, int(max_events)))
+        self.rejected = 0
+        self.closed = False
+        self.last_active = time.monotonic()
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._seq = 0
+        self._voids = 0
+        self._last_segment: Optional[Dict[str, Any]] = None
+        self._scanned_to = -math.inf
+        self._changed = threading.Condition()
+
+    def feed(self, data: bytes) -> List[Event]:
+        """Append a chunk of the raw export; returns the events it completed."""
+
+        with self._changed:
+            return self._append(self.parser.feed(self._decoder.decode(data)))
+
+    def append(self, times, pressure, scale=None, volume=None) -> List[Event]:
+        """Append sample arrays directly; ``scale``/``volume`` default to NaN."""
+
+        times = np.asarray(times, dtype=np.float64)
+        missing = np.full(times.shape, np.nan)
+        block = np.vstack(
+            [
+                times,
+                np.asarray(pressure, dtype=np.float64),
+                missing if scale is None else np.asarray(scale, dtype=np.float64),
+                missing if volume is None else np.asarray(volume, dtype=np.float64),
+            ]
+        )
+        with self._changed:
+            return self._append(block)
+
+    def close(self) -> List[Event]:
+        """Flush the trailing partial line and report voids still in progress."""
+
+        with self._changed:
+            if self.closed:
+                return []
+            events: List[Event] = []
+            try:
+                events += self._append(self.parser.feed(self._decoder.decode(b"", final=True)))
+                events += self._append(self.parser.flush())
+            except ValueError:
+                # Already reported when the data arrived; keep the samples parsed so far.
+                pass
+            events += self._scan(final=True)
+            self.closed = True
+            self._changed.notify_all()
+            return events
+
+    def events_after(self, after: int, wait: float = 0.0) -> Dict[str, Any]:
+        """Events with ``seq > after``, waiting up to ``wait`` seconds for one."""
+
+        with self._changed:
+            if wait > 0 and not self.closed and self._seq <= after:
+                self._changed.wait_for(lambda: self.closed or self._seq > after, timeout=wait)
+            events = [event for event in self.events if event["seq"] > after]
+            first = events[0]["seq"] if events else self._seq + 1
+            return {"events": events, "missed": max(0, first - max(after, 0) - 1), **self._status()}
+
+    def status(self) -> Dict[str, Any]:
+        with self._changed:
+            return self._status()
+
+    def recording(self) -> Recording:
+        """Copy of the retained samples; columns that were never filled are dropped."""
+
+        with self._changed:
+            columns = {name: self.buffer.column(name).copy() for name in COLUMNS}
+        for name in (SCALE_KEY, VOLUME_KEY):
+            if np.isnan(columns[name]).all():
+                del columns[name]
+        return Recording.from_columns(columns)
+
+    def _status(self) -> Dict[str, Any]:
+        times = self.buffer.column(TIME_KEY)
+        return {
+            "streamId": self.id,
+            "next": self._seq,
+            "samples": len(self.buffer),
+            "received": self.buffer.end,
+            "overwritten": self.buffer.start,
+            "rejected": self.rejected,
+            "skippedLines": self.parser.skipped,
+            "voids": self._voids,
+            "lastTime": float(times[-1]) if times.size else None,
+            "closed": self.closed,
+        }
+
+    @timed("ingest")
+    def _append(self, block: np.ndarray) -> List[Event]:
+        if self.closed:
+            raise ValueError("Stream is closed")
+        self.last_active = time.monotonic()
+        if not block.shape[1]:
+            return []
+        # Only samples later than everything before them are kept.
+        times = self.buffer.column(TIME_KEY)
+        previous = np.maximum.accumulate(np.r_[times[-1] if times.size else -np.inf, block[0, :-1]])
+        keep = block[0] > previous
+        if not keep.all():
+            self.rejected += int(block.shape[1] - keep.sum())
+            block = block[:, keep]
+        self.buffer.append(block)
+        return self._scan()
+
+    def _scan(self, final: bool = False) -> List[Event]:
+        times = self.buffer.column(TIME_KEY)
+        if not times.size:
+            return []
+        cfg = self.cfg
+        horizon = float(times[-1]) if final else float(times[-1]) - cfg["postWindowSec"] - MARGIN_SEC
+        if horizon <= self._scanned_to:
+            return []
+
+        start = self._scanned_to - cfg["preWindowSec"] - MARGIN_SEC
+        if self._last_segment is not None:
+            start = min(start, self._last_segment["emptyTime"] - MARGIN_SEC)
+        lo = int(np.searchsorted(times, start, side="left"))
+        window = Recording(**{attr: self.buffer.column(name)[lo:] for attr, name in _ATTRS})
+        indices, _ = find_peak_indices(window.pressure, self.peak_params)
+        peak_times = window.time[indices]
+        indices = indices[(peak_times > self._scanned_to) & (peak_times <= horizon)]
+        self._scanned_to = horizon
+        if not indices.size:
+            return []
+
+        segmenter = Segmenter(window, cfg, cache=None)
+        offset = self.buffer.start + lo
+        events: List[Event] = []
+        for peak_index in indices.tolist():
+            onset, peak, empty = segmenter.points(peak_index)
+            for point in (onset, peak, empty):
+                point["index"] += offset
+            previous = self._last_segment
+            segment = segmenter.segment(
+                self._voids, onset, peak, empty, previous["emptyTime"] if previous else None
+            )
+            if previous is not None:
+                average = segmenter.average_between(previous["emptyTime"], segment["onsetTime"])
+                previous["metrics"]["avgPressureBetweenEmptyAndNextOnset"] = average
+                events.append(
+                    self._emit("metrics", i=previous["i"], metrics={"avgPressureBetweenEmptyAndNextOnset": average})
+                )
+            events.append(self._emit("void", segment=segment, onset=onset, peak=peak, empty=empty))
+            self._last_segment = segment
+            self._voids += 1
+        self._changed.notify_all()
+        return events
+
+    def _emit(self, kind: str, **payload: Any) -> Event:
+        self._seq += 1
+        event = {"seq": self._seq, "type": kind, **payload}
+        self.events.append(event)
+        return event
+
+
+class StreamRegistry:
+    """Open live streams by id, bounded in number and closed after ``idle_ttl`` seconds.
+
+    A stream is finished the same way whether it is deleted or expires: it is
+    closed and, when ``store`` is given, its samples are kept there as a
+    dataset. Expired streams are finished outside the registry lock.
+    """
+
+    def __init__(
+        self,
+        max_streams: int = 8,
+        idle_ttl: float = 3600,
+        capacity: int = DEFAULT_CAPACITY,
+        store: Optional[SessionStore] = None,
+    ) -> None:
+        self.max_streams = max(1, int(max_streams))
+        self.idle_ttl = float(idle_ttl)
+        self.capacity = max(1, int(capacity))
+        self.store = store
+        self._streams: "OrderedDict[str, LiveStream]" = OrderedDict()
+        self._expired: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, **options: Any) -> LiveStream:
+        """Start a :class:`LiveStream`; raises ``RuntimeError`` when all slots are taken."""
+
+        stream = None
+        with self._lock:
+            expired = self._prune_locked()
+            if len(self._streams) < self.max_streams:
+                stream = LiveStream(capacity=self.capacity, **options)
+                self._streams[stream.id] = stream
+        self._finish_expired(expired)
+        if stream is None:
+            raise RuntimeError("Too many open streams")
+        return stream
+
+    def get(self, stream_id: str) -> Optional[LiveStream]:
+        with self._lock:
+            expired = self._prune_locked()
+            stream = self._streams.get(stream_id)
+        self._finish_expired(expired)
+        return stream
+
+    def pop(self, stream_id: str) -> Optional[LiveStream]:
+        with self._lock:
+            return self._streams.pop(stream_id, None)
+
+    def finish(self, stream: LiveStream) -> Tuple[List[Event], Optional[str]]:
+        """Close ``stream`` and keep its samples in ``store``; returns ``(events, dataset id)``."""
+
+        events = stream.close()
+        recording = stream.recording()
+        dataset_id = self.store.put(recording) if self.store is not None and len(recording) else None
+        return events, dataset_id
+
+    def expired_dataset(self, stream_id: str) -> Optional[str]:
+        """Dataset id kept for a stream that expired, if it is still remembered."""
+
+        with self._lock:
+            return self._expired.get(stream_id)
+
+    def _prune_locked(self) -> List[LiveStream]:
+        if self.idle_ttl <= 0:
+            return []
+        cutoff = time.monotonic() - self.idle_ttl
+        expired = [key for key, stream in self._streams.items() if stream.last_active < cutoff]
+        return [self._streams.pop(key) for key in expired]
+
+    def _finish_expired(self, streams: List[LiveStream]) -> None:
+        for stream in streams:
+            _, dataset_id = self.finish(stream)
+            with self._lock:
+                self._expired[stream.id] = dataset_id
+                while len(self._expired) > EXPIRED_IDS:
+                    self._expired.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._streams)
@@ -0,0 +1,155 @@
+"""Request-scoped stage timing and per-route latency histograms.
+
+Service functions mark their expensive sections with :func:`stage` (or the
+:func:`timed` decorator). Durations are only collected while a request has
+called :func:`start`; outside a request (batch runs, benchmarks, job threads)
+the markers cost a context-variable lookup and record nothing. Stages may
+nest, so a stage's duration includes any stages inside it.
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+StageTimes = Dict[str, List[float]]  # name -> [seconds, calls]
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_STAGES: ContextVar[Optional[StageTimes]] = ContextVar("visio_stages", default=None)
+
+
+def start() -> Token:
+    """Begin collecting stage timings in the current context."""
+
+    return _STAGES.set({})
+
+
+def finish(token: Token) -> StageTimes:
+    """Stop collecting and return what was recorded since :func:`start`."""
+
+    stages = _STAGES.get() or {}
+    _STAGES.reset(token)
+    return stages
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    stages = _STAGES.get()
+    if stages is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry = stages.setdefault(name, [0.0, 0])
+        entry[0] += time.perf_counter() - started
+        entry[1] += 1
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator form of :func:`stage`."""
+
+    def decorate(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _STAGES.get() is None:
+                return fn(*args, **kwargs)
+            with stage(name):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def server_timing(stages: StageTimes, total: Optional[float] = None) -> str:
+    """Format stage timings as a ``Server-Timing`` header value (milliseconds)."""
+
+    parts = []
+    for name, (seconds, calls) in stages.items():
+        desc = f';desc="{calls} calls"' if calls > 1 else ""
+        parts.append(f"{name};dur={seconds * 1000:.2f}{desc}")
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+class RequestMetrics:
+    """Latency histograms per route plus cumulative time per (route, stage).
+
+    :meth:`render` produces the Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, prefix: str = "visio") -> None:
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        self.prefix = prefix
+        self._requests: Dict[Tuple[str, str, str], List[Any]] = {}
+        self._stages: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route: str, method: str, status: int, seconds: float, stages: StageTimes) -> None:
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            entry = self._requests.get((route, method, str(status)))
+            if entry is None:
+                entry = self._requests[(route, method, str(status))] = [[0] * len(self.buckets), 0, 0.0]
+            if bucket < len(self.buckets):
+                entry[0][bucket] += 1
+            entry[1] += 1
+            entry[2] += seconds
+            for name, (stage_seconds, calls) in stages.items():
+                totals = self._stages.setdefault((route, name), [0.0, 0])
+                totals[0] += stage_seconds
+                totals[1] += calls
+
+    def render(self) -> str:
+        name = f"{self.prefix}_request_duration_seconds"
+        stage_name = f"{self.prefix}_stage_seconds"
+        lines = [
+            f"# HELP {name} Request latency by route, method and status.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            requests = sorted(self._requests.items())
+            stages = sorted(self._stages.items())
+            for (route, method, status), (counts, count, total) in requests:
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _labels(route=route, method=method, status=status, le=f"{bound:g}")
+                    lines.append(f"{name}_bucket{labels} {cumulative}")
+                labels = _labels(route=route, method=method, status=status, le="+Inf")
+                lines.append(f"{name}_bucket{labels} {count}")
+                labels = _labels(route=route, method=method, status=status)
+                lines.append(f"{name}_sum{labels} {total:.6f}")
+                lines.append(f"{name}_count{labels} {count}")
+
+        lines.append(f"# HELP {stage_name} Cumulative time spent in each stage, by route.")
+        lines.append(f"# TYPE {stage_name} summary")
+        for (route, stage_label), (total, calls) in stages:
+            labels = _labels(route=route, stage=stage_label)
+            lines.append(f"{stage_name}_sum{labels} {total:.6f}")
+            lines.append(f"{stage_name}_count{labels} {calls}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._requests.clear()
+            self._stages.clear()
@@ -0,0 +1,268 @@
+"""Bulk validation of row-oriented request payloads.
+
+Each field is gathered from the rows with a single list comprehension and
+converted to a float64 array by NumPy. Only when that fails, or yields
+values that are not allowed, are the rows walked one by one to report which
+ones are wrong. The arrays are handed to the services as a
+:class:`~services.recording.Recording`, so rows are converted exactly once.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .recording import PRESSURE_KEY, SERIES, TIME_KEY, Recording, SeriesArrays
+from .timing import timed
+
+# Row-level problems reported per failed payload.
+MAX_ERRORS = 20
+
+_NUMBER_TYPES = (int, float)
+
+
+class ValidationError(ValueError):
+    """A malformed payload; ``details`` lists the offending rows of ``series``."""
+
+    def __init__(
+        self, message: str, details: Optional[List[Dict[str, Any]]] = None, series: Optional[str] = None
+    ) -> None:
+        super().__init__(message)
+        self.details = details or []
+        self.series = series
+
+
+def _value_error(value: Any, nullable: bool, numbers_only: bool) -> Optional[str]:
+    if value is None:
+        return None if nullable else "must be a number"
+    if numbers_only and not isinstance(value, _NUMBER_TYPES):
+        return "must be a number"
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return "must be a number"
+    if not math.isfinite(number):
+        return "must be finite"
+    return None
+
+
+def _row_errors(
+    rows: List[Any], keys: Tuple[str, ...], nullable: Collection[str], numbers_only: bool
+) -> List[Dict[str, Any]]:
+    errors: List[Dict[str, Any]] = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({"row": index, "error": "must be an object"})
+        else:
+            for key in keys:
+                if key not in row:
+                    errors.append({"row": index, "field": key, "error": "is missing"})
+                    continue
+                message = _value_error(row[key], key in nullable, numbers_only)
+                if message:
+                    errors.append({"row": index, "field": key, "error": message})
+        if len(errors) >= MAX_ERRORS:
+            break
+    return errors[:MAX_ERRORS]
+
+
+def _as_array(values: List[Any]) -> np.ndarray:
+    array = np.array(values, dtype=np.float64)
+    if array.shape != (len(values),):
+        raise ValueError("nested values")
+    return array
+
+
+def _columns_ok(
+    values: List[List[Any]],
+    arrays: List[np.ndarray],
+    keys: Tuple[str, ...],
+    nullable: Collection[str],
+    numbers_only: bool,
+) -> bool:
+    for key, raw, array in zip(keys, values, arrays):
+        bad = np.flatnonzero(~np.isfinite(array))
+        # None becomes NaN in the array; only a null input is acceptable there.
+        if bad.size and (key not in nullable or any(raw[index] is not None for index in bad.tolist())):
+            return False
+        if numbers_only and not all(value is None or isinstance(value, _NUMBER_TYPES) for value in raw):
+            return False
+    return True
+
+
+def columns(
+    rows: Any,
+    keys: Tuple[str, ...],
+    nullable: Collection[str] = (),
+    numbers_only: bool = False,
+    label: Optional[str] = None,
+) -> Tuple[np.ndarray, ...]:
+    """Return one float64 array per key for a list of row objects.
+
+    Values must be finite numbers (numeric strings are accepted unless
+    ``numbers_only``); keys in ``nullable`` may also be ``null``, stored as
+    NaN. Raises :class:`ValidationError` with up to ``MAX_ERRORS`` row-level
+    details, tagged with ``label`` when given.
+    """
+
+    if not isinstance(rows, list):
+        raise ValidationError(f"{label or 'rows'} must be a list", series=label)
+    arrays: Optional[List[np.ndarray]] = None
+    try:
+        values = [[row[key] for row in rows] for key in keys]
+        arrays = [_as_array(column) for column in values]
+    except (KeyError, TypeError, ValueError, IndexError):
+        pass
+    if arrays is not None and _columns_ok(values, arrays, keys, nullable, numbers_only):
+        return tuple(arrays)
+
+    details = _row_errors(rows, keys, nullable, numbers_only)
+    if label is not None:
+        details = [{"series": label, **detail} for detail in details]
+    raise ValidationError(f"{label or 'rows'} contains invalid rows", details, series=label)
+
+
+def sample_errors(
+    values: np.ndarray, series: str, field: Optional[str] = None, nullable: bool = False
+) -> List[Dict[str, Any]]:
+    """Row-level details, as :func:`columns` reports them, for the non-finite values of an array.
+
+    NaN counts as a missing number, allowed with ``nullable``.
+    """
+
+    bad = ~np.isfinite(values)
+    if nullable:
+        bad &= ~np.isnan(values)
+    details: List[Dict[str, Any]] = []
+    for index in np.flatnonzero(bad)[:MAX_ERRORS].tolist():
+        detail: Dict[str, Any] = {"series": series, "row": index}
+        if field is not None:
+            detail["field"] = field
+        detail["error"] = "must be a number" if np.isnan(values[index]) else "must be finite"
+        details.append(detail)
+    return details
+
+
+def pressure_error(recording: Recording) -> Optional[ValidationError]:
+    """The error the same pressure rows would get as a row payload, or ``None``."""
+
+    details = sample_errors(recording.pressure, "pressure", PRESSURE_KEY)
+    if not details:
+        return None
+    return ValidationError("pressure contains invalid rows", details, series="pressure")
+
+
+@timed("validate")
+def pressure_recording(rows: Any) -> Recording:
+    """Validate a bare list of pressure rows into a recording."""
+
+    times, values = columns(rows, (TIME_KEY, PRESSURE_KEY), label="pressure")
+    return Recording(time=times, pressure=values)
+
+
+@timed("validate")
+def series_arrays(data: Any, required: Collection[str] = ("pressure",), nullable: bool = False) -> SeriesArrays:
+    """Validate the ``{"pressure": [...], "scale": [...], "volume": [...]}`` payload.
+
+    Series in ``required`` must be present; the others may be omitted or
+    ``null``. With ``nullable`` the value fields (not the times) may be
+    ``null``, which is stored as NaN. Each series keeps its own time axis;
+    empty series are left out.
+    """
+
+    if not isinstance(data, dict):
+        raise ValidationError("data must be an object")
+    series: SeriesArrays = {}
+    for name, column, _ in SERIES:
+        rows = data.get(name)
+        if rows is None:
+            if name in required:
+                raise ValidationError(f"{name} is required", series=name)
+            continue
+        times, values = columns(rows, (TIME_KEY, column), nullable=(column,) if nullable else (), label=name)
+        if times.size:
+            series[name] = (times, values)
+    return series
+
+
+def series_recording(data: Any, required: Collection[str] = ("pressure",), nullable: bool = False) -> Recording:
+    """:func:`series_arrays` aligned into one recording (see :meth:`Recording.from_series`)."""
+
+    return Recording.from_series(series_arrays(data, required, nullable))
+
+
+@timed("validate")
+def validate_peaks(peaks: Any) -> None:
+    """Peaks must be objects with finite ``time`` and ``value``."""
+
+    columns(peaks, ("time", "value"), label="peaks")
+
+
+@timed("validate")
+def validate_points(points: Any) -> None:
+    """``null`` or an object whose ``onset``/``empty`` lists hold point entries.
+
+    Entries need ``time`` and ``value`` (numbers or ``null``) and may carry an
+    integer ``index``.
+    """
+
+    if points is None:
+        return
+    if not isinstance(points, dict):
+        raise ValidationError("points must be an object")
+    for key in ("onset", "empty"):
+        label = f"points.{key}"
+        if key not in points:
+            raise ValidationError(f"{label} is required", series=label)
+        entries = points[key]
+        columns(entries, ("time", "value"), nullable=("time", "value"), numbers_only=True, label=label)
+        details = [
+            {"series": label, "row": index, "field": "index", "error": "must be an integer"}
+            for index, entry in enumerate(entries)
+            if entry.get("index") is not None and not isinstance(entry["index"], int)
+        ]
+        if details:
+            raise ValidationError(f"{label} contains invalid rows", details[:MAX_ERRORS], series=label)
+
+
+@timed("validate")
+def validate_segment_patch(previous: Any, changes: Any) -> None:
+    """``previous`` is a derive result and ``changes`` a peak diff.
+
+    ``changes`` may hold ``added`` and ``removed`` peak lists and ``moved``
+    objects with ``from`` and ``to`` peaks.
+    """
+
+    if not isinstance(previous, dict) or not isinstance(previous.get("points"), dict):
+        raise ValidationError("previous must be a segment result with points and segments")
+    points = previous["points"]
+    validate_points(points)
+    columns(points.get("peak"), ("time", "value"), nullable=("value",), numbers_only=True, label="points.peak")
+    columns(
+        previous.get("segments"),
+        ("onsetTime", "peakTime", "emptyTime"),
+        nullable=("onsetTime", "emptyTime"),
+        numbers_only=True,
+        label="segments",
+    )
+    details = [
+        {"series": "segments", "row": index, "field": "metrics", "error": "must be an object"}
+        for index, segment in enumerate(previous["segments"])
+        if not isinstance(segment.get("metrics"), dict)
+    ]
+    if details:
+        raise ValidationError("segments contains invalid rows", details[:MAX_ERRORS], series="segments")
+
+    if not isinstance(changes, dict):
+        raise ValidationError("changes must be an object")
+    for key in ("added", "removed"):
+        if changes.get(key) is not None:
+            columns(changes[key], ("time", "value"), label=f"changes.{key}")
+    moved = changes.get("moved")
+    if moved is not None:
+        if not isinstance(moved, list) or not all(isinstance(pair, dict) for pair in moved):
+            raise ValidationError("changes.moved must be a list of objects", series="changes.moved")
+        for end in ("from", "to"):
+            columns([pair.get(end) for pair in moved], ("time", "value"), label=f"changes.moved.{end}")
@@ -0,0 +1,147 @@
+"""Feed a growing instrument export to the live streaming analysis.
+
+Stand-in for a live acquisition feed: the export file is read from the start
+and, with ``--follow``, tailed for new data as the instrument appends it
+(``--speed`` replays a finished export in simulated real time instead). Each
+chunk goes to a :class:`~services.streaming.LiveStream`, in this process or on
+a running server (``--url``), and completed voids are printed as JSON lines.
+Run from ``backend/``::
+
+    python stream_tail.py path/to/export.txt --follow
+    python stream_tail.py path/to/export.txt --speed 60 --url http://localhost:8000
+
+The optional params file is JSON with ``peakParams`` and ``segmentParams``,
+as for ``batch.py``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import codecs
+import json
+import sys
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+from services.recording import TIME_KEY
+from services.streaming import COLUMNS, ExportLineParser, LiveStream
+
+Params = Dict[str, Any]
+
+
+class RemoteStream:
+    """The subset of :class:`LiveStream` used here, backed by the HTTP API."""
+
+    def __init__(self, base_url: str, params: Params, delimiter: str) -> None:
+        self.base_url = base_url.rstrip("/")
+        body = {key: params[key] for key in ("peakParams", "segmentParams") if key in params}
+        created = self._request("POST", "/api/streams", json.dumps({**body, "delimiter": delimiter}).encode())
+        self.samples_path = created["samples_url"]
+        self.stream_path = f"/api/streams/{created['streamId']}"
+        self.last_status: Dict[str, Any] = {}
+
+    def _request(self, method: str, path: str, data: Optional[bytes] = None) -> Dict[str, Any]:
+        content_type = "application/json" if path == "/api/streams" else "text/plain"
+        request = urllib.request.Request(
+            self.base_url + path, data=data, method=method, headers={"Content-Type": content_type}
+        )
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        self.last_status = self._request("POST", self.samples_path, data)
+        return self.last_status["events"]
+
+    def close(self) -> List[Dict[str, Any]]:
+        self.last_status = self._request("DELETE", self.stream_path)
+        return self.last_status["events"]
+
+    def status(self) -> Dict[str, Any]:
+        return {key: value for key, value in self.last_status.items() if key != "events"}
+
+
+def _print_events(events: List[Dict[str, Any]]) -> None:
+    for event in events:
+        print(json.dumps(event), flush=True)
+
+
+def tail(
+    path: str,
+    stream: Any,
+    delimiter: str,
+    follow: bool = False,
+    speed: float = 0.0,
+    chunk_bytes: int = 4096,
+    poll_sec: float = 0.5,
+    idle_sec: float = 0.0,
+) -> None:
+    """Feed ``path`` to ``stream`` chunk by chunk, printing events as they arrive."""
+
+    # A second parser reads the sample times for --speed pacing.
+    pacer = ExportLineParser(delimiter)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    first_time: Optional[float] = None
+    started = time.monotonic()
+    idle_since = time.monotonic()
+    with open(path, "rb") as handle:
+        while True:
+            chunk = handle.read(chunk_bytes)
+            if not chunk:
+                if not follow or (idle_sec and time.monotonic() - idle_since >= idle_sec):
+                    return
+                time.sleep(poll_sec)
+                continue
+            idle_since = time.monotonic()
+            if speed > 0:
+                times = pacer.feed(decoder.decode(chunk))[COLUMNS.index(TIME_KEY)]
+                if times.size:
+                    first_time = times[0] if first_time is None else first_time
+                    delay = (times[-1] - first_time) / speed - (time.monotonic() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+            _print_events(stream.feed(chunk))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="export file (.txt tab-separated or .csv)")
+    parser.add_argument("--url", help="server base URL; analyse in this process when omitted")
+    parser.add_argument("--params", help="JSON file with peakParams and segmentParams")
+    parser.add_argument("--follow", action="store_true", help="keep waiting for data appended to the file")
+    parser.add_argument("--idle", type=float, default=0.0, help="with --follow, stop after this many idle seconds")
+    parser.add_argument("--speed", type=float, default=0.0, help="replay at this multiple of real time (0: no pacing)")
+    parser.add_argument("--chunk-bytes", type=int, default=4096, help="bytes sent per chunk (default: 4096)")
+    args = parser.parse_args(argv)
+
+    params: Params = {}
+    if args.params:
+        with open(args.params, "r", encoding="utf-8") as handle:
+            params = json.load(handle)
+        if not isinstance(params, dict):
+            parser.error("params file must contain a JSON object")
+    delimiter = "," if args.path.lower().endswith(".csv") else "\t"
+
+    if args.url:
+        stream: Any = RemoteStream(args.url, params, delimiter)
+    else:
+        stream = LiveStream(
+            peak_params=params.get("peakParams"), segment_params=params.get("segmentParams"), delimiter=delimiter
+        )
+    try:
+        tail(args.path, stream, delimiter, args.follow, args.speed, max(1, args.chunk_bytes), idle_sec=args.idle)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _print_events(stream.close())
+    status = stream.status()
+    print(
+        f"{status['received']} samples, {status['voids']} voids, "
+        f"{status['rejected']} out-of-order samples, {status['skippedLines']} skipped lines",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+import io
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from services import process_uploaded_data  # noqa: E402
+
+SAMPLE_FILES = ("testdata.txt", "testdata2.txt")
+
+
+@pytest.fixture(scope="session", params=SAMPLE_FILES)
+def sample_recording(request):
+    """The bundled exports from the repository root, parsed once per session."""
+
+    with open(os.path.join(REPO_DIR, request.param), "rb") as handle:
+        return process_uploaded_data(io.BytesIO(handle.read()), request.param)
@@ -0,0 +1,44 @@
+"""The NumPy conditioning pipeline must match the pure-Python reference exactly."""
+
+import numpy as np
+import pytest
+
+from services.conditioning import condition_signal, derivative, median_filter, moving_average_by_time
+from services.segments import _derivative, _median_filter, _moving_average_by_time
+
+# (median kernel, moving-average window, derivative window)
+SETTINGS = [(7, 0.6, 0.3), (4, 1.5, 2.0), (1, 0.0, 0.0), (15, 5.0, 1.0)]
+
+
+@pytest.mark.parametrize("kernel", [1, 4, 7, 15])
+def test_median_filter_matches_reference(sample_recording, kernel):
+    values = sample_recording.pressure
+    expected = _median_filter(values.tolist(), kernel)
+    np.testing.assert_array_equal(median_filter(values, kernel), expected)
+
+
+@pytest.mark.parametrize("window_sec", [0.0, 0.6, 1.5, 5.0])
+def test_moving_average_matches_reference(sample_recording, window_sec):
+    times, values = sample_recording.time, sample_recording.pressure
+    expected = _moving_average_by_time(times.tolist(), values.tolist(), window_sec)
+    np.testing.assert_array_equal(moving_average_by_time(times, values, window_sec), expected)
+
+
+@pytest.mark.parametrize("window_sec", [0.0, 0.3, 1.0, 2.0])
+def test_derivative_matches_reference(sample_recording, window_sec):
+    times, values = sample_recording.time, sample_recording.pressure
+    expected = _derivative(times.tolist(), values.tolist(), window_sec)
+    np.testing.assert_array_equal(derivative(times, values, window_sec), expected)
+
+
+@pytest.mark.parametrize("kernel, ma_window_sec, derivative_window_sec", SETTINGS)
+def test_condition_signal_matches_reference(sample_recording, kernel, ma_window_sec, derivative_window_sec):
+    times, values = sample_recording.time.tolist(), sample_recording.pressure.tolist()
+    smoothed = _moving_average_by_time(times, _median_filter(values, kernel), ma_window_sec)
+    expected_derivative = _derivative(times, smoothed, derivative_window_sec)
+
+    result_smoothed, result_derivative = condition_signal(
+        sample_recording.time, sample_recording.pressure, kernel, ma_window_sec, derivative_window_sec
+    )
+    np.testing.assert_array_equal(result_smoothed, smoothed)
+    np.testing.assert_array_equal(result_derivative, expected_derivative)
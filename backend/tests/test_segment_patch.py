@@ -0,0 +1,110 @@
+"""patch_segments applied to the previous result must equal a full derive_segments."""
+
+import random
+
+import pytest
+
+from services import derive_segments, run_find_peaks
+from services.segments import patch_segments
+
+PEAK_PARAMS = {"distance": 200, "prominence": 5}
+
+
+def _apply(previous, patch):
+    """The patched result, rebuilt the way the frontend's applySegmentPatch does."""
+
+    points = previous["points"]
+    removed = set(patch["removed"])
+    kept = iter(
+        (points["onset"][i], points["peak"][i], points["empty"][i], segment)
+        for i, segment in enumerate(previous["segments"])
+        if i not in removed
+    )
+    slots = [None] * patch["count"]
+    for entry in patch["upserted"]:
+        slots[entry["i"]] = (entry["onset"], entry["peak"], entry["empty"], entry["segment"])
+    rows = [slot if slot is not None else next(kept) for slot in slots]
+    assert next(kept, None) is None
+    return {
+        "points": {
+            "onset": [row[0] for row in rows],
+            "peak": [row[1] for row in rows],
+            "empty": [row[2] for row in rows],
+        },
+        "segments": [row[3] for row in rows],
+    }
+
+
+def _sample_peak(recording, rng):
+    index = rng.randrange(len(recording))
+    return {"time": float(recording.time[index]), "value": float(recording.pressure[index])}
+
+
+def _random_changes(recording, peaks, rng):
+    """Apply 1-4 random edits to ``peaks``; return (new peaks, changes)."""
+
+    current = list(peaks)
+    added, removed, moved = [], [], []
+    for _ in range(rng.randint(1, 4)):
+        action = rng.choice("arm") if current else "a"
+        if action == "a":
+            peak = _sample_peak(recording, rng)
+            if any(other["time"] == peak["time"] for other in current):
+                continue
+            current.append(peak)
+            added.append(peak)
+        elif action == "r":
+            peak = current.pop(rng.randrange(len(current)))
+            pair = next((pair for pair in moved if pair["to"] is peak), None)
+            if any(other is peak for other in added):
+                added = [other for other in added if other is not peak]
+            elif pair is not None:
+                moved.remove(pair)
+                removed.append(pair["from"])
+            else:
+                # Off by rounding, as times come back from the client.
+                removed.append({**peak, "time": peak["time"] + rng.uniform(-1e-7, 1e-7)})
+        else:
+            position = rng.randrange(len(current))
+            peak, target = current[position], _sample_peak(recording, rng)
+            if any(other["time"] == target["time"] for other in current):
+                continue
+            current[position] = target
+            pair = next((pair for pair in moved if pair["to"] is peak), None)
+            if any(other is peak for other in added):
+                added = [other for other in added if other is not peak] + [target]
+            elif pair is not None:
+                pair["to"] = target
+            else:
+                moved.append({"from": peak, "to": target})
+    return current, {"added": added, "removed": removed, "moved": moved}
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_random_edits_match_full_derive(sample_recording, seed):
+    rng = random.Random(seed)
+    detected = run_find_peaks(sample_recording, PEAK_PARAMS)["peaks"]
+    for _ in range(20):
+        peaks = rng.sample(detected, rng.randint(0, len(detected)))
+        previous = derive_segments(sample_recording, peaks, {})
+        edited, changes = _random_changes(sample_recording, peaks, rng)
+
+        patch = patch_segments(sample_recording, previous, changes, {})
+
+        assert _apply(previous, patch) == derive_segments(sample_recording, edited, {})
+
+
+def test_removing_a_peak_reindexes_later_segments(sample_recording):
+    peaks = run_find_peaks(sample_recording, PEAK_PARAMS)["peaks"]
+    previous = derive_segments(sample_recording, peaks, {})
+    count = len(previous["segments"])
+
+    first = patch_segments(sample_recording, previous, {"removed": [peaks[0]]}, {})
+    last = patch_segments(sample_recording, previous, {"removed": [peaks[-1]]}, {})
+
+    # Every later segment moves down one index; only the previous neighbour
+    # of the last one changes (its imiSec and average pressure).
+    assert sorted(first["removed"]) == list(range(count))
+    assert sorted(entry["i"] for entry in first["upserted"]) == list(range(count - 1))
+    assert sorted(last["removed"]) == [count - 2, count - 1]
+    assert [entry["i"] for entry in last["upserted"]] == [count - 2]
@@ -0,0 +1,27 @@
+import numpy as np
+
+from services import Recording, SessionStore
+
+
+def _recording(samples):
+    time = np.arange(samples, dtype=float)
+    return Recording(time=time, pressure=np.sin(time))
+
+
+def test_put_keeps_a_recording_larger_than_max_bytes():
+    store = SessionStore(max_bytes=1024)
+    recording = _recording(10_000)
+    assert recording.nbytes > store.max_bytes
+
+    dataset_id = store.put(recording)
+
+    assert store.get(dataset_id) is recording
+
+
+def test_put_evicts_older_recordings_first():
+    store = SessionStore(max_bytes=1024)
+    first = store.put(_recording(10_000))
+    second = store.put(_recording(10_000))
+
+    assert first not in store
+    assert store.get(second) is not None
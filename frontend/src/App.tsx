@@ -1,7 +1,7 @@
-import { useEffect, useMemo, useState } from 'react'
-import { uploadFile, getApiBase, generateReport, deriveSegments } from './api'
-import { Peak, PeakParams, Segment, SegmentParams, SegmentPoint, SessionData } from './types'
-import { computeDuration, computeFinalY, computeMaxY, toPoints } from './lib/series'
+import { useEffect, useMemo, useRef, useState } from 'react'
+import { uploadFile, getApiBase, generateReport, deriveSegments, patchSegments, downsampleSeries } from './api'
+import { Peak, PeakParams, Segment, SegmentParams, SegmentPoint, SeriesName, SessionData } from './types'
+import { Point, computeDuration, computeFinalY, computeMaxY, toPoints, viewToPoints } from './lib/series'
 import TrimmerModal from './components/TrimmerModal'
 import { Interval, filterRowsByIntervals } from './lib/trimming'
 import { WizardLayout } from './components/WizardLayout'
@@ -12,6 +12,10 @@ import { StepRefinePeaks } from './steps/StepRefinePeaks'
 import { StepSegments } from './steps/StepSegments'
 import { StepDownload } from './steps/StepDownload'
 import { applyWindowToSessionData } from './lib/windowing'
+import { applySegmentPatch, diffPeaks, hasPeakChanges } from './lib/segmentPatch'
+
+// Samples per series drawn by the window step's charts for uploaded datasets.
+const CHART_POINTS = 2000
 
 const DEFAULT_SEGMENT_PARAMS: SegmentParams = {
   medianKernel: 7,
@@ -55,6 +59,10 @@ function App() {
   const [onsetPoints, setOnsetPoints] = useState<SegmentPoint[]>([])
   const [emptyPoints, setEmptyPoints] = useState<SegmentPoint[]>([])
   const [segments, setSegments] = useState<Segment[]>([])
+  // Peaks the current segments were derived from, and their snapped points.
+  const [derivedPeaks, setDerivedPeaks] = useState<Peak[]>([])
+  const [peakPoints, setPeakPoints] = useState<SegmentPoint[]>([])
+  const patchRequest = useRef(0)
   const [isDerivingSegments, setIsDerivingSegments] = useState<boolean>(false)
   const [segmentsError, setSegmentsError] = useState<string>('')
   const [segmentsDerived, setSegmentsDerived] = useState<boolean>(false)
@@ -99,9 +107,12 @@ function App() {
   }, [])
 
   const clearSegmentResults = () => {
+    patchRequest.current += 1
     setOnsetPoints([])
     setEmptyPoints([])
     setSegments([])
+    setDerivedPeaks([])
+    setPeakPoints([])
     setSegmentsError('')
     setSegmentsDerived(false)
     setHasDerivedSegments(false)
@@ -161,6 +172,8 @@ function App() {
         scale: originalData.scale.map((row) => ({ ...row })),
         volume: originalData.volume.map((row) => ({ ...row })),
         pressure: originalData.pressure.map((row) => ({ ...row })),
+        datasetId: originalData.datasetId,
+        keptIntervals: [],
       })
       setPeakParams(null)
       setPeaks([])
@@ -176,6 +189,8 @@ function App() {
       scale: filterRowsByIntervals(originalData.scale, 'Elapsed Time', trims),
       volume: filterRowsByIntervals(originalData.volume, 'Elapsed Time', trims),
       pressure: filterRowsByIntervals(originalData.pressure, 'Elapsed Time', trims),
+      datasetId: originalData.datasetId,
+      keptIntervals: trims,
     })
     setPeakParams(null)
     setPeaks([])
@@ -186,9 +201,34 @@ function App() {
     resetSegmentsState()
   }, [originalData, trims])
 
+  const patchSegmentResults = async (data: SessionData) => {
+    const changes = diffPeaks(derivedPeaks, peaks)
+    if (!hasPeakChanges(changes)) return
+    const request = (patchRequest.current += 1)
+    const previous = { points: { onset: onsetPoints, peak: peakPoints, empty: emptyPoints }, segments }
+    try {
+      const patch = await patchSegments(data, previous, changes, segmentParams)
+      if (request !== patchRequest.current) return
+      const result = applySegmentPatch(previous, patch)
+      setOnsetPoints(result.points.onset)
+      setPeakPoints(result.points.peak)
+      setEmptyPoints(result.points.empty)
+      setSegments(result.segments)
+      setDerivedPeaks(peaks)
+      setOnsetEmptyConfirmed(false)
+    } catch {
+      if (request === patchRequest.current) clearSegmentResults()
+    }
+  }
+
   useEffect(() => {
     setPeaksConfirmed(false)
-    clearSegmentResults()
+    // Single-peak edits in the refine step update the derived segments in place.
+    if (hasDerivedSegments && windowedCurrentData) {
+      patchSegmentResults(windowedCurrentData)
+    } else {
+      clearSegmentResults()
+    }
   }, [peaks])
 
   const elapsedRange = useMemo(() => {
@@ -255,6 +295,35 @@ function App() {
     return toPoints(windowedCurrentData.pressure, 'Elapsed Time', 'Bladder Pressure')
   }, [windowedCurrentData])
 
+  // Chart-resolution copy of the windowed series, downsampled by the server
+  // for uploaded datasets. The full rows above still feed the summary figures
+  // and are drawn until the first view arrives; while the window is dragged
+  // the previous view stays up rather than redrawing every raw sample.
+  const [windowedChartPoints, setWindowedChartPoints] = useState<Record<SeriesName, Point[]> | null>(null)
+
+  useEffect(() => {
+    if (!windowedCurrentData?.datasetId) {
+      setWindowedChartPoints(null)
+      return
+    }
+    let cancelled = false
+    downsampleSeries(windowedCurrentData, { points: CHART_POINTS })
+      .then((view) => {
+        if (cancelled) return
+        setWindowedChartPoints({
+          scale: viewToPoints(view.series.scale),
+          volume: viewToPoints(view.series.volume),
+          pressure: viewToPoints(view.series.pressure),
+        })
+      })
+      .catch(() => {
+        // Keep drawing the full-resolution points.
+      })
+    return () => {
+      cancelled = true
+    }
+  }, [windowedCurrentData])
+
   const windowedDuration = useMemo(() => {
     const baseSeries = windowedPressurePoints.length > 0 ? windowedPressurePoints : windowedScalePoints
     return computeDuration(baseSeries)
@@ -335,7 +404,9 @@ function App() {
     }
 
     try {
-      const report = await generateReport(payload)
+      const report = await generateReport(payload, (fraction) =>
+        setActionStatus(`Generating report... ${Math.round(fraction * 100)}%`)
+      )
       const apiBase = getApiBase()
       const downloadUrl = `${apiBase}${report.downloadUrl}`
       setActionStatus(`Report ready: ${report.filename}`)
@@ -384,12 +455,15 @@ function App() {
 
     setIsDerivingSegments(true)
     setSegmentsError('')
+    patchRequest.current += 1
 
     try {
       const result = await deriveSegments(windowedCurrentData, peaks, segmentParams)
       setOnsetPoints(result.points.onset || [])
+      setPeakPoints(result.points.peak || [])
       setEmptyPoints(result.points.empty || [])
       setSegments(result.segments || [])
+      setDerivedPeaks(peaks)
       setSegmentsDerived(true)
       setHasDerivedSegments(true)
       setOnsetEmptyConfirmed(false)
@@ -397,6 +471,8 @@ function App() {
       setOnsetPoints([])
       setEmptyPoints([])
       setSegments([])
+      setDerivedPeaks([])
+      setPeakPoints([])
       setSegmentsDerived(false)
       setSegmentsError((err as Error).message)
     } finally {
@@ -497,9 +573,9 @@ function App() {
           onWindowChange={handleWindowChange}
           onConfirmWindow={handleConfirmWindow}
           onResetWindow={handleResetWindow}
-          scalePoints={windowedScalePoints}
-          volumePoints={windowedVolumePoints}
-          pressurePoints={windowedPressurePoints}
+          scalePoints={windowedChartPoints?.scale ?? windowedScalePoints}
+          volumePoints={windowedChartPoints?.volume ?? windowedVolumePoints}
+          pressurePoints={windowedChartPoints?.pressure ?? windowedPressurePoints}
           windowedDuration={windowedDuration}
           windowedMaxPressure={windowedMaxPressure}
           windowedFinalVolume={windowedFinalVolume}
@@ -510,8 +586,7 @@ function App() {
     if (currentStep === 3) {
       return (
         <StepAutoPeaks
-          pressureRows={windowedCurrentData?.pressure ?? null}
-          scaleRows={windowedCurrentData?.scale ?? null}
+          data={windowedCurrentData ?? null}
           peakParams={peakParams}
           peaks={peaks}
           setPeakParams={setPeakParams}
@@ -1,16 +1,26 @@
 import {
+  ColumnarSeries,
+  DownsampleRequest,
+  DownsampleResponse,
   ExperimentWindow,
   Peak,
+  PeakChanges,
   PeakParams,
   Segment,
   SegmentParams,
+  SegmentPatch,
   SegmentPoint,
+  SegmentResult,
   SessionData,
-  UploadResponse,
 } from './types'
 
+const COLUMNAR_BINARY = 'application/vnd.visio.columnar'
+
 type ReportResponse = { downloadUrl: string; filename: string }
 
+// Row-level problem reported with a 400 from the analysis endpoints.
+type ValidationDetail = { series?: string; row?: number; field?: string; error: string }
+
 type ReportPayload = {
   data: SessionData
   peaks: Peak[]
@@ -19,6 +29,7 @@ type ReportPayload = {
   peakParams?: PeakParams | null
   segmentParams?: SegmentParams
   experimentWindow?: ExperimentWindow | null
+  format?: 'xlsx' | 'csv' | 'parquet' | 'hdf5'
 }
 
 export function getApiBase(): string {
@@ -33,9 +44,14 @@ async function handleJsonResponse<T>(response: Response): Promise<T> {
   if (!response.ok) {
     let errorMessage = `Request failed with status ${response.status}`
     try {
-      const errorData = (await response.json()) as { error?: string }
+      const errorData = (await response.json()) as { error?: string; details?: ValidationDetail[] }
       if (errorData?.error) {
         errorMessage = errorData.error
+        const detail = errorData.details?.[0]
+        if (detail) {
+          const where = [detail.series, detail.row !== undefined ? `row ${detail.row}` : null, detail.field]
+          errorMessage += ` (${where.filter(Boolean).join(' ')} ${detail.error})`
+        }
       }
     } catch (err) {
       // ignore json parsing errors and use default message
@@ -45,6 +61,122 @@ async function handleJsonResponse<T>(response: Response): Promise<T> {
   return (await response.json()) as T
 }
 
+type ColumnarFrame = {
+  header: Record<string, unknown>
+  columns: Record<string, Float64Array>
+}
+
+// Binary frame: uint32 LE header length, JSON header (padded to 8 bytes),
+// then one little-endian float64 block per column in header order.
+function decodeColumnarFrame(buffer: ArrayBuffer): ColumnarFrame {
+  const view = new DataView(buffer)
+  const headerLength = view.getUint32(0, true)
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength))) as {
+    columns: string[]
+    length: number
+    [key: string]: unknown
+  }
+  const { columns: names, length, ...rest } = header
+  const littleEndian = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1
+  const columns: Record<string, Float64Array> = {}
+  names.forEach((name, idx) => {
+    const offset = 4 + headerLength + idx * length * 8
+    if (littleEndian) {
+      columns[name] = new Float64Array(buffer, offset, length)
+    } else {
+      const values = new Float64Array(length)
+      for (let i = 0; i < length; i += 1) {
+        values[i] = view.getFloat64(offset + i * 8, true)
+      }
+      columns[name] = values
+    }
+  })
+  return { header: rest, columns }
+}
+
+function finiteOrNull(value: number): number | null {
+  return Number.isNaN(value) ? null : value
+}
+
+function columnsToSessionData(columns: Record<string, Float64Array>): SessionData {
+  const time = Array.from(columns.time ?? [])
+  const { scale, volume, pressure } = columns
+  return {
+    scale: scale
+      ? time.map((t, idx) => ({ 'Elapsed Time': t, Scale: finiteOrNull(scale[idx]) as number }))
+      : [],
+    volume: volume
+      ? time.map((t, idx) => ({ 'Elapsed Time': t, 'Tot Infused Vol': finiteOrNull(volume[idx]) as number }))
+      : [],
+    pressure: pressure
+      ? time.map((t, idx) => ({ 'Elapsed Time': t, 'Bladder Pressure': finiteOrNull(pressure[idx]) as number }))
+      : [],
+  }
+}
+
+function pressureColumns(pressureRows: SessionData['pressure']): ColumnarSeries {
+  return {
+    time: pressureRows.map((row) => row['Elapsed Time']),
+    pressure: pressureRows.map((row) => row['Bladder Pressure']),
+  }
+}
+
+// Columnar form of the session; null when the series do not share one time
+// axis (the server then aligns the row payload by nearest time instead).
+function sessionColumns(data: SessionData): ColumnarSeries | null {
+  const columns = pressureColumns(data.pressure)
+  const sharesAxis = (rows: { 'Elapsed Time': number }[]) =>
+    rows.length === columns.time.length &&
+    rows.every((row, idx) => row['Elapsed Time'] === columns.time[idx])
+
+  if (data.scale.length > 0) {
+    if (!sharesAxis(data.scale)) return null
+    columns.scale = data.scale.map((row) => row.Scale)
+  }
+  if (data.volume.length > 0) {
+    if (!sharesAxis(data.volume)) return null
+    columns.volume = data.volume.map((row) => row['Tot Infused Vol'])
+  }
+  return columns
+}
+
+function seriesBody(data: SessionData): { columns: ColumnarSeries } | { data: SessionData } {
+  const columns = sessionColumns(data)
+  return columns ? { columns } : { data }
+}
+
+function pressureBody(data: SessionData): { columns: ColumnarSeries } {
+  return { columns: pressureColumns(data.pressure) }
+}
+
+// POST the session by reference when it came from an upload, falling back to
+// the series themselves (as built by `fallback`) if the server no longer
+// holds that dataset.
+async function postSession(
+  path: string,
+  data: SessionData,
+  body: Record<string, unknown>,
+  fallback: (data: SessionData) => object = seriesBody
+): Promise<Response> {
+  const url = new URL(path, getApiBase()).toString()
+  const send = (series: object) =>
+    fetch(url, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ...series, ...body }),
+    })
+
+  if (data.datasetId) {
+    const response = await send({
+      datasetId: data.datasetId,
+      keptIntervals: data.keptIntervals ?? [],
+      window: data.window ?? null,
+    })
+    if (response.status !== 404) return response
+  }
+  return send(fallback(data))
+}
+
 export async function uploadFile(file: File): Promise<SessionData> {
   const apiBase = getApiBase()
   const url = new URL('/api/upload', apiBase).toString()
@@ -54,68 +186,78 @@ export async function uploadFile(file: File): Promise<SessionData> {
 
   const response = await fetch(url, {
     method: 'POST',
+    headers: { Accept: `${COLUMNAR_BINARY}, application/json;q=0.5` },
     body: formData,
   })
 
-  const payload = await handleJsonResponse<UploadResponse>(response)
-  return payload.data
+  if (response.ok && response.headers.get('Content-Type')?.startsWith(COLUMNAR_BINARY)) {
+    const { header, columns } = decodeColumnarFrame(await response.arrayBuffer())
+    return { ...columnsToSessionData(columns), datasetId: header.datasetId as string | undefined }
+  }
+  const payload = await handleJsonResponse<{ data: SessionData; datasetId?: string }>(response)
+  return { ...payload.data, datasetId: payload.datasetId }
+}
+
+type ReportJobStatus = {
+  jobId: string
+  status: 'queued' | 'running' | 'done' | 'failed'
+  progress: number
+  result: { download_url: string; filename: string } | null
+  error: string | null
 }
 
-export async function generateReport(payload: ReportPayload): Promise<ReportResponse> {
+const REPORT_POLL_MS = 500
+
+export async function generateReport(
+  payload: ReportPayload,
+  onProgress?: (fraction: number) => void
+): Promise<ReportResponse> {
   const apiBase = getApiBase()
-  const url = new URL('/api/generate-report', apiBase).toString()
 
-  const response = await fetch(url, {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({
-      data: payload.data,
-      peaks: payload.peaks,
-      points: payload.points,
-      segments: payload.segments,
-      peakParams: payload.peakParams,
-      segmentParams: payload.segmentParams,
-      experimentWindow: payload.experimentWindow,
-    }),
+  const response = await postSession('/api/generate-report', payload.data, {
+    peaks: payload.peaks,
+    points: payload.points,
+    segments: payload.segments,
+    peakParams: payload.peakParams,
+    segmentParams: payload.segmentParams,
+    experimentWindow: payload.experimentWindow,
+    format: payload.format,
+    async: true,
   })
 
-  const payload = await handleJsonResponse<{ download_url: string; filename: string }>(response)
-  return { downloadUrl: payload.download_url, filename: payload.filename }
+  const job = await handleJsonResponse<{ jobId: string; status_url: string }>(response)
+  const statusUrl = new URL(job.status_url, apiBase).toString()
+
+  for (;;) {
+    await new Promise((resolve) => setTimeout(resolve, REPORT_POLL_MS))
+    const status = await handleJsonResponse<ReportJobStatus>(await fetch(statusUrl))
+    onProgress?.(status.progress)
+    if (status.status === 'done' && status.result) {
+      return { downloadUrl: status.result.download_url, filename: status.result.filename }
+    }
+    if (status.status === 'failed') {
+      throw new Error(status.error || 'Report generation failed')
+    }
+  }
 }
 
 export async function peaksSuggest(
-  pressureRows: SessionData['pressure'],
+  data: SessionData,
   expectedCount: number,
   searchBudget?: number
 ): Promise<{
   best: { params: PeakParams; peaks: Peak[]; score: number }
   candidates: { params: PeakParams; peaks: Peak[]; score: number }[]
 }> {
-  const apiBase = getApiBase()
-  const url = new URL('/api/peaks/suggest', apiBase).toString()
-
-  const response = await fetch(url, {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ pressure: pressureRows, expectedCount, searchBudget }),
-  })
-
+  const response = await postSession('/api/peaks/suggest', data, { expectedCount, searchBudget }, pressureBody)
   return handleJsonResponse(response)
 }
 
 export async function peaksRun(
-  pressureRows: SessionData['pressure'],
+  data: SessionData,
   params: PeakParams
 ): Promise<{ peaks: Peak[]; paramsUsed: PeakParams }> {
-  const apiBase = getApiBase()
-  const url = new URL('/api/peaks/run', apiBase).toString()
-
-  const response = await fetch(url, {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ pressure: pressureRows, params }),
-  })
-
+  const response = await postSession('/api/peaks/run', data, { params }, pressureBody)
   return handleJsonResponse(response)
 }
 
@@ -123,15 +265,25 @@ export async function deriveSegments(
   data: SessionData,
   peaks: Peak[],
   params: SegmentParams,
-): Promise<{ points: { onset: SegmentPoint[]; peak: SegmentPoint[]; empty: SegmentPoint[] }; segments: Segment[] }> {
-  const apiBase = getApiBase()
-  const url = new URL('/api/segments/derive', apiBase).toString()
+): Promise<SegmentResult> {
+  const response = await postSession('/api/segments/derive', data, { peaks, params })
+  return handleJsonResponse(response)
+}
 
-  const response = await fetch(url, {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ data, peaks, params }),
-  })
+// Recompute only the segments touched by `changes` since `previous` was derived.
+export async function patchSegments(
+  data: SessionData,
+  previous: SegmentResult,
+  changes: PeakChanges,
+  params: SegmentParams,
+): Promise<SegmentPatch> {
+  const response = await postSession('/api/segments/patch', data, { previous, changes, params })
+  return handleJsonResponse(response)
+}
 
+// Chart-resolution view of the session: about `points` samples per series
+// over [start, end], after the session's trims and window.
+export async function downsampleSeries(data: SessionData, view: DownsampleRequest): Promise<DownsampleResponse> {
+  const response = await postSession('/api/series/downsample', data, view)
   return handleJsonResponse(response)
 }
@@ -5,7 +5,7 @@ import { Peak, PeakParams, SessionData } from '../types'
 type SuggestionCandidate = { params: PeakParams; peaks: Peak[]; score: number }
 
 type PeakPanelProps = {
-  pressureRows: SessionData['pressure'] | null
+  data: SessionData | null
   params: PeakParams | null
   setParams: (params: PeakParams | null) => void
   peaks: Peak[]
@@ -21,7 +21,7 @@ function formatNumber(value: number | null | undefined, digits = 2): string {
 }
 
 function PeakPanel({
-  pressureRows,
+  data,
   params,
   setParams,
   peaks,
@@ -38,13 +38,13 @@ function PeakPanel({
   const [showParams, setShowParams] = useState(false)
 
   const paramsState = useMemo<PeakParams>(() => params ?? {}, [params])
-  const hasData = (pressureRows?.length ?? 0) > 0
+  const hasData = (data?.pressure.length ?? 0) > 0
 
   useEffect(() => {
     setCandidates([])
     setMessage('')
     setError('')
-  }, [pressureRows])
+  }, [data])
 
   const handleParamChange = (key: keyof PeakParams, raw: string) => {
     const numeric = raw === '' ? null : Number(raw)
@@ -69,7 +69,7 @@ function PeakPanel({
 
     try {
       const targetCount = Number(expectedCount)
-      const suggestion = await peaksSuggest(pressureRows!, targetCount)
+      const suggestion = await peaksSuggest(data!, targetCount)
       const detected = (suggestion.best.peaks ?? []).map((peak) => ({ ...peak, source: 'auto' as const }))
       setParams(suggestion.best.params ?? {})
       setPeaks(detected)
@@ -94,7 +94,7 @@ function PeakPanel({
     setMessage('Running peak detection...')
 
     try {
-      const result = await peaksRun(pressureRows!, paramsState)
+      const result = await peaksRun(data!, paramsState)
       const detected = (result.peaks ?? []).map((peak) => ({ ...peak, source: 'auto' as const }))
       setPeaks(detected)
       onDetect?.(detected, 'auto')
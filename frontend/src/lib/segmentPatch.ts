@@ -0,0 +1,52 @@
+import { Peak, PeakChanges, SegmentPatch, SegmentResult } from '../types'
+
+export function diffPeaks(previous: Peak[], next: Peak[]): PeakChanges {
+  const previousTimes = new Set(previous.map((peak) => peak.time))
+  const nextTimes = new Set(next.map((peak) => peak.time))
+  const removed = previous.filter((peak) => !nextTimes.has(peak.time))
+  const added = next.filter((peak) => !previousTimes.has(peak.time))
+
+  if (removed.length === 1 && added.length === 1) {
+    return { added: [], removed: [], moved: [{ from: removed[0], to: added[0] }] }
+  }
+  return { added, removed, moved: [] }
+}
+
+export function hasPeakChanges(changes: PeakChanges): boolean {
+  return changes.added.length > 0 || changes.removed.length > 0 || changes.moved.length > 0
+}
+
+// Drop the patched indices, place the upserted entries at their positions and
+// fill the remaining slots with the untouched entries in their previous order.
+export function applySegmentPatch(previous: SegmentResult, patch: SegmentPatch): SegmentResult {
+  const removed = new Set(patch.removed)
+  const kept = previous.segments
+    .map((segment, idx) => ({
+      onset: previous.points.onset[idx],
+      peak: previous.points.peak[idx],
+      empty: previous.points.empty[idx],
+      segment,
+    }))
+    .filter((_, idx) => !removed.has(idx))
+
+  const slots: (typeof kept)[number][] = new Array(patch.count)
+  patch.upserted.forEach((entry) => {
+    slots[entry.i] = entry
+  })
+  let next = 0
+  for (let idx = 0; idx < patch.count; idx += 1) {
+    if (!slots[idx]) {
+      slots[idx] = kept[next]
+      next += 1
+    }
+  }
+
+  return {
+    points: {
+      onset: slots.map((entry) => entry.onset),
+      peak: slots.map((entry) => entry.peak),
+      empty: slots.map((entry) => entry.empty),
+    },
+    segments: slots.map((entry) => entry.segment),
+  }
+}
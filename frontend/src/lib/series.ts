@@ -1,3 +1,5 @@
+import { DownsampledSeries } from '../types'
+
 export type Point = { x: number; y: number }
 
 export function toPoints<T>(rows: T[], xKey: keyof T, yKey: keyof T): Point[] {
@@ -12,6 +14,13 @@ export function toPoints<T>(rows: T[], xKey: keyof T, yKey: keyof T): Point[] {
   return points.sort((a, b) => a.x - b.x)
 }
 
+export function viewToPoints(series: DownsampledSeries | undefined): Point[] {
+  if (!series) return []
+  return series.time
+    .map((x, idx) => ({ x, y: series.value[idx] }))
+    .filter((point) => Number.isFinite(point.x) && Number.isFinite(point.y))
+}
+
 export function computeDuration(points: Point[]): number {
   if (points.length === 0) return 0
   const minX = points[0].x
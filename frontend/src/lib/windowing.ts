@@ -13,8 +13,10 @@ export function applyWindowToSessionData(
   end: number,
 ): SessionData {
   return {
+    ...data,
     scale: filterByWindow(data.scale, 'Elapsed Time', start, end),
     volume: filterByWindow(data.volume, 'Elapsed Time', start, end),
     pressure: filterByWindow(data.pressure, 'Elapsed Time', start, end),
+    window: { start, end },
   }
 }
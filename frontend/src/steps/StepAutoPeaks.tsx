@@ -5,8 +5,7 @@ import { toPoints } from '../lib/series'
 import { Peak, PeakParams, SessionData } from '../types'
 
 type StepAutoPeaksProps = {
-  pressureRows: SessionData['pressure'] | null
-  scaleRows: SessionData['scale'] | null
+  data: SessionData | null
   peakParams: PeakParams | null
   peaks: Peak[]
   setPeakParams: (params: PeakParams | null) => void
@@ -15,8 +14,7 @@ type StepAutoPeaksProps = {
 }
 
 export function StepAutoPeaks({
-  pressureRows,
-  scaleRows,
+  data,
   peakParams,
   peaks,
   setPeakParams,
@@ -26,14 +24,14 @@ export function StepAutoPeaks({
   const [expectedCount, setExpectedCount] = useState<number | ''>(3)
 
   const pressurePoints = useMemo(() => {
-    if (!pressureRows) return []
-    return toPoints(pressureRows, 'Elapsed Time', 'Bladder Pressure')
-  }, [pressureRows])
+    if (!data) return []
+    return toPoints(data.pressure, 'Elapsed Time', 'Bladder Pressure')
+  }, [data])
 
   const scalePoints = useMemo(() => {
-    if (!scaleRows) return []
-    return toPoints(scaleRows, 'Elapsed Time', 'Scale')
-  }, [scaleRows])
+    if (!data) return []
+    return toPoints(data.scale, 'Elapsed Time', 'Scale')
+  }, [data])
 
   const markers = peaks.map((peak, idx) => ({ x: peak.time, y: peak.value, label: `P${idx + 1}` }))
   const targetLabel = expectedCount === '' ? 'N/A' : expectedCount
@@ -49,7 +47,7 @@ export function StepAutoPeaks({
       </div>
 
       <PeakPanel
-        pressureRows={pressureRows}
+        data={data}
         params={peakParams}
         setParams={setPeakParams}
         peaks={peaks}
@@ -34,10 +34,54 @@ export type SessionData = {
   scale: RowScale[]
   volume: RowVolume[]
   pressure: RowPressure[]
+  // Set for uploaded data: the server applies keptIntervals and window to
+  // its stored copy instead of receiving the rows again.
+  datasetId?: string
+  keptIntervals?: { start: number; end: number }[]
+  window?: { start: number; end: number } | null
+}
+
+export type ColumnarSeries = {
+  time: number[]
+  pressure: (number | null)[]
+  scale?: (number | null)[]
+  volume?: (number | null)[]
+}
+
+export type SeriesName = 'pressure' | 'scale' | 'volume'
+
+export type DownsampleRequest = {
+  points: number
+  mode?: 'lttb' | 'minmax'
+  start?: number | null
+  end?: number | null
+  series?: SeriesName[]
+}
+
+export type DownsampledSeries = {
+  time: number[]
+  value: number[]
+  total: number
+}
+
+export type DownsampleResponse = {
+  mode: 'lttb' | 'minmax'
+  points: number
+  start: number | null
+  end: number | null
+  series: Partial<Record<SeriesName, DownsampledSeries>>
+}
+
+export type Annotation = {
+  time: number
+  event: number | null
+  comment: string | null
 }
 
 export type UploadResponse = {
   data: SessionData
+  datasetId?: string
+  annotations?: Annotation[]
 }
 
 export type SegmentParams = {
@@ -79,3 +123,29 @@ export type Segment = {
   emptyTime: number | null
   metrics: SegmentMetrics
 }
+
+export type SegmentResult = {
+  points: { onset: SegmentPoint[]; peak: SegmentPoint[]; empty: SegmentPoint[] }
+  segments: Segment[]
+}
+
+// Peak edits since a SegmentResult was derived; a drag is one `moved` pair.
+export type PeakChanges = {
+  added: Peak[]
+  removed: Peak[]
+  moved: { from: Peak; to: Peak }[]
+}
+
+export type SegmentPatchEntry = {
+  i: number
+  onset: SegmentPoint
+  peak: SegmentPoint
+  empty: SegmentPoint
+  segment: Segment
+}
+
+export type SegmentPatch = {
+  removed: number[]
+  upserted: SegmentPatchEntry[]
+  count: number
+}